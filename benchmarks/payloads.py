@@ -0,0 +1,56 @@
+from openai.types.chat import ChatCompletion, ParsedChatCompletionMessage, ParsedChoice
+from openai.types.completion_usage import CompletionUsage
+
+
+def build_response(content: str) -> ChatCompletion:
+    return ChatCompletion(
+        id="chatcmpl-AUDTiRQf5GPu0FIr7JDLvOrlylztj",
+        choices=[
+            ParsedChoice(
+                finish_reason="stop",
+                index=0,
+                logprobs=None,
+                message=ParsedChatCompletionMessage(
+                    content=content, refusal=None, role="assistant", tool_calls=[]
+                ),
+            )
+        ],
+        created=1731765014,
+        model="gpt-4o-mini-2024-07-18",
+        object="chat.completion",
+        system_fingerprint="fp_0ba0d124f1",
+        usage=CompletionUsage(completion_tokens=13, prompt_tokens=50, total_tokens=63),
+    )
+
+
+def small_payload() -> dict:
+    """The arguments of `capture` for a short, single-turn chat (~1KB event)."""
+
+    return dict(
+        response=build_response("How can I assist you today?"),
+        messages=[{"role": "user", "content": "Hi!"}],
+        args={"model": "gpt-4o-mini", "temperature": 0.7},
+        meta={"feature": "benchmark"},
+    )
+
+
+def large_payload() -> dict:
+    """The arguments of `capture` for a long, templated conversation (~100KB)."""
+
+    turns = [
+        {
+            "role": "user" if turn % 2 == 0 else "assistant",
+            "content": f"Turn {turn}: " + "lorem ipsum dolor sit amet " * 60,
+        }
+        for turn in range(40)
+    ]
+
+    return dict(
+        response=build_response("The answer is 42. " * 1000),
+        template="Read the following conversation: {conversation}\n"
+        "Classify the user's sentiment. Choose one of: {options}",
+        inputs={"conversation": turns, "options": "positive, neutral, negative"},
+        args={"model": "gpt-4o-mini", "temperature": 0.7, "max_tokens": 4096},
+        meta={"feature": "benchmark", "tags": [f"tag-{i}" for i in range(50)]},
+        user_id="benchmark-user",
+    )
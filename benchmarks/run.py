@@ -0,0 +1,221 @@
+"""Benchmarks of the capture hot path and the dispatch pipeline.
+
+All benchmarks run against a local stub ingestion server, so they're
+reproducible and don't need any API key. Run them from the repository root:
+
+    python -m benchmarks.run [--quick] [--only NAME] [--json FILE]
+
+Results are printed as a table, and can be saved as JSON to compare releases.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from requestyai import AInsights
+from requestyai.http.async_client import AsyncClient
+from requestyai.http.retry_jitter_type import RetryJitterType
+from requestyai.http.retry_policy import RetryPolicy
+
+from .payloads import large_payload, small_payload
+from .stub_server import StubIngestionServer
+
+HEADERS = {"Content-Type": "application/json", "Authorization": "Bearer benchmark"}
+
+
+def percentiles(samples: list[float]) -> dict:
+    """The p50 and p99 of `samples`, in microseconds."""
+
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50_us": cuts[49] * 1e6, "p99_us": cuts[98] * 1e6}
+
+
+def capture_all(ainsights: AInsights, payload: dict, count: int) -> list[float]:
+    """Capture `payload` `count` times, and return the latency of every call."""
+
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        ainsights.capture(**payload)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_capture_latency(count: int) -> dict:
+    """Latency of `capture`, i.e. the overhead added to the caller's thread."""
+
+    variants = {
+        "default": {},
+        "batched": {"batch_size": 100},
+        "deferred": {"defer_serialization": True},
+    }
+    payloads = {"small": small_payload(), "large": large_payload()}
+
+    results = {}
+    with StubIngestionServer() as server:
+        for payload_name, payload in payloads.items():
+            for variant, options in variants.items():
+                ainsights = AInsights.new_client(
+                    api_key="benchmark", base_url=server.url, **options
+                )
+                capture_all(ainsights, payload, count // 10)  # Warm up
+                latencies = capture_all(ainsights, payload, count)
+                ainsights.close()
+
+                results[f"{payload_name}/{variant}"] = percentiles(latencies)
+    return results
+
+
+def bench_throughput(count: int) -> dict:
+    """Events per second through the whole pipeline, until they're delivered."""
+
+    variants = {
+        "1 worker": {},
+        "4 workers": {"workers": 4},
+        "batched": {"batch_size": 100},
+        "batched, 4 workers": {"batch_size": 100, "workers": 4},
+    }
+    payload = small_payload()
+
+    results = {}
+    with StubIngestionServer() as server:
+        for variant, options in variants.items():
+            ainsights = AInsights.new_client(
+                api_key="benchmark", base_url=server.url, **options
+            )
+
+            start = time.perf_counter()
+            capture_all(ainsights, payload, count)
+            ainsights.flush()
+            elapsed = time.perf_counter() - start
+            stats = ainsights.stats()
+            ainsights.close()
+
+            results[variant] = {
+                "events_per_s": count / elapsed,
+                "requests": stats.requests,
+                "delivered": stats.delivered,
+            }
+    return results
+
+
+def bench_queue_memory(count: int) -> dict:
+    """Memory held per event waiting in the queue."""
+
+    payloads = {"small": small_payload(), "large": large_payload()}
+    variants = {"default": {}, "deferred": {"defer_serialization": True}}
+
+    results = {}
+    with StubIngestionServer() as server:
+        for payload_name, payload in payloads.items():
+            for variant, options in variants.items():
+                ainsights = AInsights.new_client(
+                    api_key="benchmark", base_url=server.url, **options
+                )
+                # Keep the worker busy, so every other event stays queued
+                server.gate.clear()
+                ainsights.capture(**payload)
+
+                tracemalloc.start()
+                before, _ = tracemalloc.get_traced_memory()
+                capture_all(ainsights, payload, count)
+                after, _ = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                server.gate.set()
+                ainsights.close()
+
+                per_event = (after - before) / count
+                results[f"{payload_name}/{variant}"] = {"bytes_per_event": per_event}
+    return results
+
+
+def bench_faults(count: int) -> dict:
+    """Throughput and outcomes when the server is slow and rejects requests."""
+
+    scenarios = {
+        "5ms latency": {"latency": 0.005},
+        "10% 429/503": {"error_rate": 0.1},
+        "30% 429/503, 5ms latency": {"error_rate": 0.3, "latency": 0.005},
+    }
+    retry_policy = RetryPolicy(
+        backoff_factor=0.001, jitter_type=RetryJitterType.NONE, max_retries=3
+    )
+    payload = small_payload()
+
+    results = {}
+    for scenario, faults in scenarios.items():
+        with StubIngestionServer(**faults) as server:
+            client = AsyncClient(
+                base_url=server.url,
+                headers=HEADERS,
+                retry_policy=retry_policy,
+                workers=4,
+            )
+            ainsights = AInsights(client=client)
+
+            start = time.perf_counter()
+            capture_all(ainsights, payload, count)
+            ainsights.flush()
+            elapsed = time.perf_counter() - start
+            stats = ainsights.stats()
+            ainsights.close()
+
+            results[scenario] = {
+                "events_per_s": count / elapsed,
+                "delivered": stats.delivered,
+                "failed": stats.failed,
+                "retries": stats.retries,
+            }
+    return results
+
+
+# name -> (benchmark, event count, quick event count)
+BENCHMARKS: dict[str, tuple[Callable[[int], dict], int, int]] = {
+    "capture_latency": (bench_capture_latency, 5000, 500),
+    "throughput": (bench_throughput, 5000, 500),
+    "queue_memory": (bench_queue_memory, 2000, 200),
+    "faults": (bench_faults, 1000, 100),
+}
+
+
+def print_results(name: str, results: dict):
+    print(f"\n{name}")
+    for variant, metrics in results.items():
+        values = "  ".join(
+            f"{key}={value:,.{0 if isinstance(value, int) else 1}f}"
+            for key, value in metrics.items()
+        )
+        print(f"  {variant:<28} {values}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--quick", action="store_true", help="run fewer events, e.g. on CI"
+    )
+    parser.add_argument(
+        "--only", choices=sorted(BENCHMARKS), action="append", help="run only NAME"
+    )
+    parser.add_argument("--json", metavar="FILE", help="also save results to FILE")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        benchmark, count, quick_count = BENCHMARKS[name]
+        results[name] = benchmark(quick_count if args.quick else count)
+        print_results(name, results[name])
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable
+
+
+class StubIngestionServer(ThreadingHTTPServer):
+    """A local ingestion server with injectable latency and errors.
+
+    Every request waits for `gate` to be set, which it is unless the server is
+    paused, then sleeps for `latency` seconds, and fails with one of
+    `error_statuses` with a probability of `error_rate`.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: Iterable[int] = (429, 503),
+        seed: int = 0,
+    ):
+        super().__init__(("127.0.0.1", 0), _StubIngestionHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.gate = threading.Event()
+        self.gate.set()
+
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.events = 0
+        self.errors = 0
+
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def next_status(self) -> int:
+        with self.lock:
+            self.requests += 1
+            if self.random.random() < self.error_rate:
+                self.errors += 1
+                return self.random.choice(self.error_statuses)
+            return 200
+
+    def record(self, body: bytes):
+        try:
+            events = json.loads(body)
+        except ValueError:
+            return
+        with self.lock:
+            self.events += len(events) if isinstance(events, list) else 1
+
+    def __enter__(self) -> "StubIngestionServer":
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.gate.set()
+        self.shutdown()
+        self.server_close()
+
+
+class _StubIngestionHandler(BaseHTTPRequestHandler):
+    # Keep connections alive, like the real ingestion endpoint
+    protocol_version = "HTTP/1.1"
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        self.server.gate.wait()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        status = self.server.next_status()
+        if status == 200:
+            self.server.record(body)
+
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_POST = do_PUT
+
+    def log_message(self, format, *args):
+        pass
@@ -1 +1,29 @@
-from .ainsights import AInsights as AInsights
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .ainsights.async_client import AsyncAInsights as AsyncAInsights
+    from .ainsights.client import AInsights as AInsights
+
+# The modules of the public names, which are only imported on first access, so
+# that importing the package doesn't import openai, httpx and pydantic
+_LAZY_ATTRIBUTES = {
+    "AInsights": ".ainsights.client",
+    "AsyncAInsights": ".ainsights.async_client",
+}
+
+__all__ = ["AInsights", "AsyncAInsights"]
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # Don't go through __getattr__ again
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
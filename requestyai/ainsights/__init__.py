@@ -1 +1,28 @@
-from .client import AInsights as AInsights
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .async_client import AsyncAInsights as AsyncAInsights
+    from .client import AInsights as AInsights
+
+# The modules of the public names, which are only imported on first access
+_LAZY_ATTRIBUTES = {
+    "AInsights": ".client",
+    "AsyncAInsights": ".async_client",
+}
+
+__all__ = ["AInsights", "AsyncAInsights"]
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # Don't go through __getattr__ again
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
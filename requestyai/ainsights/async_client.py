@@ -0,0 +1,464 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Optional, Union
+
+import httpx
+
+from ..http.async_retry_transport import AsyncRetryTransport
+from ..http.circuit_breaker import CircuitBreaker
+from ..http.compression_type import CompressionType
+from ..http.compressor import Compressor
+from ..http.flush_result import FlushResult
+from ..http.rate_limiter import RateLimiter
+from ..http.retry_budget import RetryBudget
+from ..http.retry_policy import RetryPolicy
+from ..http.spool import SpoolRecord
+from ..http.transport_options import default_limits, transport_options
+from .client import AInsights, _check_capture_args, _new_event, _snapshot
+from .error import (
+    AInsightsCircuitOpenError,
+    AInsightsDroppedError,
+    AInsightsSampledError,
+)
+from .projection import Projection
+from .sampler import Capture, Sampler
+from .template_cache import TemplateCache
+from .types.event import AInsightsEvent
+
+# Only used in annotations, or by optional features, which import them on use
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+    from .export_queue import ExportStats
+    from .exporter import Exporter
+    from .response_cache import ResponseCache
+    from .stream import AsyncCapturedStream
+
+
+def _outcome(task: asyncio.Task):
+    """The response of a done dispatch task, or the exception it failed with,
+    which is returned rather than raised, like the client's own errors.
+    """
+
+    if task.cancelled():
+        return AInsightsDroppedError("Dispatch was cancelled")
+    return task.exception() or task.result()
+
+
+class AsyncAInsights:
+    """The asyncio counterpart of `AInsights`.
+
+    Events are dispatched as tasks on the running event loop using a native
+    `httpx.AsyncClient`, without any worker threads or cross-thread queues.
+    Use it as an async context manager, or call `aclose()` when done, to make
+    sure all captured events were dispatched.
+    """
+
+    DEFAULT_BASE_URL = AInsights.DEFAULT_BASE_URL
+    DEFAULT_TIMEOUT = 10.0
+    DEFAULT_MAX_IN_FLIGHT = 16
+
+    __URL = "insight"
+
+    def __init__(
+        self,
+        *,
+        client: httpx.AsyncClient,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        circuit_fallback: Optional[Callable[[SpoolRecord], None]] = None,
+        sampler: Optional[Sampler] = None,
+        projection: Optional[Projection] = None,
+        template_cache: Optional[TemplateCache] = None,
+        exporters: list["Exporter"] = [],
+    ):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.__client = client
+        self.__max_in_flight = max_in_flight
+        self.__circuit_breaker = circuit_breaker
+        self.__circuit_fallback = circuit_fallback
+        self.__sampler = sampler
+        self.__projection = projection
+        self.__template_cache = template_cache
+        self.__exports = []
+        if exporters:
+            from .export_queue import ExportQueue
+
+            self.__exports = [ExportQueue(exporter) for exporter in exporters]
+        self.__in_flight: Optional[asyncio.Semaphore] = None
+        self.__tasks: set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "AsyncAInsights":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def flush(self, timeout: Optional[float] = None) -> FlushResult:
+        """Wait until all the events captured before the call are dispatched.
+
+        Args:
+            timeout: [Optional] maximal time, in seconds, to wait.
+                     Waits for as long as it takes if not provided.
+
+        Returns:
+            FlushResult: How many of these events were delivered, failed, or are
+                         still pending because the timeout expired. Exporters
+                         are flushed within the same timeout, but only the
+                         insights endpoint is accounted for.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        tasks = list(self.__tasks)
+        if tasks:
+            done, not_done = await asyncio.wait(tasks, timeout=timeout)
+            result = FlushResult.from_results(
+                (_outcome(task) for task in done), pending=len(not_done)
+            )
+        else:
+            result = FlushResult(delivered=0, failed=0, pending=0)
+
+        # Exporters are flushed by their own threads, off the event loop
+        loop = asyncio.get_running_loop()
+        for export in self.__exports:
+            remaining = (
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+            await loop.run_in_executor(None, export.flush, remaining)
+
+        return result
+
+    async def aclose(self):
+        """Wait for all captured events to be dispatched and close the client."""
+
+        while self.__tasks:
+            await asyncio.gather(*list(self.__tasks), return_exceptions=True)
+
+        await self.__client.aclose()
+
+        loop = asyncio.get_running_loop()
+        for export in self.__exports:
+            await loop.run_in_executor(None, export.close)
+
+    def export_stats(self) -> list["ExportStats"]:
+        """A snapshot of the counters of every exporter, in order."""
+
+        return [export.stats() for export in self.__exports]
+
+    def capture(
+        self,
+        *,
+        response: "ChatCompletion",
+        messages: Union[None, str, list[str], list[dict]] = None,
+        template: Union[None, str, list[str], list[dict]] = None,
+        inputs: dict = {},
+        args: dict = {},
+        meta: dict = {},
+        user_id: Optional[str] = None,
+    ) -> asyncio.Future:
+        """Capture an AI interaction event and send it to the insights endpoint.
+
+        This method must be called from a running event loop. It schedules the
+        dispatch and returns immediately, so it can be used fire-and-forget style,
+        or the returned task can be awaited to get the outcome of the request.
+
+        See `AInsights.capture` for a detailed description of the arguments.
+
+        Returns:
+            asyncio.Future: A task resolving to the HTTP response, or to the
+                            exception raised while sending the request. Events
+                            discarded by the sampler aren't sent, and resolve
+                            to an `AInsightsSampledError` right away. So do
+                            events captured while the circuit is open, to an
+                            `AInsightsDroppedError`, or to an
+                            `AInsightsCircuitOpenError` once they were passed
+                            to the circuit's fallback.
+        """
+
+        breaker = self.__circuit_breaker
+        circuit_open = breaker is not None and breaker.is_open()
+        if circuit_open and self.__circuit_fallback is None and not self.__exports:
+            # Nothing needs the event, so it's neither validated nor serialized
+            return self.__resolved(AInsightsDroppedError("Circuit is open"))
+
+        if self.__sampler is not None and not self.__sampler.sample(
+            Capture(
+                response=response,
+                messages=messages,
+                template=template,
+                inputs=inputs,
+                args=args,
+                meta=meta,
+                user_id=user_id,
+            )
+        ):
+            return self.__resolved(AInsightsSampledError("Sampled out"))
+
+        event = _new_event(
+            response=response,
+            messages=messages,
+            template=template,
+            inputs=inputs,
+            args=args,
+            meta=meta,
+            user_id=user_id,
+        )
+        if self.__projection is not None:
+            event = self.__projection.apply(event)
+
+        if self.__exports or circuit_open:
+            data = event.model_dump_json()
+            for export in self.__exports:
+                export.put(data)
+
+        # Short-circuited events skip the template cache, so that it doesn't
+        # consider their templates as sent
+        if circuit_open:
+            return self.__resolved(self.__short_circuit(data))
+
+        references = {}
+        if self.__template_cache is not None:
+            event, references = self.__template_cache.apply(event)
+
+        task = asyncio.get_running_loop().create_task(
+            self.__put_deduped(event, references)
+        )
+
+        # The event loop only keeps weak references to tasks
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+        return task
+
+    def capture_stream(
+        self,
+        stream: AsyncIterator["ChatCompletionChunk"],
+        *,
+        messages: Union[None, str, list[str], list[dict]] = None,
+        template: Union[None, str, list[str], list[dict]] = None,
+        inputs: dict = {},
+        args: dict = {},
+        meta: dict = {},
+        user_id: Optional[str] = None,
+        started_at: Optional[float] = None,
+    ) -> "AsyncCapturedStream":
+        """Capture a streamed chat completion, i.e. created with `stream=True`.
+
+        See `AInsights.capture_stream` for a detailed description.
+
+        Returns:
+            AsyncCapturedStream: An async iterator, and async context manager,
+                                 over the chunks.
+        """
+
+        _check_capture_args(messages=messages, template=template, inputs=inputs)
+        fields = dict(
+            messages=_snapshot(messages),
+            template=_snapshot(template),
+            inputs=_snapshot(inputs),
+            args=_snapshot(args),
+            user_id=user_id,
+        )
+
+        def capture(response: "ChatCompletion", timing: dict):
+            self.capture(response=response, meta={**meta, "stream": timing}, **fields)
+
+        from .stream import AsyncCapturedStream
+
+        return AsyncCapturedStream(stream, capture, started_at)
+
+    def instrument(
+        self,
+        openai_client,
+        *,
+        meta: dict = {},
+        cache: Optional["ResponseCache"] = None,
+    ):
+        """Capture all the chat completions of an `AsyncOpenAI` client
+        automatically.
+
+        See `AInsights.instrument` for a detailed description.
+
+        Args:
+            openai_client: The AsyncOpenAI client to instrument.
+            meta: Metadata associated with all the interactions.
+            cache: [Optional] a cache of the completions of identical calls.
+        """
+
+        from .instrument import instrument
+
+        instrument(openai_client, self, meta, cache)
+
+    async def __put_deduped(self, event: AInsightsEvent, references: dict):
+        response = await self.__put(data=event.model_dump_json())
+        if not references:
+            return response
+
+        # Send the event again along with the definitions of all its references,
+        # if the server reports some of them as unknown
+        unknown = self.__template_cache.get_unknown_references(response, references)
+        if not unknown:
+            return response
+
+        self.__template_cache.forget(unknown)
+        event = event.model_copy(update={"definitions": references})
+        return await self.__put(data=event.model_dump_json())
+
+    def __resolved(self, result) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(result)
+        return future
+
+    def __short_circuit(self, data: str):
+        """Hand an event rejected by the open circuit over to the fallback, if
+        any, or drop it otherwise.
+        """
+
+        if self.__circuit_fallback is None:
+            return AInsightsDroppedError("Circuit is open")
+
+        try:
+            self.__circuit_fallback(
+                SpoolRecord("PUT", self.__URL, data.encode(), False)
+            )
+        except Exception as ex:
+            return ex
+
+        return AInsightsCircuitOpenError(
+            "Circuit is open, event was passed to fallback"
+        )
+
+    async def __put(self, data: str):
+        # The semaphore must be created inside the loop it is used on
+        if self.__in_flight is None:
+            self.__in_flight = asyncio.Semaphore(self.__max_in_flight)
+
+        breaker = self.__circuit_breaker
+
+        async with self.__in_flight:
+            if breaker is not None and not breaker.allow():
+                return self.__short_circuit(data)
+
+            try:
+                response = await self.__client.put(self.__URL, content=data)
+            except Exception as ex:
+                response = ex
+
+        if breaker is not None:
+            if isinstance(response, Exception) or response.status_code >= 500:
+                breaker.on_failure()
+            else:
+                breaker.on_success()
+
+        return response
+
+    @staticmethod
+    def new_client(
+        *,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: Union[float, httpx.Timeout] = DEFAULT_TIMEOUT,
+        retry_policy: Optional[RetryPolicy] = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
+        proxy: Optional[Union[str, httpx.Proxy]] = None,
+        local_address: Optional[str] = None,
+        compression: Optional[CompressionType] = None,
+        compression_threshold: int = Compressor.DEFAULT_THRESHOLD,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        circuit_fallback: Optional[Callable[[SpoolRecord], None]] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        sampler: Optional[Sampler] = None,
+        projection: Optional[Projection] = None,
+        template_cache: Optional[TemplateCache] = None,
+        exporters: list["Exporter"] = [],
+    ) -> "AsyncAInsights":
+        """Create a new AsyncAInsights client instance with the provided configuration.
+
+        Args:
+            api_key: The API key for authentication with the insights service.
+            base_url: [Optional] custom base URL for the insights service.
+                      Defaults to DEFAULT_BASE_URL if not provided.
+            timeout: Timeout, in seconds, of every request attempt, or an
+                     `httpx.Timeout` setting the connect, read, write and pool
+                     timeouts separately.
+            retry_policy: [Optional] the retry policy of failed requests.
+            max_in_flight: Maximal number of concurrent requests.
+            limits: [Optional] the limits of the connection pool, including the
+                    keep-alive expiry. By default, the pool keeps a connection
+                    alive per concurrent request.
+            http2: Whether to negotiate HTTP/2, multiplexing concurrent requests
+                   over a single connection. Requires the `h2` package.
+            proxy: [Optional] the URL of a proxy to send all requests through.
+            local_address: [Optional] the local IP address to connect from.
+            compression: [Optional] compress request bodies using this algorithm.
+                         Requests are not compressed if not provided.
+            compression_threshold: Minimal size, in bytes, of compressed bodies.
+            rate_limiter: [Optional] adapt the rate of requests to the server's
+                          throttling (429/503 responses and `Retry-After` hints).
+            circuit_breaker: [Optional] drop events instead of sending them while
+                             the service keeps failing, until a probe succeeds.
+            circuit_fallback: [Optional] called with the events rejected while
+                              the circuit is open, instead of dropping them.
+            retry_budget: [Optional] limit retries to a fraction of all requests.
+            sampler: [Optional] decides which events are sent, before they're
+                     validated or serialized. All events are sent if not provided.
+            projection: [Optional] slims events down before serializing them.
+            template_cache: [Optional] send templates, system prompts and tool
+                            schemas once, and reference them afterwards.
+            exporters: Additional destinations of the events, each with its own
+                       queue and thread.
+
+        Returns:
+            AsyncAInsights: A configured AsyncAInsights client instance.
+        """
+
+        base_url = base_url if base_url is not None else AsyncAInsights.DEFAULT_BASE_URL
+        retry_policy = retry_policy if retry_policy else RetryPolicy()
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        }
+        options = transport_options(
+            limits=limits if limits is not None else default_limits(max_in_flight),
+            http2=http2,
+            proxy=proxy,
+            local_address=local_address,
+        )
+
+        event_hooks = None
+        if compression is not None:
+            compressor = Compressor(
+                compression_type=compression, threshold=compression_threshold
+            )
+            event_hooks = {"request": [compressor.async_hook]}
+
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=AsyncRetryTransport(
+                retry_policy=retry_policy,
+                rate_limiter=rate_limiter,
+                circuit_breaker=circuit_breaker,
+                retry_budget=retry_budget,
+                **options,
+            ),
+            event_hooks=event_hooks,
+        )
+        return AsyncAInsights(
+            client=client,
+            max_in_flight=max_in_flight,
+            circuit_breaker=circuit_breaker,
+            circuit_fallback=circuit_fallback,
+            sampler=sampler,
+            projection=projection,
+            template_cache=template_cache,
+            exporters=exporters,
+        )
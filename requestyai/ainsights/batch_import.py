@@ -0,0 +1,327 @@
+"""Import the results of OpenAI Batch API jobs into Requesty insights.
+
+The requests (input) and results (output) JSONL files of a batch are streamed
+and joined by `custom_id`, and the chat completions are captured in bulk:
+
+    python -m requestyai.ainsights.batch_import INPUT OUTPUT [--checkpoint FILE]
+
+With a checkpoint file, an interrupted import resumes where it stopped, and an
+import in which some completions failed to be delivered resumes from the first
+of them.
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from typing import Iterator, NamedTuple, Optional
+
+from pydantic import ValidationError
+
+from .client import AInsights
+from .types.event import AInsightsEvent
+
+# The endpoint of the requests that are imported, the others are skipped
+_CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+
+class ImportResult(NamedTuple):
+    """The outcome of an import.
+
+    Attributes:
+        delivered: Completions that were delivered.
+        failed: Completions that failed to be delivered.
+        skipped: Results that aren't chat completions, failed, are invalid, or
+                 have no matching request.
+    """
+
+    delivered: int
+    failed: int
+    skipped: int
+
+
+def index_requests(path: str) -> dict[str, int]:
+    """The offsets of the lines of a batch's input file, by `custom_id`.
+
+    Only the offsets are kept in memory, so that the requests can be read back
+    one at a time, in whatever order their results come in. The index still
+    takes memory in O(number of requests), i.e. an id and an offset for each,
+    which is bounded by the Batch API's limit on the requests of a batch.
+    """
+
+    offsets = {}
+    with open(path, "rb") as file:
+        offset = 0
+        for line in file:
+            if line.strip():
+                offsets[json.loads(line)["custom_id"]] = offset
+            offset += len(line)
+
+    return offsets
+
+
+def to_event(request: dict, result: dict, meta: dict) -> Optional[AInsightsEvent]:
+    """The event of a line of a batch's output file, and the matching line of
+    its input file, or None if it isn't a valid, successful, chat completion.
+    """
+
+    response = result.get("response") or {}
+    if (
+        request.get("url") != _CHAT_COMPLETIONS_URL
+        or result.get("error")
+        or response.get("status_code") != 200
+    ):
+        return None
+
+    args = dict(request.get("body") or {})
+    messages = args.pop("messages", None)
+
+    try:
+        return AInsightsEvent(
+            response=response.get("body"),
+            messages=messages,
+            template=None,
+            inputs={},
+            args=args,
+            meta={
+                **meta,
+                "batch": {
+                    "custom_id": result.get("custom_id"),
+                    "request_id": response.get("request_id"),
+                },
+            },
+            user_id=args.get("user"),
+        )
+    except ValidationError:
+        return None
+
+
+def read_batch(
+    input_path: str,
+    output_path: str,
+    *,
+    meta: Optional[dict] = None,
+    start: int = 0,
+) -> Iterator[tuple[int, Optional[AInsightsEvent]]]:
+    """Stream the events of a batch, joining its output and input files.
+
+    Args:
+        input_path: The batch's input file, of requests.
+        output_path: The batch's output file, of results.
+        meta: [Optional] metadata associated with all the events.
+        start: The offset in the output file to start reading from.
+
+    Yields:
+        tuple: The offset in the output file following each result, and its
+               event, or None if the result is skipped.
+    """
+
+    meta = meta or {}
+    offsets = index_requests(input_path)
+
+    with open(input_path, "rb") as requests, open(output_path, "rb") as results:
+        results.seek(start)
+        offset = start
+        for line in results:
+            offset += len(line)
+            if not line.strip():
+                continue
+
+            result = json.loads(line)
+            request_offset = offsets.get(result.get("custom_id"))
+            if request_offset is None:
+                yield offset, None
+                continue
+
+            requests.seek(request_offset)
+            request = json.loads(requests.readline())
+            yield offset, to_event(request, result, meta)
+
+
+class Checkpoint:
+    """The offset in a batch's output file up to which all the results were
+    imported, saved atomically to `path`.
+    """
+
+    def __init__(self, path: str, output_path: str):
+        self.__path = path
+        self.__output_path = os.path.abspath(output_path)
+
+    def load(self) -> int:
+        """The offset to resume from, which is 0 unless the checkpoint is of the
+        same, unchanged, output file.
+        """
+
+        try:
+            with open(self.__path) as file:
+                checkpoint = json.load(file)
+        except FileNotFoundError:
+            return 0
+
+        offset = checkpoint.get("offset", 0)
+        if checkpoint.get("output") != self.__output_path:
+            return 0
+        if offset > os.path.getsize(self.__output_path):
+            return 0
+
+        return offset
+
+    def save(self, offset: int):
+        temp_path = f"{self.__path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"output": self.__output_path, "offset": offset}, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, self.__path)
+
+
+def import_batch(
+    insights: AInsights,
+    input_path: str,
+    output_path: str,
+    *,
+    meta: Optional[dict] = None,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: int = 1000,
+    max_pending: int = AInsights.DEFAULT_MAX_PENDING,
+) -> ImportResult:
+    """Capture the chat completions of a batch, using `AInsights.capture_many`.
+
+    Args:
+        insights: The client capturing the completions.
+        input_path: The batch's input file, of requests.
+        output_path: The batch's output file, of results.
+        meta: [Optional] metadata associated with all the events.
+        checkpoint_path: [Optional] a file recording the offset up to which all
+                         the completions were delivered, to resume from if the
+                         import is interrupted or some completions failed.
+        checkpoint_interval: Number of events between checkpoints.
+        max_pending: Maximal number of events waiting to be dispatched.
+
+    Returns:
+        ImportResult: How many completions were delivered, failed or skipped.
+    """
+
+    checkpoint = (
+        Checkpoint(checkpoint_path, output_path)
+        if checkpoint_path is not None
+        else None
+    )
+    start = checkpoint.load() if checkpoint is not None else 0
+
+    # The offsets following the events that weren't dispatched yet
+    offsets: deque[int] = deque()
+    # The offset up to which all the events were delivered, which stops
+    # advancing at the first event that wasn't, to import it again on resume
+    delivered_offset = start
+    delivered = saved = skipped = 0
+    failed = False
+
+    def events() -> Iterator[AInsightsEvent]:
+        nonlocal delivered_offset, skipped
+
+        for offset, event in read_batch(
+            input_path, output_path, meta=meta, start=start
+        ):
+            if event is None:
+                skipped += 1
+                # Skipped results are done once the events before them are
+                if offsets:
+                    offsets[-1] = offset
+                elif not failed:
+                    delivered_offset = offset
+                continue
+
+            offsets.append(offset)
+            yield event
+
+    def on_result(success: bool):
+        nonlocal delivered_offset, delivered, saved, failed
+
+        offset = offsets.popleft()
+        failed = failed or not success
+        if failed:
+            return
+
+        delivered_offset = offset
+        delivered += 1
+        if checkpoint is not None and delivered - saved >= checkpoint_interval:
+            checkpoint.save(delivered_offset)
+            saved = delivered
+
+    result = insights.capture_many(
+        events(), max_pending=max_pending, on_result=on_result
+    )
+
+    if checkpoint is not None:
+        checkpoint.save(delivered_offset if failed else os.path.getsize(output_path))
+
+    return ImportResult(
+        delivered=result.delivered, failed=result.failed, skipped=skipped
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="the batch's input JSONL file")
+    parser.add_argument("output", help="the batch's output JSONL file")
+    parser.add_argument(
+        "--api-key",
+        default=os.environ.get("REQUESTY_API_KEY"),
+        help="defaults to the REQUESTY_API_KEY environment variable",
+    )
+    parser.add_argument("--base-url", help="the insights service's base URL")
+    parser.add_argument(
+        "--checkpoint", metavar="FILE", help="resume from, and save progress to FILE"
+    )
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument(
+        "--workers", type=int, default=8, help="number of concurrent connections"
+    )
+    parser.add_argument(
+        "--max-pending", type=int, default=AInsights.DEFAULT_MAX_PENDING
+    )
+    parser.add_argument(
+        "--meta",
+        metavar="KEY=VALUE",
+        action="append",
+        default=[],
+        help="metadata associated with all the events",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("--api-key or REQUESTY_API_KEY is required")
+
+    if any("=" not in item for item in args.meta):
+        parser.error("--meta must be of the form KEY=VALUE")
+    meta = dict(item.split("=", 1) for item in args.meta)
+
+    insights = AInsights.new_client(
+        api_key=args.api_key,
+        base_url=args.base_url,
+        batch_size=args.batch_size,
+        workers=args.workers,
+    )
+    try:
+        result = import_batch(
+            insights,
+            args.input,
+            args.output,
+            meta=meta,
+            checkpoint_path=args.checkpoint,
+            max_pending=args.max_pending,
+        )
+    finally:
+        insights.close()
+
+    print(
+        f"delivered={result.delivered} failed={result.failed} skipped={result.skipped}"
+    )
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
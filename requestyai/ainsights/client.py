@@ -1,13 +1,91 @@
 import atexit
-from concurrent.futures import Future
-from typing import Optional, Union
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Union
 
-from openai.types.chat import ChatCompletion
+import httpx
 
 from ..http.async_client import AsyncClient
-from .error import AInsightsValueError
+from ..http.circuit_breaker import CircuitBreaker
+from ..http.compression_type import CompressionType
+from ..http.compressor import Compressor
+from ..http.flush_result import FlushResult
+from ..http.fork import reset_after_fork
+from ..http.lazy_content import LazyContent
+from ..http.metrics import DispatchStats, MetricsHooks
+from ..http.overflow_policy import OverflowPolicy
+from ..http.rate_limiter import RateLimiter
+from ..http.retry_budget import RetryBudget
+from ..http.retry_policy import RetryPolicy
+from ..http.spool import Spool, SpoolRecord
+from .error import AInsightsSampledError, AInsightsValueError
+from .projection import Projection
+from .sampler import Capture, Sampler
+from .template_cache import TemplateCache
 from .types.event import AInsightsEvent
 
+# Only used in annotations, or by optional features, which import them on use
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+    from .export_queue import ExportStats
+    from .exporter import Exporter
+    from .response_cache import ResponseCache
+    from .stream import CapturedStream
+
+
+def _check_capture_args(
+    *,
+    messages: Union[None, str, list[str], list[dict]],
+    template: Union[None, str, list[str], list[dict]],
+    inputs: dict,
+):
+    """Validate the arguments of a `capture` call."""
+
+    if (messages is None) and (template is None or inputs is None):
+        message = (
+            "Please specify at least one of ('messages') or ('template' and 'inputs')"
+        )
+        raise AInsightsValueError(message)
+
+
+def _new_event(
+    *,
+    response: "ChatCompletion",
+    messages: Union[None, str, list[str], list[dict]],
+    template: Union[None, str, list[str], list[dict]],
+    inputs: dict,
+    args: dict,
+    meta: dict,
+    user_id: Optional[str],
+) -> AInsightsEvent:
+    """Validate the arguments of a `capture` call and build the event."""
+
+    _check_capture_args(messages=messages, template=template, inputs=inputs)
+
+    return AInsightsEvent(
+        response=response,
+        messages=messages,
+        template=template,
+        inputs=inputs,
+        args=args,
+        meta=meta,
+        user_id=user_id,
+    )
+
+
+def _snapshot(value):
+    """Copy the (nested) dicts and lists of `value`, sharing everything else."""
+
+    if isinstance(value, dict):
+        return {key: _snapshot(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_snapshot(item) for item in value]
+    return value
+
 
 class AInsights:
     """The Insights client object that handles capturing and dispatching
@@ -15,20 +93,113 @@ class AInsights:
     """
 
     DEFAULT_BASE_URL = "https://ingestion.requesty.ai"
+    DEFAULT_MAX_PENDING = 10000
 
     __URL = "insight"
+    __BATCH_URL = "insights"
 
-    def __init__(self, *, client: AsyncClient):
+    def __init__(
+        self,
+        *,
+        client: AsyncClient,
+        batched: bool = False,
+        defer_serialization: bool = False,
+        sampler: Optional[Sampler] = None,
+        projection: Optional[Projection] = None,
+        template_cache: Optional[TemplateCache] = None,
+        exporters: list["Exporter"] = [],
+    ):
         self.__client = client
+        self.__batched = batched
+        self.__defer_serialization = defer_serialization
+        self.__sampler = sampler
+        self.__projection = projection
+        self.__template_cache = template_cache
+        self.__exports = []
+        if exporters:
+            from .export_queue import ExportQueue
+
+            self.__exports = [ExportQueue(exporter) for exporter in exporters]
+
+        # All discarded events share a single, already resolved, future
+        self.__sampled_out = Future()
+        self.__sampled_out.set_result(AInsightsSampledError("Sampled out"))
+
+        # The futures of events that may be sent again, along with their
+        # definitions, which `flush` must wait for
+        self.__resending: set[Future] = set()
+        self.__resending_lock = threading.Lock()
+        reset_after_fork(self)
+
         atexit.register(self.close)
 
+    def _after_fork_in_child(self):
+        # The events of the parent are left for the parent to send again
+        self.__resending = set()
+        self.__resending_lock = threading.Lock()
+
     def close(self):
         self.__client.close()
+        for export in self.__exports:
+            export.close()
+
+    def flush(self, timeout: Optional[float] = None) -> FlushResult:
+        """Wait until all the events captured before the call are dispatched.
+
+        Unlike `close`, the client remains usable afterwards, which makes this
+        method useful at the end of short-lived jobs and serverless handlers.
+
+        Args:
+            timeout: [Optional] maximal time, in seconds, to wait.
+                     Waits for as long as it takes if not provided.
+
+        Returns:
+            FlushResult: How many of these events were delivered, failed, or are
+                         still pending because the timeout expired. Exporters
+                         are flushed within the same timeout, but only the
+                         insights endpoint is accounted for.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__resending_lock:
+            resending = list(self.__resending)
+
+        result = self.__client.flush(timeout=timeout)
+
+        if resending:
+            # Events are only sent again once their first request completed, so
+            # the second one is queued after the flush above started
+            self.__client.flush(timeout=self.__remaining(deadline))
+            wait(resending, timeout=self.__remaining(deadline))
+
+        for export in self.__exports:
+            export.flush(timeout=self.__remaining(deadline))
+
+        return result
+
+    @staticmethod
+    def __remaining(deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.monotonic())
+
+    def stats(self) -> DispatchStats:
+        """A snapshot of the counters of the dispatch pipeline.
+
+        Cheap enough to be polled, e.g. by a health check.
+        """
+
+        return self.__client.stats()
+
+    def export_stats(self) -> list["ExportStats"]:
+        """A snapshot of the counters of every exporter, in order."""
+
+        return [export.stats() for export in self.__exports]
 
     def capture(
         self,
         *,
-        response: ChatCompletion,
+        response: "ChatCompletion",
         messages: Union[None, str, list[str], list[dict]] = None,
         template: Union[None, str, list[str], list[dict]] = None,
         inputs: dict = {},
@@ -67,31 +238,342 @@ class AInsights:
             meta: Metadata associated with the interaction.
             user_id: Optional identifier for the user initiating the interaction.
 
+        If the client defers serialization, the event is only validated and
+        serialized by the worker that dispatches it. The dicts and lists passed
+        to this method are copied, so they can be safely modified once it returns,
+        whereas any other object, including the response, is kept by reference
+        and must not be modified until the event is dispatched.
+
+        If the client has a sampler, events it discards are neither validated
+        nor serialized, and the returned future is already resolved with an
+        `AInsightsSampledError`. So are events captured while the circuit is
+        open, with an `AInsightsDroppedError`, unless a circuit fallback, a
+        spool or an exporter needs them.
+
         Returns:
             Future: An asynchronous result object representing the HTTP request.
         """
 
-        if (messages is None) and (template is None or inputs is None):
-            message = (
-                "Please specify at least one of "
-                "('messages') or ('template' and 'inputs')"
+        if not self.__exports:
+            dropped = self.__client.drop_if_circuit_open()
+            if dropped is not None:
+                return dropped
+
+        if self.__sampler is not None and not self.__sampler.sample(
+            Capture(
+                response=response,
+                messages=messages,
+                template=template,
+                inputs=inputs,
+                args=args,
+                meta=meta,
+                user_id=user_id,
+            )
+        ):
+            return self.__sampled_out
+
+        # The deduplicated event, if any, in case it must be sent again
+        deduped = []
+
+        if self.__defer_serialization:
+            _check_capture_args(messages=messages, template=template, inputs=inputs)
+            fields = dict(
+                response=response,
+                messages=_snapshot(messages),
+                template=_snapshot(template),
+                inputs=_snapshot(inputs),
+                args=_snapshot(args),
+                meta=_snapshot(meta),
+                user_id=user_id,
+            )
+
+            # Built once, by whichever worker renders the event first
+            build = functools.cache(lambda: self.__project(_new_event(**fields)))
+            data = LazyContent(lambda: self.__serialize(build(), deduped))
+            if self.__exports:
+                self.__export(
+                    LazyContent(functools.cache(lambda: build().model_dump_json()))
+                )
+        else:
+            event = self.__project(
+                _new_event(
+                    response=response,
+                    messages=messages,
+                    template=template,
+                    inputs=inputs,
+                    args=args,
+                    meta=meta,
+                    user_id=user_id,
+                )
             )
-            raise AInsightsValueError(message)
-
-        event = AInsightsEvent(
-            response=response,
-            messages=messages,
-            template=template,
-            inputs=inputs,
-            args=args,
-            meta=meta,
+            data = self.__serialize(event, deduped)
+            if self.__exports:
+                # Exporters get the whole event, without template references
+                self.__export(event.model_dump_json() if deduped else data)
+
+        future = self.__put(data)
+        if self.__template_cache is None:
+            return future
+
+        return self.__with_fallback(future, deduped)
+
+    def capture_many(
+        self,
+        events: Iterable[AInsightsEvent],
+        *,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        on_result: Optional[Callable[[bool], None]] = None,
+    ) -> FlushResult:
+        """Capture events in bulk, e.g. imported from files, and wait until they
+        were all dispatched.
+
+        Events are consumed from the iterable lazily, and only `max_pending` of
+        them are waiting to be dispatched at any time, so memory stays bounded
+        however many there are. They're dispatched by the client's workers, in
+        batches if it has a batch size, and go through its projection, template
+        cache and exporters, but not its sampler.
+
+        Args:
+            events: The events to capture, e.g. a generator.
+            max_pending: Maximal number of events waiting to be dispatched, which
+                         should fit in the client's queue.
+            on_result: [Optional] called with whether every event was delivered,
+                       once it was dispatched, in the order of `events`, e.g.
+                       to checkpoint the progress of an import.
+
+        Returns:
+            FlushResult: How many of the events were delivered or failed.
+        """
+
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+
+        pending: deque[Future] = deque()
+        delivered = failed = 0
+
+        def settle(block: bool):
+            nonlocal delivered, failed
+
+            while pending and (block or pending[0].done()):
+                result = pending.popleft().result()
+                success = not (
+                    isinstance(result, Exception) or result.status_code >= 400
+                )
+                if success:
+                    delivered += 1
+                else:
+                    failed += 1
+                if on_result is not None:
+                    on_result(success)
+
+                # Only wait for the oldest event, to make room for another one
+                block = block and len(pending) >= max_pending
+
+        for event in events:
+            deduped = []
+            event = self.__project(event)
+            data = self.__serialize(event, deduped)
+            if self.__exports:
+                self.__export(event.model_dump_json() if deduped else data)
+
+            future = self.__put(data)
+            if self.__template_cache is not None:
+                future = self.__with_fallback(future, deduped)
+            pending.append(future)
+
+            settle(block=len(pending) >= max_pending)
+
+        while pending:
+            settle(block=True)
+
+        return FlushResult(delivered=delivered, failed=failed, pending=0)
+
+    def capture_stream(
+        self,
+        stream: Iterator["ChatCompletionChunk"],
+        *,
+        messages: Union[None, str, list[str], list[dict]] = None,
+        template: Union[None, str, list[str], list[dict]] = None,
+        inputs: dict = {},
+        args: dict = {},
+        meta: dict = {},
+        user_id: Optional[str] = None,
+        started_at: Optional[float] = None,
+    ) -> "CapturedStream":
+        """Capture a streamed chat completion, i.e. created with `stream=True`.
+
+        The returned stream yields the same chunks as `stream`, and assembles
+        them into a completion as they pass through. Once the stream ends, fails,
+        or is closed or garbage collected before it ended, the completion is
+        captured as a single event, with the timing of the stream added to
+        `meta["stream"]`:
+            - duration: time, in seconds, since the request started.
+            - time_to_first_token: time, in seconds, until the first token.
+            - inter_token_latency: mean time, in seconds, between tokens.
+            - max_inter_token_latency: longest time, in seconds, between tokens.
+            - chunks: number of chunks received.
+            - completed: whether the stream ended, rather than failed or closed.
+
+        See `capture` for a description of the other arguments.
+
+        Args:
+            stream: The stream returned by the OpenAI client.
+            started_at: [Optional] the `time.monotonic()` at which the request
+                        was sent, to include the time until the response in the
+                        timing. Defaults to the time of this call.
+
+        Returns:
+            CapturedStream: An iterator, and context manager, over the chunks.
+        """
+
+        _check_capture_args(messages=messages, template=template, inputs=inputs)
+        fields = dict(
+            messages=_snapshot(messages),
+            template=_snapshot(template),
+            inputs=_snapshot(inputs),
+            args=_snapshot(args),
             user_id=user_id,
         )
 
-        return self.__client.put(url=self.__URL, data=event.model_dump_json())
+        def capture(response: "ChatCompletion", timing: dict):
+            self.capture(response=response, meta={**meta, "stream": timing}, **fields)
+
+        from .stream import CapturedStream
+
+        return CapturedStream(stream, capture, started_at)
+
+    def instrument(
+        self,
+        openai_client,
+        *,
+        meta: dict = {},
+        cache: Optional["ResponseCache"] = None,
+    ):
+        """Capture all the chat completions of an OpenAI client automatically.
+
+        Wraps `chat.completions.create` and `parse` (including their `beta`
+        counterparts) of an `OpenAI` or `AsyncOpenAI` client, so that every call
+        is captured with its messages, arguments and response, without calling
+        `capture`. The `user` argument, if any, is captured as the `user_id`.
+
+        Calls are timed using a monotonic clock, and their timing is added to
+        `meta["timing"]`:
+            - latency: time, in seconds, until the call returned.
+            - time_to_first_byte: time, in seconds, until the response headers
+                                  of the last attempt arrived.
+        Streamed calls are captured by `capture_stream` instead, once the stream
+        ends. Failed calls are captured with an empty completion, and the error
+        in `meta["error"]`, before the exception is raised.
+
+        With a cache, the completions of identical calls (with the same messages
+        and arguments, including the `extra_*` ones, besides `user`, `timeout`
+        and `stream`, which isn't cached) are returned from the cache, and
+        identical concurrent calls are coalesced into one. Completions that were
+        returned from the cache are still captured, with `meta["cached"]` set.
+
+        Args:
+            openai_client: The OpenAI client to instrument.
+            meta: Metadata associated with all the interactions.
+            cache: [Optional] a cache of the completions of identical calls.
+        """
+
+        from .instrument import instrument
+
+        instrument(openai_client, self, meta, cache)
+
+    def __put(self, data: Union[str, LazyContent]) -> Future:
+        if self.__batched:
+            return self.__client.put_batched(url=self.__BATCH_URL, data=data)
+
+        return self.__client.put(url=self.__URL, data=data)
+
+    def __project(self, event: AInsightsEvent) -> AInsightsEvent:
+        if self.__projection is not None:
+            return self.__projection.apply(event)
+        return event
+
+    def __export(self, data: Union[str, LazyContent]):
+        for export in self.__exports:
+            export.put(data)
+
+    def __serialize(self, event: AInsightsEvent, deduped: list) -> str:
+        if self.__template_cache is not None:
+            event, references = self.__template_cache.apply(event)
+            if references:
+                deduped.append((event, references))
+
+        return event.model_dump_json()
+
+    def __with_fallback(self, future: Future, deduped: list) -> Future:
+        """Send a deduplicated event again, along with the definitions of all its
+        references, if the server reports some of them as unknown.
+        """
+
+        result = Future()
+        with self.__resending_lock:
+            self.__resending.add(result)
+        result.add_done_callback(self.__discard_resending)
+
+        def on_done(future: Future):
+            response = future.result()
+
+            unknown = []
+            if deduped:
+                event, references = deduped[0]
+                unknown = self.__template_cache.get_unknown_references(
+                    response, references
+                )
+
+            if not unknown:
+                result.set_result(response)
+                return
+
+            self.__template_cache.forget(unknown)
+            data = event.model_copy(update={"definitions": references})
+            self.__put(data.model_dump_json()).add_done_callback(
+                lambda future: result.set_result(future.result())
+            )
+
+        future.add_done_callback(on_done)
+        return result
+
+    def __discard_resending(self, future: Future):
+        with self.__resending_lock:
+            self.__resending.discard(future)
 
     @staticmethod
-    def new_client(*, api_key: str, base_url: Optional[str] = None) -> "AInsights":
+    def new_client(
+        *,
+        api_key: str,
+        base_url: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        batch_timeout: Optional[float] = None,
+        workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        overflow_policy: Optional[OverflowPolicy] = None,
+        overflow_timeout: Optional[float] = None,
+        defer_serialization: bool = False,
+        compression: Optional[CompressionType] = None,
+        compression_threshold: int = Compressor.DEFAULT_THRESHOLD,
+        spool_directory: Optional[str] = None,
+        replay_rate: Optional[float] = None,
+        metrics: Optional[MetricsHooks] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        circuit_fallback: Optional[Callable[[SpoolRecord], None]] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        timeout: Optional[Union[float, httpx.Timeout]] = None,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
+        proxy: Optional[Union[str, httpx.Proxy]] = None,
+        local_address: Optional[str] = None,
+        sampler: Optional[Sampler] = None,
+        projection: Optional[Projection] = None,
+        template_cache: Optional[TemplateCache] = None,
+        exporters: list["Exporter"] = [],
+    ) -> "AInsights":
         """Create a new AInsights client instance with the provided configuration.
 
         This is the recommended way to create new AInsights instances as it handles
@@ -101,6 +583,72 @@ class AInsights:
             api_key: The API key for authentication with the insights service.
             base_url: [Optional] custom base URL for the insights service.
                       Defaults to DEFAULT_BASE_URL if not provided.
+            batch_size: [Optional] send events in batches of up to this many
+                        events per request. Batching is disabled if not provided.
+            batch_timeout: [Optional] maximal time, in seconds, to wait for a
+                           batch to fill up before sending it.
+                           Defaults to AsyncClient.DEFAULT_BATCH_TIMEOUT.
+            workers: [Optional] number of threads dispatching events concurrently.
+                     Defaults to AsyncClient.DEFAULT_WORKERS.
+            max_in_flight: [Optional] maximal number of concurrent requests.
+                           Defaults to the number of workers.
+            max_queue_size: [Optional] maximal number of events waiting to be
+                            dispatched. The queue is unbounded if not provided.
+            overflow_policy: [Optional] what to do with new events when the queue
+                             is full. Defaults to AsyncClient.DEFAULT_OVERFLOW_POLICY.
+            overflow_timeout: [Optional] how long, in seconds, to block waiting for
+                              room when using OverflowPolicy.BLOCK.
+            defer_serialization: Validate and serialize events on the dispatching
+                                 worker, instead of the thread calling `capture`.
+            compression: [Optional] compress request bodies using this algorithm.
+                         Requests are not compressed if not provided.
+            compression_threshold: Minimal size, in bytes, of compressed bodies.
+            spool_directory: [Optional] a directory in which to spool events that
+                             can't be delivered, to be replayed by the next client
+                             using the same directory. Must not be shared with
+                             any other client.
+            replay_rate: [Optional] maximal number of spooled events replayed per
+                         second. Defaults to AsyncClient.DEFAULT_REPLAY_RATE.
+            metrics: [Optional] hooks instrumenting the dispatch pipeline, e.g.
+                     `PrometheusHooks` or `OpenTelemetryHooks`. Counters are
+                     available through `stats()` regardless.
+            rate_limiter: [Optional] adapt the rate of requests to the server's
+                          throttling (429/503 responses and `Retry-After` hints)
+                          instead of retrying each request on its own.
+            circuit_breaker: [Optional] stop sending events while the service
+                             keeps failing, until a probe request succeeds.
+            circuit_fallback: [Optional] called with the requests rejected while
+                              the circuit is open. Otherwise, they're spooled if
+                              `spool_directory` is provided, or dropped.
+            retry_policy: [Optional] the retry policy of failed requests, e.g. to
+                          set a deadline spanning all the attempts of a request.
+            retry_budget: [Optional] limit retries to a fraction of all requests,
+                          so that retries don't multiply the load of a server
+                          that is already struggling.
+            timeout: [Optional] timeout, in seconds, of every request attempt,
+                     or an `httpx.Timeout` setting the connect, read, write and
+                     pool timeouts separately.
+                     Defaults to AsyncClient.DEFAULT_TIMEOUT.
+            limits: [Optional] the limits of the connection pool, including the
+                    keep-alive expiry. By default, the pool keeps a connection
+                    alive per concurrent request.
+            http2: Whether to negotiate HTTP/2, multiplexing concurrent requests
+                   over a single connection, which saves a TLS handshake per
+                   connection. Requires the `h2` package (`httpx[http2]`).
+            proxy: [Optional] the URL of a proxy to send all events through.
+            local_address: [Optional] the local IP address to connect from.
+            sampler: [Optional] decides which events are sent, e.g. a fraction
+                     of the users, before they're validated or serialized.
+                     All events are sent if not provided.
+            projection: [Optional] slims events down before serializing them,
+                        e.g. by truncating long messages, to bound their size.
+            template_cache: [Optional] send templates, system prompts and tool
+                            schemas once, and reference them by their digest in
+                            the following events.
+            exporters: Additional destinations of the events, e.g. an
+                       `NDJSONExporter` or a `StdoutExporter`, each with its own
+                       queue and thread, so that a slow exporter can't stall the
+                       others, nor the insights endpoint.
 
         Returns:
             AInsights: A configured AInsights client instance.
@@ -112,5 +660,59 @@ class AInsights:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}",
         }
-        client = AsyncClient(base_url=base_url, headers=headers)
-        return AInsights(client=client)
+        options = {}
+        if batch_size is not None:
+            options["batch_size"] = batch_size
+        if batch_timeout is not None:
+            options["batch_timeout"] = batch_timeout
+        if workers is not None:
+            options["workers"] = workers
+        if max_in_flight is not None:
+            options["max_in_flight"] = max_in_flight
+        if max_queue_size is not None:
+            options["max_queue_size"] = max_queue_size
+        if overflow_policy is not None:
+            options["overflow_policy"] = overflow_policy
+        if overflow_timeout is not None:
+            options["overflow_timeout"] = overflow_timeout
+        if compression is not None:
+            options["compressor"] = Compressor(
+                compression_type=compression, threshold=compression_threshold
+            )
+        if spool_directory is not None:
+            options["spool"] = Spool(spool_directory)
+        if replay_rate is not None:
+            options["replay_rate"] = replay_rate
+        if metrics is not None:
+            options["metrics"] = metrics
+        if rate_limiter is not None:
+            options["rate_limiter"] = rate_limiter
+        if circuit_breaker is not None:
+            options["circuit_breaker"] = circuit_breaker
+        if circuit_fallback is not None:
+            options["circuit_fallback"] = circuit_fallback
+        if retry_policy is not None:
+            options["retry_policy"] = retry_policy
+        if retry_budget is not None:
+            options["retry_budget"] = retry_budget
+        if timeout is not None:
+            options["timeout"] = timeout
+        if limits is not None:
+            options["limits"] = limits
+        if http2:
+            options["http2"] = http2
+        if proxy is not None:
+            options["proxy"] = proxy
+        if local_address is not None:
+            options["local_address"] = local_address
+
+        client = AsyncClient(base_url=base_url, headers=headers, **options)
+        return AInsights(
+            client=client,
+            batched=batch_size is not None,
+            defer_serialization=defer_serialization,
+            sampler=sampler,
+            projection=projection,
+            template_cache=template_cache,
+            exporters=exporters,
+        )
@@ -1,7 +1,10 @@
-class AInsightsError(Exception):
-    """Base exception class for AInsights-related errors."""
+from ..error import AInsightsError
+from ..http.error import CircuitOpenError, DroppedError, SpooledError
 
-    pass
+# The errors of the dispatch pipeline, under the names they're known by here
+AInsightsDroppedError = DroppedError
+AInsightsSpooledError = SpooledError
+AInsightsCircuitOpenError = CircuitOpenError
 
 
 class AInsightsValueError(AInsightsError):
@@ -13,3 +16,26 @@ class AInsightsValueError(AInsightsError):
 
     def __init__(self, message: str):
         super().__init__(message)
+
+
+class AInsightsSampledError(AInsightsError):
+    """Exception returned for events that were discarded by the client's sampler,
+    without being validated, serialized or sent.
+
+    Attributes:
+        message: Explanation of why the event was discarded
+    """
+
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class AInsightsExportError(AInsightsError):
+    """Exception raised by exporters for batches of events they failed to export.
+
+    Attributes:
+        message: Explanation of why the batch failed
+    """
+
+    def __init__(self, message: str):
+        super().__init__(message)
@@ -0,0 +1,201 @@
+import threading
+import time
+from typing import NamedTuple, Optional, Union
+
+from ..http.fork import reset_after_fork
+from ..http.job_queue import JobQueue
+from ..http.lazy_content import LazyContent
+from .exporter import Exporter
+
+
+class ExportStats(NamedTuple):
+    """A snapshot of the counters of an exporter's queue.
+
+    Attributes:
+        exporter: The name of the exporter's class.
+        queue_size: Events currently waiting in the queue.
+        exported: Events exported successfully.
+        failed: Events whose batch failed, or that couldn't be serialized.
+        dropped: Events dropped because the queue was full or closed.
+        last_error: The exception raised by the last failed batch, if any.
+    """
+
+    exporter: str
+    queue_size: int
+    exported: int
+    failed: int
+    dropped: int
+    last_error: Optional[Exception]
+
+
+class ExportQueue:
+    """Feeds the events of a client to an exporter, in batches, from a dedicated
+    thread, isolating the client and the other exporters from its failures and
+    latency.
+    """
+
+    SHUTDOWN_TIMEOUT = 10.0
+
+    def __init__(self, exporter: Exporter):
+        self.__exporter = exporter
+        self.__reset()
+
+        reset_after_fork(self)
+
+    def __reset(self):
+        self.__queue = JobQueue(maxsize=self.__exporter.max_queue_size)
+        self.__thread: Optional[threading.Thread] = None
+        self.__start_lock = threading.Lock()
+
+        # Events queued and handled so far, to know when a flush is done
+        self.__lock = threading.Lock()
+        self.__done_changed = threading.Condition(self.__lock)
+        self.__queued = 0
+        self.__done = 0
+
+        self.__exported = 0
+        self.__failed = 0
+        self.__dropped = 0
+        self.__last_error: Optional[Exception] = None
+
+    def _after_fork_in_child(self):
+        """Reset the queue in a forked child process, where its thread doesn't
+        exist. Events queued in the parent are left for the parent to export.
+        """
+
+        self.__reset()
+
+    @property
+    def exporter(self) -> Exporter:
+        return self.__exporter
+
+    def stats(self) -> ExportStats:
+        with self.__lock:
+            return ExportStats(
+                exporter=type(self.__exporter).__name__,
+                queue_size=self.__queue.qsize(),
+                exported=self.__exported,
+                failed=self.__failed,
+                dropped=self.__dropped,
+                last_error=self.__last_error,
+            )
+
+    def put(self, event: Union[str, LazyContent]) -> bool:
+        """Queue an event without blocking, dropping it if the queue is full.
+
+        Returns:
+            bool: Whether the event was queued.
+        """
+
+        if self.__thread is None:
+            self.__start()
+
+        with self.__lock:
+            if not self.__queue.put(event, timeout=0):
+                self.__dropped += 1
+                return False
+            self.__queued += 1
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the events queued before the call are exported.
+
+        Returns:
+            bool: False if some of them were still pending when the timeout
+                  expired.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        self.__queue.begin_flush()
+        try:
+            with self.__lock:
+                target = self.__queued
+                while self.__done < target:
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.__done_changed.wait(remaining)
+                return True
+        finally:
+            self.__queue.end_flush()
+
+    def close(self):
+        """Export the remaining events, for up to SHUTDOWN_TIMEOUT seconds, and
+        close the exporter.
+        """
+
+        self.__queue.close()
+        if self.__thread is not None:
+            self.__thread.join(timeout=self.SHUTDOWN_TIMEOUT)
+
+        # Whatever is left won't be exported anymore
+        while self.__queue.get(timeout=0) is not None:
+            self.__count(dropped=1)
+
+        self.__exporter.close()
+
+    def __start(self):
+        with self.__start_lock:
+            if self.__thread is None:
+                thread = threading.Thread(target=self._run_loop, daemon=True)
+                thread.start()
+                self.__thread = thread
+
+    def _run_loop(self):
+        """Export batches of events until the queue is closed and drained."""
+
+        exporter = self.__exporter
+        while True:
+            event = self.__queue.get()
+            if event is None:  # The queue was closed, and is empty
+                break
+
+            batch = [event]
+            linger = 0.0 if self.__queue.closed else exporter.batch_timeout
+            deadline = time.monotonic() + linger
+            while len(batch) < exporter.batch_size:
+                event = self.__queue.get(timeout=deadline - time.monotonic())
+                if event is None:
+                    break
+                batch.append(event)
+
+            events = []
+            for event in batch:
+                try:
+                    events.append(
+                        event.render() if isinstance(event, LazyContent) else event
+                    )
+                except Exception as ex:
+                    self.__count(failed=1, error=ex)
+
+            if not events:
+                continue
+
+            try:
+                exporter.export(events)
+            except Exception as ex:
+                self.__count(failed=len(events), error=ex)
+            else:
+                self.__count(exported=len(events))
+
+    def __count(
+        self,
+        *,
+        exported: int = 0,
+        failed: int = 0,
+        dropped: int = 0,
+        error: Optional[Exception] = None,
+    ):
+        with self.__lock:
+            self.__exported += exported
+            self.__failed += failed
+            self.__dropped += dropped
+            if error is not None:
+                self.__last_error = error
+
+            # Events dropped by `close` were queued, so they're done as well
+            self.__done += exported + failed + dropped
+            self.__done_changed.notify_all()
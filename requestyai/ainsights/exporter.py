@@ -0,0 +1,176 @@
+import sys
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Callable, Optional, TextIO
+
+from ..http.async_client import AsyncClient
+from .error import AInsightsExportError
+
+
+class Exporter(ABC):
+    """A destination of captured events, besides the insights endpoint.
+
+    Every exporter of a client gets its own queue and dispatching thread, so a
+    slow or failing exporter can neither block `capture` nor delay the other
+    exporters. Events are passed to `export` in batches of up to `batch_size`
+    serialized JSON documents, waiting up to `batch_timeout` seconds for a batch
+    to fill up. Once `max_queue_size` events are waiting, new ones are dropped.
+
+    Subclasses implement `export`, which may block, and raise to report that a
+    batch failed. Failed batches are counted, not retried.
+    """
+
+    DEFAULT_BATCH_SIZE = 100
+    DEFAULT_BATCH_TIMEOUT = 1.0
+    DEFAULT_MAX_QUEUE_SIZE = 10000
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_timeout: float = DEFAULT_BATCH_TIMEOUT,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    ):
+        """
+        Args:
+            batch_size: Maximal number of events per `export` call.
+            batch_timeout: Maximal time, in seconds, to wait for a batch to
+                           fill up before exporting it.
+            max_queue_size: Maximal number of events waiting to be exported.
+        """
+
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if batch_timeout < 0:
+            raise ValueError("batch_timeout must be non-negative")
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size must be at least 1")
+
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.max_queue_size = max_queue_size
+
+    @abstractmethod
+    def export(self, events: list[str]):
+        """Export a batch of events, serialized as JSON documents."""
+
+    def close(self):
+        """Release the exporter's resources, once all events were exported."""
+
+
+class HttpExporter(Exporter):
+    """Exports batches of events to an insights endpoint, as JSON arrays, e.g. to
+    mirror events to a second Requesty project.
+    """
+
+    def __init__(self, *, client: AsyncClient, url: str = "insights", **options):
+        """
+        Args:
+            client: The client sending the requests, which the exporter closes.
+            url: The URL, relative to the client's base URL, to PUT batches to.
+            options: The queue options of `Exporter`.
+        """
+
+        super().__init__(**options)
+        self.__client = client
+        self.__url = url
+
+    def export(self, events: list[str]):
+        future: Future = self.__client.put(
+            url=self.__url, content="[" + ",".join(events) + "]"
+        )
+
+        response = future.result()
+        if isinstance(response, Exception):
+            raise AInsightsExportError(f"Export failed: {response}") from response
+        if response.status_code >= 400:
+            raise AInsightsExportError(f"Export failed: {response.status_code}")
+
+    def close(self):
+        self.__client.close()
+
+
+class NDJSONExporter(Exporter):
+    """Appends events to a file, one JSON document per line."""
+
+    def __init__(self, path: str, **options):
+        """
+        Args:
+            path: The path of the file, which is created if it doesn't exist.
+            options: The queue options of `Exporter`.
+        """
+
+        super().__init__(**options)
+        self.__file = open(path, "a", encoding="utf-8")
+
+    def export(self, events: list[str]):
+        self.__file.write("".join(event + "\n" for event in events))
+        self.__file.flush()
+
+    def close(self):
+        self.__file.close()
+
+
+class StdoutExporter(Exporter):
+    """Writes events to the standard output, one JSON document per line, e.g. to
+    be collected by a log shipper.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, **options):
+        """
+        Args:
+            stream: [Optional] the stream to write to instead of `sys.stdout`.
+            options: The queue options of `Exporter`.
+        """
+
+        super().__init__(**options)
+        self.__stream = stream
+
+    def export(self, events: list[str]):
+        # Looked up on every call, since sys.stdout may be replaced
+        stream = self.__stream if self.__stream is not None else sys.stdout
+        stream.write("".join(event + "\n" for event in events))
+        stream.flush()
+
+
+class InMemoryExporter(Exporter):
+    """Keeps the exported events in memory, e.g. to inspect them in tests."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.__lock = threading.Lock()
+        self.__events: list[str] = []
+
+    @property
+    def events(self) -> list[str]:
+        """A copy of the events exported so far."""
+
+        with self.__lock:
+            return list(self.__events)
+
+    def clear(self):
+        with self.__lock:
+            self.__events.clear()
+
+    def export(self, events: list[str]):
+        with self.__lock:
+            self.__events.extend(events)
+
+
+class CallbackExporter(Exporter):
+    """Passes batches of events to a callback."""
+
+    def __init__(self, callback: Callable[[list[str]], None], **options):
+        """
+        Args:
+            callback: Called with every batch of events, from the exporter's own
+                      thread. Exceptions it raises mark the batch as failed.
+            options: The queue options of `Exporter`.
+        """
+
+        super().__init__(**options)
+        self.__callback = callback
+
+    def export(self, events: list[str]):
+        self.__callback(events)
@@ -0,0 +1,246 @@
+import functools
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+import httpx
+from openai import AsyncOpenAI, NotGiven
+from openai.types.chat import ChatCompletion, ParsedChatCompletion
+
+from .client import _snapshot
+from .response_cache import ResponseCache
+from .stream import AsyncCapturedStream, CapturedStream
+
+# The times at which the responses of the instrumented call being made arrived
+_response_times: ContextVar[Optional[list[float]]] = ContextVar(
+    "requestyai_response_times", default=None
+)
+
+# Arguments of the OpenAI client that configure the request, not the model
+_REQUEST_ARGS = frozenset(
+    ("messages", "extra_headers", "extra_query", "extra_body", "timeout")
+)
+
+
+def _on_response(response: httpx.Response):
+    # Called once the response headers arrived, before its body is read
+    times = _response_times.get()
+    if times is not None:
+        times.append(time.monotonic())
+
+
+async def _on_async_response(response: httpx.Response):
+    _on_response(response)
+
+
+def _get_args(kwargs: dict) -> dict:
+    """The arguments of a call to capture, which must be serializable."""
+
+    # Omitted arguments may be passed explicitly as NOT_GIVEN, which isn't
+    # serializable
+    args = {
+        key: value
+        for key, value in kwargs.items()
+        if key not in _REQUEST_ARGS and not isinstance(value, NotGiven)
+    }
+
+    # `parse` takes the class of the structured output
+    response_format = args.get("response_format")
+    if isinstance(response_format, type):
+        args["response_format"] = {
+            "type": "json_schema",
+            "name": response_format.__name__,
+        }
+
+    return args
+
+
+class _Recorder:
+    """Captures the outcome of the calls of an instrumented OpenAI client.
+
+    Capturing must never break the instrumented calls, so the exceptions raised
+    while capturing are discarded.
+    """
+
+    def __init__(self, insights, meta: dict, is_async: bool):
+        self.__insights = insights
+        self.__meta = meta
+        self.__is_async = is_async
+
+    def on_response(self, kwargs: dict, started_at: float, times: list, response):
+        if kwargs.get("stream"):
+            return self.__wrap_stream(kwargs, started_at, response)
+
+        timing = {"latency": time.monotonic() - started_at}
+        if times:
+            timing["time_to_first_byte"] = times[-1] - started_at
+
+        self.__capture(kwargs, response, {**self.__meta, "timing": timing})
+        return response
+
+    def on_cached(self, kwargs: dict, started_at: float, response):
+        timing = {"latency": time.monotonic() - started_at}
+        self.__capture(
+            kwargs, response, {**self.__meta, "timing": timing, "cached": True}
+        )
+
+    def on_error(self, kwargs: dict, started_at: float, ex: Exception):
+        error = {
+            "type": type(ex).__name__,
+            "message": str(ex),
+            "status_code": getattr(ex, "status_code", None),
+        }
+
+        # Failed calls have no completion, so an empty one stands in for it
+        response = ChatCompletion(
+            id="",
+            choices=[],
+            created=int(time.time()),
+            model=str(kwargs.get("model", "")),
+            object="chat.completion",
+        )
+
+        timing = {"latency": time.monotonic() - started_at}
+        self.__capture(
+            kwargs, response, {**self.__meta, "timing": timing, "error": error}
+        )
+
+    def __wrap_stream(self, kwargs: dict, started_at: float, stream):
+        # The stream is of the OpenAI client's kind, whatever the insights client
+        stream_type = AsyncCapturedStream if self.__is_async else CapturedStream
+
+        # The messages may be modified while the completion is being streamed
+        kwargs = {**kwargs, "messages": _snapshot(kwargs.get("messages"))}
+
+        def capture(response: ChatCompletion, timing: dict):
+            self.__capture(kwargs, response, {**self.__meta, "stream": timing})
+
+        return stream_type(stream, capture, started_at)
+
+    def __capture(self, kwargs: dict, response, meta: dict):
+        try:
+            self.__insights.capture(
+                response=response,
+                messages=kwargs.get("messages"),
+                args=_get_args(kwargs),
+                meta=meta,
+                user_id=kwargs.get("user"),
+            )
+        except Exception:
+            pass
+
+
+def _get_response_type(name: str, kwargs: dict) -> type:
+    if name != "parse":
+        return ChatCompletion
+
+    response_format = kwargs.get("response_format")
+    if isinstance(response_format, type):
+        return ParsedChatCompletion[response_format]
+    return ParsedChatCompletion
+
+
+def _wrap(
+    name: str,
+    method: Callable,
+    recorder: _Recorder,
+    cache: Optional[ResponseCache],
+    is_async: bool,
+) -> Callable:
+    if is_async:
+
+        async def async_call(args, kwargs):
+            times = []
+            token = _response_times.set(times)
+            started_at = time.monotonic()
+            try:
+                response = await method(*args, **kwargs)
+            except Exception as ex:
+                recorder.on_error(kwargs, started_at, ex)
+                raise
+            finally:
+                _response_times.reset(token)
+
+            return recorder.on_response(kwargs, started_at, times, response)
+
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            if cache is None or kwargs.get("stream"):
+                return await async_call(args, kwargs)
+
+            started_at = time.monotonic()
+            response, cached = await cache.aget_or_call(
+                ResponseCache.key(name, kwargs),
+                _get_response_type(name, kwargs),
+                lambda: async_call(args, kwargs),
+            )
+            if cached:
+                recorder.on_cached(kwargs, started_at, response)
+            return response
+
+        return async_wrapper
+
+    def call(args, kwargs):
+        times = []
+        token = _response_times.set(times)
+        started_at = time.monotonic()
+        try:
+            response = method(*args, **kwargs)
+        except Exception as ex:
+            recorder.on_error(kwargs, started_at, ex)
+            raise
+        finally:
+            _response_times.reset(token)
+
+        return recorder.on_response(kwargs, started_at, times, response)
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if cache is None or kwargs.get("stream"):
+            return call(args, kwargs)
+
+        started_at = time.monotonic()
+        response, cached = cache.get_or_call(
+            ResponseCache.key(name, kwargs),
+            _get_response_type(name, kwargs),
+            lambda: call(args, kwargs),
+        )
+        if cached:
+            recorder.on_cached(kwargs, started_at, response)
+        return response
+
+    return wrapper
+
+
+def instrument(
+    openai_client, insights, meta: dict, cache: Optional[ResponseCache] = None
+):
+    """Capture all the chat completions of an OpenAI client using `insights`.
+
+    See `AInsights.instrument` for a detailed description.
+    """
+
+    resources = [openai_client.chat.completions]
+    beta = getattr(getattr(openai_client, "beta", None), "chat", None)
+    if beta is not None:
+        resources.append(beta.completions)
+
+    # Wrappers are set on the resources themselves, shadowing their methods
+    if any("create" in vars(resource) for resource in resources):
+        raise ValueError("The OpenAI client is already instrumented")
+
+    is_async = isinstance(openai_client, AsyncOpenAI)
+    recorder = _Recorder(insights, meta, is_async)
+    for resource in resources:
+        for name in ("create", "parse"):
+            method = getattr(resource, name, None)
+            if method is not None:
+                wrapper = _wrap(name, method, recorder, cache, is_async)
+                setattr(resource, name, wrapper)
+
+    # Time the responses' first byte through the client's own HTTP client
+    http_client = getattr(openai_client, "_client", None)
+    if isinstance(http_client, httpx.AsyncClient):
+        http_client.event_hooks["response"].append(_on_async_response)
+    elif isinstance(http_client, httpx.Client):
+        http_client.event_hooks["response"].append(_on_response)
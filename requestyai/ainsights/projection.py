@@ -0,0 +1,139 @@
+import hashlib
+from typing import Optional
+
+from .types.event import AInsightsEvent
+
+
+class Projection:
+    """Bounds the size of events by slimming them down before serialization.
+
+    All limits are optional:
+        - `max_turns` keeps only the last turns of the conversation, i.e. its
+          last messages, besides system and developer messages.
+        - `max_message_chars` truncates the content of every message.
+        - `max_field_chars` replaces the longer strings of `template`, `inputs`
+          and `args`, such as retrieved documents, by their SHA-256 hash.
+        - `drop_logprobs` removes the log probabilities of the response.
+
+    Events are never modified in place, since they share the objects passed to
+    `capture`, including the response, which may still be used by the caller.
+    """
+
+    # Roles of the messages that set up the conversation, rather than turns
+    __SETUP_ROLES = frozenset(("system", "developer"))
+
+    def __init__(
+        self,
+        *,
+        max_turns: Optional[int] = None,
+        max_message_chars: Optional[int] = None,
+        max_field_chars: Optional[int] = None,
+        drop_logprobs: bool = False,
+    ):
+        """
+        Args:
+            max_turns: [Optional] maximal number of messages kept, not counting
+                       system and developer messages.
+            max_message_chars: [Optional] maximal number of characters kept of
+                               every message.
+            max_field_chars: [Optional] length beyond which the strings of
+                             `template`, `inputs` and `args` are hashed.
+            drop_logprobs: Whether to remove the log probabilities of the
+                           response's choices.
+        """
+
+        if max_turns is not None and max_turns < 0:
+            raise ValueError("max_turns must be non-negative")
+        if max_message_chars is not None and max_message_chars < 0:
+            raise ValueError("max_message_chars must be non-negative")
+        if max_field_chars is not None and max_field_chars < 0:
+            raise ValueError("max_field_chars must be non-negative")
+
+        self.__max_turns = max_turns
+        self.__max_message_chars = max_message_chars
+        self.__max_field_chars = max_field_chars
+        self.__drop_logprobs = drop_logprobs
+
+    def apply(self, event: AInsightsEvent) -> AInsightsEvent:
+        """Project an event, returning a copy if anything was changed."""
+
+        update = {}
+
+        if self.__max_turns is not None or self.__max_message_chars is not None:
+            update["messages"] = self.__project_messages(event.messages)
+
+        if self.__max_field_chars is not None:
+            update["template"] = self.__hash_strings(event.template)
+            update["inputs"] = self.__hash_strings(event.inputs)
+            update["args"] = self.__hash_strings(event.args)
+
+        choices = event.response.choices
+        if self.__drop_logprobs and any(c.logprobs is not None for c in choices):
+            choices = [
+                choice.model_copy(update={"logprobs": None}) for choice in choices
+            ]
+            update["response"] = event.response.model_copy(update={"choices": choices})
+
+        return event.model_copy(update=update) if update else event
+
+    def __project_messages(self, messages):
+        if isinstance(messages, str):
+            return self.__truncate(messages)
+        if messages is None:
+            return None
+
+        if self.__max_turns is not None:
+            # Keep the setup messages, along with the last `max_turns` turns
+            kept, turns = [], self.__max_turns
+            for message in reversed(messages):
+                if self.__is_setup(message):
+                    kept.append(message)
+                elif turns > 0:
+                    kept.append(message)
+                    turns -= 1
+            messages = kept[::-1]
+
+        return [self.__project_message(message) for message in messages]
+
+    def __is_setup(self, message) -> bool:
+        return isinstance(message, dict) and message.get("role") in self.__SETUP_ROLES
+
+    def __project_message(self, message):
+        if isinstance(message, str):
+            return self.__truncate(message)
+        if not isinstance(message, dict):
+            return message
+
+        content = message.get("content")
+        if isinstance(content, str):
+            content = self.__truncate(content)
+        elif isinstance(content, list):
+            content = [
+                {**part, "text": self.__truncate(part["text"])}
+                if isinstance(part, dict) and isinstance(part.get("text"), str)
+                else part
+                for part in content
+            ]
+        else:
+            return message
+
+        return {**message, "content": content}
+
+    def __truncate(self, text: str) -> str:
+        limit = self.__max_message_chars
+        if limit is None or len(text) <= limit:
+            return text
+
+        return f"{text[:limit]}[... {len(text) - limit} chars truncated]"
+
+    def __hash_strings(self, value):
+        if isinstance(value, str):
+            if len(value) <= self.__max_field_chars:
+                return value
+            digest = hashlib.sha256(value.encode()).hexdigest()
+            return f"[sha256:{digest}, {len(value)} chars]"
+        if isinstance(value, dict):
+            return {key: self.__hash_strings(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.__hash_strings(item) for item in value]
+        return value
@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from ..http.fork import reset_after_fork
+
+# Arguments that don't change the completion. The `extra_*` ones may, e.g. by
+# passing provider or routing parameters, so they're part of the key.
+_IGNORED_ARGS = frozenset(("stream", "user", "timeout"))
+
+
+def _to_json(value):
+    # Structured outputs are keyed by their schema, rather than their class
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return value.model_json_schema()
+    return repr(value)
+
+
+class ResponseCache:
+    """Caches the completions of identical requests, i.e. with the same messages
+    and arguments, for `ttl` seconds.
+
+    Completions are kept serialized in memory, evicting the least recently used
+    ones beyond `max_entries` entries or `max_bytes` bytes, counting the length
+    of their JSON. If `path` is provided, they're also kept in an SQLite
+    database, which survives restarts and can be shared by several processes.
+
+    Identical requests made concurrently are coalesced: only the first one is
+    sent, and the others wait for its completion.
+    """
+
+    DEFAULT_TTL = 3600.0
+    DEFAULT_MAX_ENTRIES = 1024
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    # Expired rows are purged from the database every so many writes
+    __PURGE_INTERVAL = 1000
+
+    def __init__(
+        self,
+        *,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        path: Optional[str] = None,
+    ):
+        """
+        Args:
+            ttl: Time, in seconds, completions are cached for.
+            max_entries: Maximal number of completions cached in memory.
+            max_bytes: Maximal total size, in bytes, of the completions cached
+                       in memory.
+            path: [Optional] the path of an SQLite database caching completions
+                  on disk. Completions are only cached in memory if not provided.
+        """
+
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+
+        self.__ttl = ttl
+        self.__max_entries = max_entries
+        self.__max_bytes = max_bytes
+        self.__path = path
+
+        self.__reset()
+
+        reset_after_fork(self)
+
+    def __reset(self):
+        self.__lock = threading.Lock()
+        # (expires at, value) by key, least recently used first
+        self.__entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.__bytes = 0
+
+        # Requests being sent, by key
+        self.__flights: dict[str, Future] = {}
+        self.__async_flights: dict[str, asyncio.Future] = {}
+
+        self.__db: Optional[sqlite3.Connection] = None
+        self.__writes = 0
+        if self.__path is not None:
+            self.__db = sqlite3.connect(self.__path, check_same_thread=False)
+            with self.__db:
+                self.__db.execute(
+                    "CREATE TABLE IF NOT EXISTS completions "
+                    "(key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+                )
+
+    def _after_fork_in_child(self):
+        """Reset the cache in a forked child process, including its database
+        connection.
+        """
+
+        self.__reset()
+
+    def close(self):
+        """Close the database, if any."""
+
+        with self.__lock:
+            if self.__db is not None:
+                self.__db.close()
+                self.__db = None
+
+    @staticmethod
+    def key(method: str, kwargs: dict) -> str:
+        """The cache key of a call of the OpenAI client."""
+
+        request = {
+            key: value for key, value in kwargs.items() if key not in _IGNORED_ARGS
+        }
+        request["$method"] = method
+
+        text = json.dumps(request, sort_keys=True, default=_to_json)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """The serialized completion cached for a key, if any."""
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if time.monotonic() < expires_at:
+                    self.__entries.move_to_end(key)
+                    return value
+                self.__remove(key)
+
+            if self.__db is None:
+                return None
+
+            row = self.__db.execute(
+                "SELECT expires_at, value FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None or row[0] <= time.time():
+            return None
+
+        self.__put_in_memory(key, row[1], ttl=row[0] - time.time())
+        return row[1]
+
+    def put(self, key: str, value: str):
+        """Cache a serialized completion."""
+
+        self.__put_in_memory(key, value, ttl=self.__ttl)
+
+        with self.__lock:
+            if self.__db is None:
+                return
+
+            with self.__db:
+                self.__db.execute(
+                    "INSERT OR REPLACE INTO completions VALUES (?, ?, ?)",
+                    (key, time.time() + self.__ttl, value),
+                )
+
+                self.__writes += 1
+                if self.__writes % self.__PURGE_INTERVAL == 0:
+                    self.__db.execute(
+                        "DELETE FROM completions WHERE expires_at <= ?", (time.time(),)
+                    )
+
+    def get_or_call(
+        self, key: str, response_type: type[BaseModel], call: Callable[[], BaseModel]
+    ) -> tuple[BaseModel, bool]:
+        """The completion cached for a key, or the one returned by `call`.
+
+        Concurrent calls for the same key wait for the first one's completion.
+
+        Returns:
+            tuple: The completion, and whether it was cached, i.e. `call` wasn't
+                   called.
+        """
+
+        value = self.get(key)
+        if value is not None:
+            return response_type.model_validate_json(value), True
+
+        with self.__lock:
+            flight = self.__flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.__flights[key] = Future()
+
+        if not leader:
+            return response_type.model_validate_json(flight.result()), True
+
+        try:
+            response = call()
+            value = response.model_dump_json(warnings=False)
+            self.put(key, value)
+            flight.set_result(value)
+            return response, False
+        except BaseException as ex:
+            flight.set_exception(ex)
+            raise
+        finally:
+            with self.__lock:
+                del self.__flights[key]
+
+    async def aget_or_call(
+        self,
+        key: str,
+        response_type: type[BaseModel],
+        call: Callable[[], Awaitable[BaseModel]],
+    ) -> tuple[BaseModel, bool]:
+        """The asyncio counterpart of `get_or_call`."""
+
+        value = self.get(key)
+        if value is not None:
+            return response_type.model_validate_json(value), True
+
+        flight = self.__async_flights.get(key)
+        if flight is not None:
+            value = await asyncio.shield(flight)
+            return response_type.model_validate_json(value), True
+
+        flight = self.__async_flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            response = await call()
+            value = response.model_dump_json(warnings=False)
+            self.put(key, value)
+            flight.set_result(value)
+            return response, False
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as ex:
+            flight.set_exception(ex)
+            # Don't warn about the exception if no other request waited for it
+            flight.exception()
+            raise
+        finally:
+            del self.__async_flights[key]
+
+    def __put_in_memory(self, key: str, value: str, ttl: float):
+        size = len(value)
+        if size > self.__max_bytes:
+            return
+
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+
+            self.__entries[key] = (time.monotonic() + ttl, value)
+            self.__bytes += size
+
+            while (
+                len(self.__entries) > self.__max_entries
+                or self.__bytes > self.__max_bytes
+            ):
+                self.__remove(next(iter(self.__entries)))
+
+    def __remove(self, key: str):
+        _, value = self.__entries.pop(key)
+        self.__bytes -= len(value)
@@ -0,0 +1,130 @@
+import hashlib
+import random
+from typing import TYPE_CHECKING, Callable, Iterable, NamedTuple, Optional, Union
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion
+
+
+class Capture(NamedTuple):
+    """The raw arguments of a `capture` call, before they're validated and
+    serialized into an event.
+    """
+
+    response: "ChatCompletion"
+    messages: Union[None, str, list[str], list[dict]]
+    template: Union[None, str, list[str], list[dict]]
+    inputs: dict
+    args: dict
+    meta: dict
+    user_id: Optional[str]
+
+    @property
+    def model(self) -> Optional[str]:
+        """The requested model, or the one reported by the response."""
+
+        return self.args.get("model") or getattr(self.response, "model", None)
+
+
+class Sampler:
+    """Decides which captured events are sent, before they cost anything more.
+
+    Every capture goes through the following steps, and the first one that
+    reaches a decision wins:
+        1. Captures matching any of the `drop_if` predicates are discarded.
+        2. Captures matching any of the `keep_if` predicates, or with a choice
+           whose finish reason is one of `keep_finish_reasons`, are kept.
+        3. Captures are kept with the sampling rate of the first matching entry
+           of `meta_rates`, then of `model_rates`, and `rate` otherwise.
+
+    Sampling is deterministic by `user_id`: a user's captures are either all
+    kept or all discarded at a given rate, so their sessions stay complete.
+    Captures without a `user_id` are sampled at random.
+
+    Predicates get a `Capture`, and must be cheap and thread-safe. For example,
+    to keep all the slow interactions whose latency is passed in `meta`:
+        Sampler(rate=0.1, keep_if=[lambda c: c.meta.get("latency", 0) > 5.0])
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = 1.0,
+        model_rates: Optional[dict[str, float]] = None,
+        meta_rates: Optional[dict[str, dict[str, float]]] = None,
+        keep_finish_reasons: Iterable[str] = (),
+        keep_if: Iterable[Callable[[Capture], bool]] = (),
+        drop_if: Iterable[Callable[[Capture], bool]] = (),
+    ):
+        """
+        Args:
+            rate: The fraction, between 0 and 1, of captures to keep by default.
+            model_rates: [Optional] the sampling rate of specific models, by the
+                         `model` argument, or the response's model otherwise.
+            meta_rates: [Optional] the sampling rate of captures by meta tag, as
+                        `{key: {value: rate}}`.
+            keep_finish_reasons: Always keep captures with a choice that finished
+                                 for one of these reasons, e.g. "length" or
+                                 "content_filter".
+            keep_if: Always keep captures matching any of these predicates.
+            drop_if: Always discard captures matching any of these predicates.
+        """
+
+        model_rates = model_rates or {}
+        meta_rates = meta_rates or {}
+
+        rates = [rate, *model_rates.values()]
+        rates.extend(rate for values in meta_rates.values() for rate in values.values())
+        if any(not 0 <= rate <= 1 for rate in rates):
+            raise ValueError("Sampling rates must be between 0 and 1")
+
+        self.__rate = rate
+        self.__model_rates = model_rates
+        self.__meta_rates = meta_rates
+        self.__keep_finish_reasons = frozenset(keep_finish_reasons)
+        self.__keep_if = tuple(keep_if)
+        self.__drop_if = tuple(drop_if)
+
+    def sample(self, capture: Capture) -> bool:
+        """Whether to keep, i.e. send, a capture."""
+
+        if any(predicate(capture) for predicate in self.__drop_if):
+            return False
+        if self.__keep_finish_reasons and any(
+            choice.finish_reason in self.__keep_finish_reasons
+            for choice in capture.response.choices
+        ):
+            return True
+        if any(predicate(capture) for predicate in self.__keep_if):
+            return True
+
+        rate = self.__get_rate(capture)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+
+        return self.__get_score(capture.user_id) < rate
+
+    def __get_rate(self, capture: Capture) -> float:
+        for key, rates in self.__meta_rates.items():
+            value = capture.meta.get(key)
+            if isinstance(value, str) and value in rates:
+                return rates[value]
+
+        if self.__model_rates:
+            model = capture.model
+            if model in self.__model_rates:
+                return self.__model_rates[model]
+
+        return self.__rate
+
+    @staticmethod
+    def __get_score(user_id: Optional[str]) -> float:
+        """A number in [0, 1), uniformly distributed across users."""
+
+        if user_id is None:
+            return random.random()
+
+        digest = hashlib.blake2b(user_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2**64
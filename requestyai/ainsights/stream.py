@@ -0,0 +1,278 @@
+import time
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from openai.types.chat import (
+    ChatCompletion,
+    ChatCompletionChunk,
+    ChatCompletionMessage,
+    ChatCompletionMessageToolCall,
+)
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+
+class _ChoiceAssembler:
+    """The deltas of a single choice, assembled as they arrive."""
+
+    __slots__ = ("content", "refusal", "tool_calls", "finish_reason")
+
+    def __init__(self):
+        self.content: list[str] = []
+        self.refusal: list[str] = []
+        # [id, name, arguments] by index
+        self.tool_calls: dict[int, list] = {}
+        self.finish_reason: Optional[str] = None
+
+    def add(self, choice):
+        delta = choice.delta
+        if delta.content:
+            self.content.append(delta.content)
+        if delta.refusal:
+            self.refusal.append(delta.refusal)
+
+        for tool_call in delta.tool_calls or ():
+            call = self.tool_calls.get(tool_call.index)
+            if call is None:
+                call = self.tool_calls[tool_call.index] = [tool_call.id, "", []]
+            elif tool_call.id:
+                call[0] = tool_call.id
+
+            function = tool_call.function
+            if function is not None:
+                if function.name:
+                    call[1] += function.name
+                if function.arguments:
+                    call[2].append(function.arguments)
+
+        if choice.finish_reason is not None:
+            self.finish_reason = choice.finish_reason
+
+    def build(self, index: int) -> Choice:
+        tool_calls = [
+            ChatCompletionMessageToolCall(
+                id=call_id or "",
+                type="function",
+                function=Function(name=name, arguments="".join(arguments)),
+            )
+            for call_id, name, arguments in (
+                self.tool_calls[key] for key in sorted(self.tool_calls)
+            )
+        ]
+        message = ChatCompletionMessage(
+            role="assistant",
+            content="".join(self.content) if self.content else None,
+            refusal="".join(self.refusal) if self.refusal else None,
+            tool_calls=tool_calls or None,
+        )
+
+        # Streams that didn't complete have no finish reason, which the
+        # completion type doesn't allow, hence the unvalidated construction
+        return Choice.model_construct(
+            finish_reason=self.finish_reason,
+            index=index,
+            logprobs=None,
+            message=message,
+        )
+
+
+class _StreamAssembler:
+    """Assembles the chunks of a streamed chat completion, and times them."""
+
+    def __init__(self, started_at: Optional[float]):
+        self.__started_at = started_at if started_at is not None else time.monotonic()
+        self.__first_token_at: Optional[float] = None
+        self.__last_token_at: Optional[float] = None
+        self.__max_gap = 0.0
+        self.__chunks = 0
+        self.__tokens = 0
+
+        self.__chunk: Optional[ChatCompletionChunk] = None
+        self.__usage = None
+        self.__choices: dict[int, _ChoiceAssembler] = {}
+
+    def add(self, chunk: ChatCompletionChunk, now: float):
+        # Some providers start with a chunk that doesn't identify the completion
+        if self.__chunk is None or not self.__chunk.id:
+            self.__chunk = chunk
+        self.__chunks += 1
+
+        if chunk.usage is not None:
+            self.__usage = chunk.usage
+
+        for choice in chunk.choices:
+            assembler = self.__choices.get(choice.index)
+            if assembler is None:
+                assembler = self.__choices[choice.index] = _ChoiceAssembler()
+            assembler.add(choice)
+
+            delta = choice.delta
+            if delta.content or delta.refusal or delta.tool_calls:
+                if self.__first_token_at is None:
+                    self.__first_token_at = now
+                else:
+                    self.__max_gap = max(self.__max_gap, now - self.__last_token_at)
+                self.__last_token_at = now
+                self.__tokens += 1
+
+    def build(self, *, completed: bool) -> Optional[tuple[ChatCompletion, dict]]:
+        """The assembled completion and its timing, or None if no chunk arrived."""
+
+        if self.__chunk is None:
+            return None
+
+        first = self.__chunk
+        completion = ChatCompletion(
+            id=first.id,
+            choices=[
+                self.__choices[index].build(index) for index in sorted(self.__choices)
+            ],
+            created=first.created,
+            model=first.model,
+            object="chat.completion",
+            service_tier=first.service_tier,
+            system_fingerprint=first.system_fingerprint,
+            usage=self.__usage,
+        )
+
+        timing = {
+            "duration": time.monotonic() - self.__started_at,
+            "chunks": self.__chunks,
+            "completed": completed,
+        }
+        if self.__first_token_at is not None:
+            tokens_time = self.__last_token_at - self.__first_token_at
+            timing["time_to_first_token"] = self.__first_token_at - self.__started_at
+            timing["inter_token_latency"] = tokens_time / max(1, self.__tokens - 1)
+            timing["max_inter_token_latency"] = self.__max_gap
+
+        return completion, timing
+
+
+class CapturedStream:
+    """Passes the chunks of a streamed chat completion through, and captures
+    the assembled completion once the stream ends, fails or is closed.
+
+    Capturing must never break the iteration over the stream, so the exceptions
+    raised while capturing are discarded.
+    """
+
+    def __init__(
+        self,
+        stream: Iterator[ChatCompletionChunk],
+        capture: Callable[[ChatCompletion, dict], None],
+        started_at: Optional[float] = None,
+    ):
+        self.__done = False
+        self.__stream = stream
+        self.__capture = capture
+        self.__assembler = _StreamAssembler(started_at)
+        self.__iterator = iter(stream)
+
+    def __iter__(self) -> "CapturedStream":
+        return self
+
+    def __next__(self) -> ChatCompletionChunk:
+        try:
+            chunk = next(self.__iterator)
+        except StopIteration:
+            self.__finish(completed=True)
+            raise
+        except BaseException:
+            self.__finish(completed=False)
+            raise
+
+        self.__assembler.add(chunk, time.monotonic())
+        return chunk
+
+    def __enter__(self) -> "CapturedStream":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # Abandoned without being closed
+        self.__finish(completed=False)
+
+    def close(self):
+        """Close the underlying stream, and capture what it streamed so far."""
+
+        self.__finish(completed=False)
+        close = getattr(self.__stream, "close", None)
+        if close is not None:
+            close()
+
+    def __finish(self, *, completed: bool):
+        if self.__done:
+            return
+        self.__done = True
+
+        try:
+            result = self.__assembler.build(completed=completed)
+            if result is not None:
+                self.__capture(*result)
+        except Exception:
+            pass
+
+
+class AsyncCapturedStream:
+    """The asyncio counterpart of `CapturedStream`."""
+
+    def __init__(
+        self,
+        stream: AsyncIterator[ChatCompletionChunk],
+        capture: Callable[[ChatCompletion, dict], None],
+        started_at: Optional[float] = None,
+    ):
+        self.__done = False
+        self.__stream = stream
+        self.__capture = capture
+        self.__assembler = _StreamAssembler(started_at)
+        self.__iterator = stream.__aiter__()
+
+    def __aiter__(self) -> "AsyncCapturedStream":
+        return self
+
+    async def __anext__(self) -> ChatCompletionChunk:
+        try:
+            chunk = await self.__iterator.__anext__()
+        except StopAsyncIteration:
+            self.__finish(completed=True)
+            raise
+        except BaseException:
+            self.__finish(completed=False)
+            raise
+
+        self.__assembler.add(chunk, time.monotonic())
+        return chunk
+
+    async def __aenter__(self) -> "AsyncCapturedStream":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def __del__(self):
+        # Abandoned without being closed, which can only be captured while the
+        # event loop is still running
+        self.__finish(completed=False)
+
+    async def close(self):
+        """Close the underlying stream, and capture what it streamed so far."""
+
+        self.__finish(completed=False)
+        close = getattr(self.__stream, "close", None)
+        if close is not None:
+            await close()
+
+    def __finish(self, *, completed: bool):
+        if self.__done:
+            return
+        self.__done = True
+
+        try:
+            result = self.__assembler.build(completed=completed)
+            if result is not None:
+                self.__capture(*result)
+        except Exception:
+            pass
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Union
+
+import httpx
+
+from ..http.fork import reset_after_fork
+from .types.event import AInsightsDedupedEvent, AInsightsEvent
+
+
+class TemplateCache:
+    """Deduplicates the large values repeated across events, such as templates,
+    system prompts and tool schemas, by sending them once and referencing them
+    by their SHA-256 digest afterwards.
+
+    The cache remembers the digests of the last `max_entries` values it sent,
+    assuming the server knows them. If the server doesn't know some of the
+    references of an event, it answers with UNKNOWN_REFERENCE_STATUS and a JSON
+    body listing them as `unknown_references`, and the event is sent again
+    along with the definitions of all of its references.
+    """
+
+    DEFAULT_MAX_ENTRIES = 1024
+    DEFAULT_MIN_SIZE = 1024
+    UNKNOWN_REFERENCE_STATUS = 409
+
+    # Arguments holding tool schemas, which are repeated by every call
+    __SCHEMA_ARGS = ("tools", "functions", "response_format")
+
+    # Roles of the messages holding system prompts
+    __SETUP_ROLES = frozenset(("system", "developer"))
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        min_size: int = DEFAULT_MIN_SIZE,
+    ):
+        """
+        Args:
+            max_entries: Maximal number of digests remembered.
+            min_size: Minimal size, in characters, of the deduplicated values.
+        """
+
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if min_size < 0:
+            raise ValueError("min_size must be non-negative")
+
+        self.__max_entries = max_entries
+        self.__min_size = min_size
+
+        self.__lock = threading.Lock()
+        self.__sent: OrderedDict[str, None] = OrderedDict()
+
+        reset_after_fork(self)
+
+    def _after_fork_in_child(self):
+        """Reset the lock in a forked child process. The server still knows the
+        same values.
+        """
+
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__sent)
+
+    def apply(self, event: AInsightsEvent) -> tuple[AInsightsEvent, dict[str, Any]]:
+        """Replace the large values of an event by references.
+
+        Returns:
+            tuple: The deduplicated event, or the event itself if it has nothing
+                   to deduplicate, and the values it references, by digest.
+        """
+
+        references: dict[str, Any] = {}
+        definitions: dict[str, Any] = {}
+
+        def reference(value, text: str):
+            if len(text) < self.__min_size:
+                return value
+
+            digest = f"sha256:{hashlib.sha256(text.encode()).hexdigest()}"
+            references[digest] = value
+            if not self.__mark_sent(digest):
+                definitions[digest] = value
+            return f"$ref:{digest}"
+
+        template = event.template
+        if isinstance(template, str):
+            template = reference(template, template)
+        elif isinstance(template, list):
+            template = [self.__dedup_message(item, reference) for item in template]
+
+        messages = event.messages
+        if isinstance(messages, list):
+            messages = [
+                self.__dedup_message(message, reference)
+                if isinstance(message, dict)
+                and message.get("role") in self.__SETUP_ROLES
+                else message
+                for message in messages
+            ]
+
+        args = event.args
+        if any(key in args for key in self.__SCHEMA_ARGS):
+            args = dict(args)
+            for key in self.__SCHEMA_ARGS:
+                value = args.get(key)
+                if isinstance(value, (dict, list)):
+                    args[key] = reference(value, self.__canonical_json(value))
+
+        if not references:
+            return event, references
+
+        fields = dict(event)
+        fields.update(template=template, messages=messages, args=args)
+        return (
+            AInsightsDedupedEvent.model_construct(**fields, definitions=definitions),
+            references,
+        )
+
+    def get_unknown_references(
+        self, response: Union[httpx.Response, Exception], references: dict[str, Any]
+    ) -> list[str]:
+        """The references of an event the server reported as unknown.
+
+        Args:
+            response: The response to the event, or the exception returned
+                      instead.
+            references: The values referenced by the event, by digest.
+        """
+
+        if (
+            isinstance(response, Exception)
+            or response.status_code != self.UNKNOWN_REFERENCE_STATUS
+        ):
+            return []
+
+        try:
+            unknown = response.json()["unknown_references"]
+        except (ValueError, KeyError, TypeError):
+            # Assume the worst if the server didn't say which ones
+            return list(references)
+
+        return [digest for digest in unknown if digest in references]
+
+    def forget(self, digests: list[str]):
+        """Forget values the server doesn't know, so that they're sent again."""
+
+        with self.__lock:
+            for digest in digests:
+                self.__sent.pop(digest, None)
+
+    def __mark_sent(self, digest: str) -> bool:
+        """Remember a digest, returning whether it was already sent."""
+
+        with self.__lock:
+            if digest in self.__sent:
+                self.__sent.move_to_end(digest)
+                return True
+
+            self.__sent[digest] = None
+            if len(self.__sent) > self.__max_entries:
+                self.__sent.popitem(last=False)
+            return False
+
+    @staticmethod
+    def __dedup_message(message, reference):
+        if isinstance(message, str):
+            return reference(message, message)
+        if isinstance(message, dict) and isinstance(message.get("content"), str):
+            content = message["content"]
+            return {**message, "content": reference(content, content)}
+        return message
+
+    @staticmethod
+    def __canonical_json(value) -> str:
+        try:
+            return json.dumps(value, sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return ""  # Not JSON serializable, e.g. a pydantic model class
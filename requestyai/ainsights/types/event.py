@@ -1,14 +1,47 @@
-from typing import Optional, Union
+from typing import TYPE_CHECKING, Any, Optional, Union
 
-from openai.types.chat import ChatCompletion
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion
 
 
 class AInsightsEvent(BaseModel):
-    response: ChatCompletion
+    # Validators and serializers are built on first use, not on import
+    model_config = ConfigDict(defer_build=True)
+
+    response: "ChatCompletion"
     messages: Union[None, str, list[str], list[dict]]
     template: Union[None, str, list[str], list[dict]]
     inputs: dict
     args: dict
     meta: dict
     user_id: Optional[str]
+
+    def __init__(self, **data):
+        if not AInsightsEvent.__pydantic_complete__:
+            _resolve_response_type()
+        super().__init__(**data)
+
+
+class AInsightsDedupedEvent(AInsightsEvent):
+    """An event whose large strings and tool schemas were replaced by references.
+
+    References are strings of the form `$ref:sha256:<hex digest>`. The values
+    referenced for the first time are included in `definitions`, by digest, and
+    the server is expected to remember them for the following events.
+    """
+
+    definitions: dict[str, Any]
+
+
+def _resolve_response_type():
+    """Resolve the `response` annotation of the events, on their first use, so
+    that openai, which is slow to import, is only imported then.
+    """
+
+    from openai.types.chat import ChatCompletion
+
+    namespace = {"ChatCompletion": ChatCompletion}
+    for model in (AInsightsEvent, AInsightsDedupedEvent):
+        model.model_rebuild(_types_namespace=namespace)
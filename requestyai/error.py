@@ -0,0 +1,6 @@
+class AInsightsError(Exception):
+    """Base exception class for AInsights-related errors, including those of the
+    dispatch pipeline in `requestyai.http`.
+    """
+
+    pass
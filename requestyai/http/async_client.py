@@ -1,19 +1,64 @@
+import random
 import threading
-from concurrent.futures import Future
-from datetime import datetime, timedelta
-from queue import Empty, Queue
-from typing import Optional
+import time
+from concurrent.futures import Future, wait
+from typing import Callable, Optional, Union
 
 import httpx
 
 from .atomic import AtomicFlag
+from .circuit_breaker import CircuitBreaker
+from .compressor import Compressor
+from .error import CircuitOpenError, DroppedError, SpooledError
+from .flush_result import FlushResult
+from .fork import reset_after_fork
+from .job_queue import JobQueue
+from .lazy_content import LazyContent
+from .metrics import DispatchStats, MetricsHooks, _Metrics
+from .overflow_policy import OverflowPolicy
+from .rate_limiter import RateLimiter
+from .retry_budget import RetryBudget
 from .retry_policy import RetryPolicy
 from .retry_transport import RetryTransport
+from .shutdown import Shutdown
+from .spool import Spool, SpoolRecord
+from .transport_options import default_limits, transport_options
+
+
+class _Job:
+    """A single HTTP call waiting to be dispatched by a worker."""
+
+    __slots__ = ("method", "args", "kwargs", "future", "enqueued_at")
+
+    def __init__(self, method: str, args: tuple, kwargs: dict, future: Future):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.enqueued_at = 0.0
+
+
+class _BatchItem:
+    """A single pre-serialized JSON document waiting to be sent as part of a batch."""
+
+    __slots__ = ("url", "data", "future", "enqueued_at")
+
+    def __init__(self, url: str, data: Union[str, LazyContent], future: Future):
+        self.url = url
+        self.data = data
+        self.future = future
+        self.enqueued_at = 0.0
 
 
 class AsyncClient:
     DEFAULT_TIMEOUT = 10.0
-    QUEUE_TIMEOUT = 0.1
+    DEFAULT_BATCH_SIZE = 1
+    DEFAULT_BATCH_TIMEOUT = 0.05
+    DEFAULT_WORKERS = 1
+    DEFAULT_MAX_QUEUE_SIZE = 0
+    DEFAULT_OVERFLOW_POLICY = OverflowPolicy.BLOCK
+    DEFAULT_OVERFLOW_TIMEOUT = 1.0
+    DEFAULT_REPLAY_RATE = 50.0
     SHUTDOWN_TIMEOUT = 3.0
 
     def __init__(
@@ -21,111 +66,715 @@ class AsyncClient:
         *,
         base_url: str,
         headers: dict,
-        timeout: float = DEFAULT_TIMEOUT,
+        timeout: Union[float, httpx.Timeout] = DEFAULT_TIMEOUT,
         retry_policy: Optional[RetryPolicy] = None,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
+        proxy: Optional[Union[str, httpx.Proxy]] = None,
+        local_address: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_timeout: float = DEFAULT_BATCH_TIMEOUT,
+        workers: int = DEFAULT_WORKERS,
+        max_in_flight: Optional[int] = None,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        overflow_policy: OverflowPolicy = DEFAULT_OVERFLOW_POLICY,
+        overflow_timeout: float = DEFAULT_OVERFLOW_TIMEOUT,
+        compressor: Optional[Compressor] = None,
+        spool: Optional[Spool] = None,
+        replay_rate: float = DEFAULT_REPLAY_RATE,
+        metrics: Optional[MetricsHooks] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        circuit_fallback: Optional[Callable[[SpoolRecord], None]] = None,
+        retry_budget: Optional[RetryBudget] = None,
     ):
-        retry_policy = retry_policy if retry_policy else RetryPolicy()
-        transport = RetryTransport(retry_policy=retry_policy)
+        """
+        Args:
+            base_url: The base URL all requests are relative to.
+            headers: Headers to send with every request.
+            timeout: Timeout, in seconds, of every request attempt, or an
+                     `httpx.Timeout` setting the connect, read, write and pool
+                     timeouts separately.
+            retry_policy: [Optional] the retry policy of failed requests,
+                          including the deadline of each request.
+            limits: [Optional] the limits of the connection pool, including the
+                    keep-alive expiry. By default, the pool keeps a connection
+                    alive per concurrent request.
+            http2: Whether to negotiate HTTP/2, multiplexing concurrent requests
+                   over a single connection. Requires the `h2` package.
+            proxy: [Optional] the URL of a proxy to send all requests through.
+            local_address: [Optional] the local IP address to connect from.
+            batch_size: Maximal number of items sent in a single batch request.
+            batch_timeout: Maximal time, in seconds, to wait for a batch to fill up.
+            workers: Number of worker threads dispatching queued jobs.
+                     All workers share a single connection pool.
+            max_in_flight: [Optional] maximal number of concurrent requests.
+                           Defaults to the number of workers. Setting it lower
+                           than `workers` lets idle workers collect the next
+                           batch while others are waiting on the network.
+            max_queue_size: Maximal number of queued jobs, or 0 for unbounded.
+            overflow_policy: What to do with new jobs when the queue is full:
+                - BLOCK: wait up to `overflow_timeout` seconds for room,
+                  then drop the new job. Jobs queued by the workers
+                  themselves, e.g. from a future's callback, don't wait.
+                - DROP_NEWEST: drop the new job.
+                - DROP_OLDEST: drop the oldest queued job to make room.
+                - SAMPLE: once the queue is half full, admit new jobs with a
+                  probability that decreases linearly to 0 as it fills up.
+            overflow_timeout: How long, in seconds, the BLOCK policy waits.
+            compressor: [Optional] compress request bodies before sending them.
+            spool: [Optional] a durable spool for requests that can't be delivered.
+            replay_rate: Maximal number of spooled requests replayed per second.
+            metrics: [Optional] hooks instrumenting the dispatch pipeline.
+                     Counters are available through `stats()` regardless.
+            rate_limiter: [Optional] an adaptive limit on the rate of requests,
+                          shared by all workers, which also makes them all
+                          honor the server's `Retry-After` hints.
+            circuit_breaker: [Optional] stop sending requests while the server
+                             keeps failing (network errors or 5xx responses).
+            circuit_fallback: [Optional] called with the requests rejected while
+                              the circuit is open. They're spooled if there's a
+                              spool, or dropped otherwise, if not provided.
+            retry_budget: [Optional] limit the retries of all workers together to
+                          a fraction of their requests.
+
+        Dropped jobs are counted by `dropped`, and their futures are resolved
+        immediately with a `DroppedError`.
+
+        If a spool is provided, requests with a body are written to it instead of
+        being dropped when the queue is full or the client is closed before they
+        were dispatched, as well as when they failed after all retries. Their
+        futures are resolved with a `SpooledError` in the first two
+        cases. Requests spooled by a previous client are replayed in the
+        background, at up to `replay_rate` requests per second.
+        """
 
-        self.__client = httpx.Client(
-            base_url=base_url,
-            headers=headers,
-            timeout=timeout,
-            transport=transport,
+        max_in_flight = max_in_flight if max_in_flight is not None else workers
+
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if batch_timeout < 0:
+            raise ValueError("batch_timeout must be non-negative")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        if max_queue_size < 0:
+            raise ValueError("max_queue_size must be non-negative")
+        if replay_rate <= 0:
+            raise ValueError("replay_rate must be positive")
+
+        options = transport_options(
+            limits=limits if limits is not None else default_limits(max_in_flight),
+            http2=http2,
+            proxy=proxy,
+            local_address=local_address,
         )
 
+        retry_policy = retry_policy if retry_policy else RetryPolicy()
+        event_hooks = {"request": [compressor]} if compressor else None
+
+        def new_http_client() -> httpx.Client:
+            transport = RetryTransport(
+                retry_policy=retry_policy,
+                metrics=self.__metrics,
+                rate_limiter=rate_limiter,
+                circuit_breaker=circuit_breaker,
+                retry_budget=retry_budget,
+                shutdown=self.__shutdown,
+                **options,
+            )
+            return httpx.Client(
+                base_url=base_url,
+                headers=headers,
+                timeout=timeout,
+                transport=transport,
+                event_hooks=event_hooks,
+            )
+
+        self.__hooks = metrics
+        self.__metrics = _Metrics(metrics)
+
+        self.__retry_policy = retry_policy
+        self.__rate_limiter = rate_limiter
+        self.__circuit_breaker = circuit_breaker
+        self.__circuit_fallback = circuit_fallback
+        self.__retry_budget = retry_budget
+        self.__new_http_client = new_http_client
+
+        self.__batch_size = batch_size
+        self.__batch_timeout = batch_timeout
+        self.__workers = workers
+        self.__max_in_flight = max_in_flight
+
+        self.__max_queue_size = max_queue_size
+        self.__overflow_policy = overflow_policy
+        self.__overflow_timeout = overflow_timeout
+
+        self.__spool = spool
+        self.__replay_rate = replay_rate
+
+        self.__init_dispatcher()
+        self.__client = new_http_client()
+        self.__start_dispatcher()
+
+        reset_after_fork(self)
+
+    def __init_dispatcher(self):
+        """Create the state of the dispatcher, without starting any threads."""
+
+        self.__in_flight = threading.BoundedSemaphore(self.__max_in_flight)
+
         self.__closing = AtomicFlag()
         self.__closed = threading.Event()
 
-        self.__queue = Queue()
+        self.__stop_replay = threading.Event()
+
+        self.__queue = JobQueue(maxsize=self.__max_queue_size)
+        self.__outstanding: set[Future] = set()
+        self.__outstanding_lock = threading.Lock()
+        self.__shutdown = Shutdown()
+
+        self.__threads = []
+        self.__replay_thread = None
+        self.__started = False
+        self.__start_lock = threading.Lock()
+
+    def __http_client(self) -> httpx.Client:
+        """The underlying client, which is only created on first use after a fork."""
+
+        with self.__start_lock:
+            if self.__client is None:
+                self.__client = self.__new_http_client()
+            return self.__client
+
+    def __start_dispatcher(self):
+        self.__http_client()
+
+        with self.__start_lock:
+            if self.__started:
+                return
+
+            self.__threads = [
+                threading.Thread(target=self._run_loop, daemon=True)
+                for _ in range(self.__workers)
+            ]
+            for thread in self.__threads:
+                thread.start()
+
+            if self.__spool is not None and self.__spool.pending_segments():
+                self.__replay_thread = threading.Thread(
+                    target=self._replay_loop, daemon=True
+                )
+                self.__replay_thread.start()
 
-        self.__thread = threading.Thread(target=self._run_loop, daemon=True)
-        self.__thread.start()
+            self.__started = True
+
+    def _after_fork_in_child(self):
+        """Reset the client in a forked child process.
+
+        The worker threads of the parent don't exist in the child, and its locks
+        may have been held by them at the time of the fork. The connection pool
+        is shared with the parent, so it's abandoned (and not closed, which would
+        disrupt the parent's connections). Jobs queued in the parent are left for
+        the parent to dispatch, and the spool is left for the parent to use.
+
+        A new connection pool and new workers are only created once the child
+        queues its first job. A client closed before the fork remains closed.
+        """
+
+        if self.__closed.is_set():
+            return
+
+        self.__metrics = _Metrics(self.__hooks)
+        self.__spool = None
+        self.__init_dispatcher()
+        self.__client = None
 
     @property
     def base_url(self):
-        return self.__client.base_url
+        return self.__http_client().base_url
 
     @property
     def headers(self):
-        return self.__client.headers
+        return self.__http_client().headers
 
     @property
     def timeout(self):
-        return self.__client.timeout
+        return self.__http_client().timeout
 
-    @staticmethod
-    def __should_run_loop(closing_ts, closing_delay):
-        # Common case, client wasn't closed
-        if closing_ts is None:
-            return True
+    @property
+    def batch_size(self) -> int:
+        return self.__batch_size
 
-        # Client was closed, but we allow it a grace period to dispatch everything
-        # that is still in the queue
-        if datetime.now() - closing_ts < closing_delay:
-            return True
+    @property
+    def batch_timeout(self) -> float:
+        return self.__batch_timeout
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    @property
+    def max_in_flight(self) -> int:
+        return self.__max_in_flight
 
-        return False
+    @property
+    def max_queue_size(self) -> int:
+        return self.__max_queue_size
+
+    @property
+    def overflow_policy(self) -> OverflowPolicy:
+        return self.__overflow_policy
+
+    @property
+    def dropped(self) -> int:
+        """The number of jobs dropped so far because the queue was full."""
+        return self.__metrics.dropped
+
+    @property
+    def spooled(self) -> int:
+        """The number of requests written to the spool so far."""
+        return self.__metrics.spooled
+
+    def drop_if_circuit_open(self) -> Optional[Future]:
+        """Drop a request before it's even built, if the circuit is open and it
+        would be dropped anyway, i.e. there's neither a fallback nor a spool to
+        hand it over to.
+
+        Returns:
+            Future: Already resolved with a `DroppedError`, or None if the
+                    request must be queued as usual.
+        """
+
+        breaker = self.__circuit_breaker
+        if (
+            breaker is None
+            or self.__circuit_fallback is not None
+            or self.__spool is not None
+            or not breaker.is_open()
+        ):
+            return None
+
+        reason = "Circuit is open"
+        self.__metrics.on_drop(reason)
+
+        future = Future()
+        future.set_result(DroppedError(reason))
+        return future
+
+    def stats(self) -> DispatchStats:
+        """A snapshot of the counters of the dispatch pipeline."""
+        return self.__metrics.snapshot(queue_size=self.__queue.qsize())
 
     def _run_loop(self):
-        """Process jobs in an infinite loop.
+        """Process jobs until the client is closed.
         Notes:
-        - Use custom logic to allow graceful dispatch of queued jobs up to
-        SHUTDOWN_TIMEOUT seconds.
+        - Idle workers block on the queue without polling. Closing the client
+        wakes them up, to dispatch whatever is still queued and exit.
+        - Queued jobs are dispatched for up to SHUTDOWN_TIMEOUT seconds after
+        the client was closed.
         - Catch all httpx.Client's exceptions by returning them as the future
         value, whereas other exceptions will cause the worker to stop.
+        - Batch items are coalesced with whatever else is queued (up to
+        `batch_size` items, waiting up to `batch_timeout` seconds) and sent
+        as a single request.
         """
 
-        closing_ts = None
-        closing_delay = timedelta(seconds=self.SHUTDOWN_TIMEOUT)
-
-        while self.__should_run_loop(closing_ts, closing_delay):
-            # Capture the timestamp the first time we see the flag set
-            if self.__closing.is_set() and closing_ts is None:
-                closing_ts = datetime.now()
+        while True:
+            job = self.__queue.get()
+            if job is None:  # The client was closed, and the queue is empty
+                break
 
             try:
-                job = self.__queue.get(timeout=self.QUEUE_TIMEOUT)
-            except Empty:
-                if self.__closing.is_set():
-                    break
+                if isinstance(job, _BatchItem):
+                    self.__dispatch_batch(job)
                 else:
-                    continue
-
-            try:
-                job()
-                self.__queue.task_done()
+                    self.__run_job(job)
             except Exception:
                 # Job expections should be caught inside the job and returned
                 # via the future object. If we get here, something bad happened.
                 break
 
-        self.__closed.set()
+            # Leave the rest to `close` once the grace period is over
+            deadline = self.__shutdown.deadline
+            if deadline is not None and time.monotonic() >= deadline:
+                break
 
-    def __put_job(self, method, *args, **kwargs) -> Future:
-        future = Future()
+    def __collect_batch(self, first: _BatchItem):
+        """Drain the queue into a batch that starts with `first`.
+
+        Returns the batch items and any regular jobs that were dequeued while
+        collecting, which the caller must run after dispatching the batch.
+        """
+
+        batch = [first]
+        jobs = []
+
+        # Don't linger for more items when we're shutting down. Closing the
+        # client also wakes up a lingering worker, if there's nothing left.
+        linger = 0.0 if self.__queue.closed else self.__batch_timeout
+        deadline = time.monotonic() + linger
+
+        while len(batch) < self.__batch_size:
+            job = self.__queue.get(timeout=deadline - time.monotonic())
+            if job is None:
+                break
+
+            if isinstance(job, _BatchItem):
+                batch.append(job)
+            else:
+                jobs.append(job)
+
+        return batch, jobs
+
+    def __dispatch_batch(self, first: _BatchItem):
+        batch, jobs = self.__collect_batch(first)
+
+        # Items are grouped by URL, preserving the order in which they were queued
+        groups: dict[str, list[_BatchItem]] = {}
+        for item in batch:
+            groups.setdefault(item.url, []).append(item)
+
+        for url, items in groups.items():
+            items = self.__render_batch(items)
+            if not items:
+                continue
+
+            if not self.__allow():
+                for item in items:
+                    self.__short_circuit(item)
+                continue
+
+            content = "[" + ",".join(item.data for item in items) + "]"
+            enqueued_at = min(item.enqueued_at for item in items)
+            result = self.__send(
+                len(items), enqueued_at, self.__client.put, url, content=content
+            )
+
+            if self.__spool is not None and self.__is_failure(result):
+                for item in items:
+                    self.__spool_record(SpoolRecord("PUT", url, item.data, True))
+
+            for item in items:
+                item.future.set_result(result)
+
+        for job in jobs:
+            self.__run_job(job)
+
+    @staticmethod
+    def __render_batch(items: list[_BatchItem]) -> list[_BatchItem]:
+        """Render the lazy items of a batch, resolving the ones that failed."""
+
+        rendered = []
+        for item in items:
+            if isinstance(item.data, LazyContent):
+                try:
+                    item.data = item.data.render()
+                except Exception as ex:
+                    item.future.set_result(ex)
+                    continue
+            rendered.append(item)
+
+        return rendered
+
+    def __run_job(self, job: _Job):
+        try:
+            kwargs = {
+                key: value.render() if isinstance(value, LazyContent) else value
+                for key, value in job.kwargs.items()
+            }
+        except Exception as ex:
+            job.future.set_result(ex)
+            return
+
+        if not self.__allow():
+            self.__short_circuit(_Job(job.method, job.args, kwargs, job.future))
+            return
 
-        def job():
+        method = getattr(self.__client, job.method)
+        result = self.__send(1, job.enqueued_at, method, *job.args, **kwargs)
+
+        if self.__spool is not None and self.__is_failure(result):
+            record = self.__to_record(_Job(job.method, job.args, kwargs, job.future))
+            if record is not None:
+                self.__spool_record(record)
+
+        job.future.set_result(result)
+
+    def __send(self, items: int, enqueued_at: float, method, *args, **kwargs):
+        """Send a request carrying `items` jobs, and record its metrics.
+
+        Returns:
+            The response, or the exception raised while sending the request.
+        """
+
+        with self.__in_flight:
+            self.__metrics.on_send()
+            start = time.monotonic()
             try:
                 result = method(*args, **kwargs)
             except Exception as ex:
                 result = ex
-            future.set_result(result)
+            latency = time.monotonic() - start
+
+        status_code = None if isinstance(result, Exception) else result.status_code
+        self.__metrics.on_request(
+            status_code=status_code,
+            items=items,
+            queue_latency=start - enqueued_at,
+            latency=latency,
+        )
 
-        self.__queue.put(job)
-        return future
+        if self.__circuit_breaker is not None:
+            if status_code is None or status_code >= 500:
+                self.__circuit_breaker.on_failure()
+            else:
+                self.__circuit_breaker.on_success()
+
+        return result
+
+    def __allow(self) -> bool:
+        """Whether the circuit breaker, if any, lets a request through."""
+        return self.__circuit_breaker is None or self.__circuit_breaker.allow()
+
+    def __short_circuit(self, job):
+        """Hand a job rejected by the open circuit over to the fallback, if any,
+        or spool or drop it otherwise.
+        """
+
+        if self.__circuit_fallback is None:
+            self.__drop(job, "Circuit is open")
+            return
+
+        try:
+            record = self.__to_record(job)
+            if record is not None:
+                self.__circuit_fallback(record)
+        except Exception as ex:
+            job.future.set_result(ex)
+            return
+
+        job.future.set_result(
+            CircuitOpenError("Circuit is open, request was passed to fallback")
+        )
+
+    def __is_failure(self, result) -> bool:
+        """Whether a request failed in a way that is worth retrying later."""
+
+        if isinstance(result, Exception):
+            return True
+        return result.status_code in self.__retry_policy.status_forcelist
+
+    @staticmethod
+    def __to_record(job) -> Optional[SpoolRecord]:
+        """Convert a job to a spool record, if it has a body that can be spooled."""
+
+        if isinstance(job, _BatchItem):
+            data = job.data
+            if isinstance(data, LazyContent):
+                data = data.render()
+            return SpoolRecord("PUT", job.url, data.encode(), True)
+
+        url = job.kwargs.get("url", job.args[0] if job.args else None)
+        body = job.kwargs.get("content", job.kwargs.get("data"))
+        if isinstance(body, LazyContent):
+            body = body.render()
+        if isinstance(body, str):
+            body = body.encode()
+
+        if not isinstance(url, str) or not isinstance(body, bytes):
+            return None
+        return SpoolRecord(job.method.upper(), url, body, False)
+
+    def __spool_record(self, record: SpoolRecord) -> bool:
+        if isinstance(record.body, str):
+            record = record._replace(body=record.body.encode())
+
+        try:
+            spooled = self.__spool.append(record)
+        except OSError:
+            spooled = False
+
+        if spooled:
+            self.__metrics.on_spool()
+        return spooled
+
+    def __drop(self, job, reason: str):
+        if self.__spool is not None:
+            try:
+                record = self.__to_record(job)
+            except Exception:
+                record = None
+
+            if record is not None and self.__spool_record(record):
+                job.future.set_result(SpooledError(reason))
+                return
+
+        self.__metrics.on_drop(reason)
+        job.future.set_result(DroppedError(reason))
+
+    def __should_sample(self) -> bool:
+        # Linearly decrease the admission probability from 1, when the queue is
+        # half full, to 0, when it's full
+        half = self.__max_queue_size / 2
+        excess = self.__queue.qsize() - half
+        if excess <= 0:
+            return True
+        return random.random() >= excess / half
+
+    def __discard_outstanding(self, future: Future):
+        with self.__outstanding_lock:
+            self.__outstanding.discard(future)
+
+    def __admit(self, job):
+        """Add a job to the queue, or drop it according to the overflow policy."""
+
+        if self.__circuit_breaker is not None and self.__circuit_breaker.is_open():
+            self.__short_circuit(job)
+            return
+
+        if self.__queue.closed:
+            self.__drop(job, "Client is closed")
+            return
+
+        if self.__max_queue_size <= 0:
+            if not self.__queue.put(job):
+                self.__drop(job, "Client is closed")
+            return
+
+        policy = self.__overflow_policy
+
+        if policy == OverflowPolicy.BLOCK:
+            # A worker waiting for room in its own queue may wait forever, e.g.
+            # when a future's callback queues another request
+            timeout = self.__overflow_timeout
+            if threading.current_thread() in self.__threads:
+                timeout = 0
+            if not self.__queue.put(job, timeout=timeout):
+                self.__drop(job, "Queue is full, timed out waiting for room")
+
+        elif policy == OverflowPolicy.DROP_OLDEST:
+            added, oldest = self.__queue.put_evicting(job)
+            if not added:
+                self.__drop(job, "Client is closed")
+            elif oldest is not None:
+                self.__drop(oldest, "Queue is full, evicted by a newer event")
+
+        elif policy == OverflowPolicy.SAMPLE and not self.__should_sample():
+            self.__drop(job, "Queue is filling up, event was sampled out")
+
+        else:  # OverflowPolicy.DROP_NEWEST, or admitted by OverflowPolicy.SAMPLE
+            if not self.__queue.put(job, timeout=0):
+                self.__drop(job, "Queue is full")
+
+    def __enqueue(self, job) -> Future:
+        if not self.__started:  # Only after a fork, start the workers lazily
+            self.__start_dispatcher()
+
+        with self.__outstanding_lock:
+            self.__outstanding.add(job.future)
+        job.future.add_done_callback(self.__discard_outstanding)
+
+        job.enqueued_at = time.monotonic()
+        self.__admit(job)
+
+        if self.__hooks is not None:
+            self.__metrics.on_enqueue(self.__queue.qsize())
+
+        return job.future
+
+    def __put_job(self, method: str, *args, **kwargs) -> Future:
+        return self.__enqueue(_Job(method, args, kwargs, Future()))
 
     def get(self, *args, **kwargs) -> Future:
-        return self.__put_job(self.__client.get, *args, **kwargs)
+        return self.__put_job("get", *args, **kwargs)
 
     def post(self, *args, **kwargs) -> Future:
-        return self.__put_job(self.__client.post, *args, **kwargs)
+        return self.__put_job("post", *args, **kwargs)
 
     def put(self, *args, **kwargs) -> Future:
-        return self.__put_job(self.__client.put, *args, **kwargs)
+        return self.__put_job("put", *args, **kwargs)
 
     def delete(self, *args, **kwargs) -> Future:
-        return self.__put_job(self.__client.delete, *args, **kwargs)
+        return self.__put_job("delete", *args, **kwargs)
+
+    def put_batched(self, *, url: str, data: Union[str, LazyContent]) -> Future:
+        """Queue a JSON document to be PUT to `url` as part of a JSON array.
+
+        Documents queued for the same URL are coalesced into a single request of
+        up to `batch_size` items. The returned Future resolves to the response of
+        the request that carried this document, or the exception it raised.
+        """
+
+        return self.__enqueue(_BatchItem(url, data, Future()))
+
+    def flush(self, timeout: Optional[float] = None) -> FlushResult:
+        """Wait until all the requests queued before the call are completed.
+
+        Workers waiting for a batch to fill up send it right away. Unlike `close`,
+        the client remains usable afterwards.
+
+        Args:
+            timeout: [Optional] maximal time, in seconds, to wait.
+                     Waits for as long as it takes if not provided.
+
+        Returns:
+            FlushResult: How many of these requests were delivered, failed, or are
+                         still pending because the timeout expired.
+        """
+
+        with self.__outstanding_lock:
+            futures = list(self.__outstanding)
+
+        self.__queue.begin_flush()
+        try:
+            done, not_done = wait(futures, timeout=timeout)
+        finally:
+            self.__queue.end_flush()
+
+        return FlushResult.from_results(
+            (future.result() for future in done), pending=len(not_done)
+        )
+
+    def _replay_loop(self):
+        """Replay the requests spooled by a previous client, segment by segment.
+
+        A segment is only removed once all of its requests were dispatched.
+        Requests that fail again are spooled to a new segment by the workers.
+        """
+
+        interval = 1.0 / self.__replay_rate
+
+        for path in self.__spool.pending_segments():
+            futures = []
+            for record in self.__spool.read_segment(path):
+                if self.__stop_replay.wait(timeout=interval):
+                    return
+
+                # Don't churn through the spool while the server is down
+                while self.__circuit_breaker and self.__circuit_breaker.is_open():
+                    if self.__stop_replay.wait(timeout=interval):
+                        return
+
+                if record.batched:
+                    future = self.put_batched(url=record.url, data=record.body.decode())
+                else:
+                    future = self.__put_job(
+                        record.method.lower(), record.url, content=record.body
+                    )
+                futures.append(future)
+
+            # Keep waiting in short intervals, to stop promptly when closing
+            while wait(futures, timeout=interval).not_done:
+                if self.__stop_replay.is_set():
+                    return
+
+            self.__spool.remove_segment(path)
+
+    @staticmethod
+    def __remaining(deadline: float) -> float:
+        return max(0.0, deadline - time.monotonic())
 
     def close(self):
         was_closing = self.__closing.get_and_set()
@@ -133,10 +782,35 @@ class AsyncClient:
             self.__closed.wait()
             return
 
-        # Wait for the thread to close gracefully by dispatching the last jobs
-        self.__closed.wait(timeout=self.SHUTDOWN_TIMEOUT)
+        # Wait for the threads to close gracefully by dispatching the last jobs.
+        # They return as soon as the queue is empty, and their backoffs and
+        # rate limiting pauses are cut short at the deadline.
+        deadline = time.monotonic() + self.SHUTDOWN_TIMEOUT
+        self.__shutdown.begin(deadline)
+
+        self.__stop_replay.set()
+        if self.__replay_thread is not None:
+            self.__replay_thread.join(timeout=self.__remaining(deadline))
+
+        self.__queue.close()
 
-        # Close the actual underlying client to cut it short if it didn't
-        self.__client.close()
+        for thread in self.__threads:
+            thread.join(timeout=self.__remaining(deadline))
 
-        self.__thread.join()
+        # Close the actual underlying client to cut it short if they didn't,
+        # and give the requests it interrupts another grace period to fail
+        if self.__client is not None:
+            self.__client.close()
+
+        deadline = time.monotonic() + self.SHUTDOWN_TIMEOUT
+        for thread in self.__threads:
+            thread.join(timeout=self.__remaining(deadline))
+
+        # Whatever is left in the queue won't be dispatched anymore
+        while (job := self.__queue.get(timeout=0)) is not None:
+            self.__drop(job, "Client was closed before the event was dispatched")
+
+        if self.__spool is not None:
+            self.__spool.close()
+
+        self.__closed.set()
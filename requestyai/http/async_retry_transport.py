@@ -0,0 +1,53 @@
+import asyncio
+from typing import Optional
+
+import httpx
+
+from .circuit_breaker import CircuitBreaker
+from .metrics import MetricsHooks
+from .rate_limiter import RateLimiter
+from .retrier import Retrier
+from .retry_budget import RetryBudget
+from .retry_policy import RetryPolicy
+
+
+class AsyncRetryTransport(httpx.AsyncHTTPTransport):
+    def __init__(
+        self,
+        retry_policy: RetryPolicy,
+        metrics: Optional[MetricsHooks] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.__retrier = Retrier(
+            retry_policy=retry_policy,
+            metrics=metrics,
+            rate_limiter=rate_limiter,
+            circuit_breaker=circuit_breaker,
+            retry_budget=retry_budget,
+        )
+
+    async def handle_async_request(self, request):
+        attempts = self.__retrier.start(request)
+
+        while True:
+            delay = attempts.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            attempts.begin()
+            try:
+                response = await super().handle_async_request(request)
+            except httpx.NetworkError as ex:
+                backoff = attempts.on_error(ex)
+                if backoff is None:
+                    raise
+            else:
+                backoff = attempts.on_response(response)
+                if backoff is None:
+                    return response
+
+            await asyncio.sleep(backoff)
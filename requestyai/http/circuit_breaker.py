@@ -0,0 +1,139 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from .circuit_state import CircuitState
+from .fork import reset_after_fork
+
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint that keeps failing.
+
+    The circuit starts closed, letting all requests through. After
+    `failure_threshold` consecutive failed requests it opens, and rejects all
+    requests for `reset_timeout` seconds. It then becomes half-open, letting a
+    single probe request through: the circuit closes again if the probe
+    succeeds, and opens again if it fails. A probe whose outcome wasn't
+    reported within `reset_timeout` seconds is replaced by a new one.
+    """
+
+    DEFAULT_FAILURE_THRESHOLD = 5
+    DEFAULT_RESET_TIMEOUT = 30.0
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        on_state_change: Optional[Callable[[CircuitState], None]] = None,
+    ):
+        """
+        Args:
+            failure_threshold: Number of consecutive failures opening the circuit.
+            reset_timeout: Time, in seconds, the circuit stays open before
+                           letting a probe request through.
+            on_state_change: [Optional] called with the new state whenever the
+                             circuit changes state, e.g. to raise an alert.
+        """
+
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        if reset_timeout < 0:
+            raise ValueError("reset_timeout must be non-negative")
+
+        self.__failure_threshold = failure_threshold
+        self.__reset_timeout = reset_timeout
+        self.__on_state_change = on_state_change
+
+        self.__reset()
+        reset_after_fork(self)
+
+    def __reset(self):
+        self.__lock = threading.Lock()
+        self.__state = CircuitState.CLOSED
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__probing = False
+        self.__probed_at = 0.0
+
+    def _after_fork_in_child(self):
+        """Reset the circuit in a forked child process."""
+
+        self.__reset()
+
+    @property
+    def state(self) -> CircuitState:
+        return self.__state
+
+    def is_open(self) -> bool:
+        """Whether requests are rejected, without letting a probe through.
+
+        This check is lock-free, to make it cheap enough for every event.
+        """
+
+        return (
+            self.__state == CircuitState.OPEN
+            and time.monotonic() < self.__opened_at + self.__reset_timeout
+        )
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now.
+
+        Once the reset timeout has expired, the first call lets a probe through,
+        and its outcome must then be reported by `on_success` or `on_failure`.
+        """
+
+        with self.__lock:
+            if self.__state == CircuitState.CLOSED:
+                return True
+
+            now = time.monotonic()
+            state = None
+            if self.__state == CircuitState.OPEN:
+                if now < self.__opened_at + self.__reset_timeout:
+                    return False
+                state = self.__set_state(CircuitState.HALF_OPEN)
+            elif self.__probing and now < self.__probed_at + self.__reset_timeout:
+                return False
+
+            self.__probing = True
+            self.__probed_at = now
+
+        self.__notify(state)
+        return True
+
+    def on_success(self):
+        with self.__lock:
+            self.__failures = 0
+            state = None
+            if self.__state != CircuitState.CLOSED:
+                state = self.__set_state(CircuitState.CLOSED)
+
+        self.__notify(state)
+
+    def on_failure(self):
+        with self.__lock:
+            state = None
+            if self.__state == CircuitState.HALF_OPEN:
+                state = self.__open()
+            elif self.__state == CircuitState.CLOSED:
+                self.__failures += 1
+                if self.__failures >= self.__failure_threshold:
+                    state = self.__open()
+
+        self.__notify(state)
+
+    def __open(self) -> CircuitState:
+        self.__opened_at = time.monotonic()
+        return self.__set_state(CircuitState.OPEN)
+
+    def __set_state(self, state: CircuitState) -> CircuitState:
+        self.__state = state
+        self.__failures = 0
+        self.__probing = False
+        return state
+
+    def __notify(self, state: Optional[CircuitState]):
+        # Called outside of the lock, so the callback may use the breaker
+        if state is not None and self.__on_state_change is not None:
+            self.__on_state_change(state)
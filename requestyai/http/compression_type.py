@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class CompressionType(Enum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
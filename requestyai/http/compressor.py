@@ -0,0 +1,86 @@
+import gzip
+from typing import Optional
+
+import httpx
+
+from .compression_type import CompressionType
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+
+class Compressor:
+    """Compresses request bodies, to be installed as an httpx request event hook.
+
+    Bodies smaller than `threshold` bytes, streamed bodies, and requests that
+    already specify a `Content-Encoding` are sent as is.
+    """
+
+    DEFAULT_THRESHOLD = 1024
+    DEFAULT_GZIP_LEVEL = 6
+    DEFAULT_ZSTD_LEVEL = 3
+
+    def __init__(
+        self,
+        compression_type: CompressionType = CompressionType.GZIP,
+        threshold: int = DEFAULT_THRESHOLD,
+        level: Optional[int] = None,
+    ):
+        if compression_type == CompressionType.ZSTD and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        if threshold < 0:
+            raise ValueError("threshold must be non-negative")
+
+        if level is None:
+            level = (
+                self.DEFAULT_ZSTD_LEVEL
+                if compression_type == CompressionType.ZSTD
+                else self.DEFAULT_GZIP_LEVEL
+            )
+
+        self.__compression_type = compression_type
+        self.__threshold = threshold
+        self.__level = level
+
+    @property
+    def compression_type(self) -> CompressionType:
+        return self.__compression_type
+
+    @property
+    def threshold(self) -> int:
+        return self.__threshold
+
+    @property
+    def level(self) -> int:
+        return self.__level
+
+    def compress(self, body: bytes) -> bytes:
+        if self.__compression_type == CompressionType.ZSTD:
+            return zstandard.ZstdCompressor(level=self.__level).compress(body)
+        return gzip.compress(body, compresslevel=self.__level)
+
+    def __call__(self, request: httpx.Request):
+        if "Content-Encoding" in request.headers:
+            return
+
+        try:
+            body = request.content
+        except httpx.RequestNotRead:  # Streamed bodies are left untouched
+            return
+
+        if len(body) < self.__threshold:
+            return
+
+        compressed = self.compress(body)
+
+        request.headers["Content-Encoding"] = self.__compression_type.value
+        request.headers["Content-Length"] = str(len(compressed))
+        request.stream = httpx.ByteStream(compressed)
+        # Keep `request.content` consistent with what is actually sent
+        request._content = compressed
+
+    async def async_hook(self, request: httpx.Request):
+        """The same hook, for use with `httpx.AsyncClient`."""
+        self(request)
@@ -0,0 +1,50 @@
+from ..error import AInsightsError
+
+
+class DispatchError(AInsightsError):
+    """Base exception class for requests that weren't dispatched.
+
+    The futures of such requests are resolved with these exceptions, which are
+    returned rather than raised, like the transport errors of failed requests.
+    """
+
+    pass
+
+
+class DroppedError(DispatchError):
+    """Exception returned for requests that were dropped by the dispatch queue.
+
+    Requests are dropped when the queue is full, according to its overflow
+    policy, or when the client is closed before they were dispatched.
+
+    Attributes:
+        message: Explanation of why the request was dropped
+    """
+
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class SpooledError(DispatchError):
+    """Exception returned for requests that were written to the spool instead of
+    being dispatched, to be replayed the next time a client opens the spool.
+
+    Attributes:
+        message: Explanation of why the request was spooled
+    """
+
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class CircuitOpenError(DispatchError):
+    """Exception returned for requests that weren't dispatched because the
+    circuit breaker was open, and were handed over to the circuit's fallback
+    instead.
+
+    Attributes:
+        message: Explanation of what happened to the request
+    """
+
+    def __init__(self, message: str):
+        super().__init__(message)
@@ -0,0 +1,30 @@
+from typing import Iterable, NamedTuple
+
+
+class FlushResult(NamedTuple):
+    """The outcome of the requests that were pending when a flush started.
+
+    Attributes:
+        delivered: Requests that got a successful (non-error) response.
+        failed: Requests that failed, got an error response, or were dropped.
+        pending: Requests that were still pending when the flush timed out.
+    """
+
+    delivered: int
+    failed: int
+    pending: int
+
+    @classmethod
+    def from_results(cls, results: Iterable, pending: int) -> "FlushResult":
+        """Classify the results of completed requests, i.e. either responses or
+        the exceptions that were returned instead.
+        """
+
+        delivered = failed = 0
+        for result in results:
+            if isinstance(result, Exception) or result.status_code >= 400:
+                failed += 1
+            else:
+                delivered += 1
+
+        return cls(delivered=delivered, failed=failed, pending=pending)
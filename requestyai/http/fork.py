@@ -0,0 +1,27 @@
+import os
+import weakref
+
+# All live objects to reset in forked child processes
+_objects: weakref.WeakSet = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for obj in list(_objects):
+        obj._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):  # Not available on Windows, which can't fork
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def reset_after_fork(obj):
+    """Call `obj._after_fork_in_child()` in every forked child process, for as
+    long as `obj` is alive.
+
+    Only the forking thread exists in the child, so objects must reset their
+    locks there, which may have been held by one of the parent's threads, and
+    whatever state belongs to those threads, or must not be shared with the
+    parent, such as connections.
+    """
+
+    _objects.add(obj)
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+
+class JobQueue:
+    """A FIFO queue for dispatcher workers, built around condition variables.
+
+    Unlike `queue.Queue`, it can be closed: once closed, consumers drain the
+    remaining items and are then woken up with `None`, so idle workers block
+    without polling and exit as soon as there's nothing left to do.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self.__maxsize = maxsize
+        self.__items = deque()
+        self.__closed = False
+        self.__flushes = 0
+
+        self.__lock = threading.Lock()
+        self.__not_empty = threading.Condition(self.__lock)
+        self.__not_full = threading.Condition(self.__lock)
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def qsize(self) -> int:
+        return len(self.__items)
+
+    def __full(self) -> bool:
+        return 0 < self.__maxsize <= len(self.__items)
+
+    def __append(self, item):
+        self.__items.append(item)
+        self.__not_empty.notify()
+
+    def put(self, item, timeout: Optional[float] = None) -> bool:
+        """Add an item, waiting up to `timeout` seconds for room if it's full.
+
+        A `timeout` of 0 doesn't wait at all, whereas None waits forever.
+
+        Returns:
+            bool: False if the queue was still full when the timeout expired,
+                  or if the queue is closed.
+        """
+
+        with self.__not_full:
+            if self.__closed:
+                return False
+
+            if self.__full():
+                if timeout is not None and timeout <= 0:
+                    return False
+
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while self.__full():
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.__not_full.wait(remaining)
+                    if self.__closed:
+                        return False
+
+            self.__append(item)
+            return True
+
+    def put_evicting(self, item) -> tuple[bool, Optional[Any]]:
+        """Add an item, evicting the oldest one if the queue is full.
+
+        Returns:
+            tuple: Whether the item was added, which is only False if the queue
+                   is closed, and the evicted item, or None if there was room.
+        """
+
+        with self.__lock:
+            if self.__closed:
+                return False, None
+
+            evicted = self.__items.popleft() if self.__full() else None
+            self.__append(item)
+            return True, evicted
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Remove and return the oldest item, waiting up to `timeout` seconds.
+
+        A `timeout` of 0 doesn't wait at all, whereas None waits forever.
+
+        Returns:
+            The item, or None if the timeout expired, or the queue is closed and
+            there are no items left. While the queue is being flushed, waits with
+            a timeout return None immediately, instead of waiting for new items.
+        """
+
+        with self.__not_empty:
+            if not self.__items and not self.__closed:
+                if timeout is not None and (timeout <= 0 or self.__flushes):
+                    return None
+
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while not self.__items and not self.__closed:
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self.__not_empty.wait(remaining)
+                    if deadline is not None and self.__flushes:
+                        break
+
+            if not self.__items:
+                return None
+
+            item = self.__items.popleft()
+            self.__not_full.notify()
+            return item
+
+    def begin_flush(self):
+        """Make consumers waiting with a timeout stop waiting until `end_flush`.
+
+        Consumers waiting without a timeout (i.e. idle ones) keep waiting.
+        """
+
+        with self.__lock:
+            self.__flushes += 1
+            self.__not_empty.notify_all()
+
+    def end_flush(self):
+        with self.__lock:
+            self.__flushes -= 1
+
+    def close(self):
+        """Stop accepting new items, and wake up all producers and consumers.
+
+        Consumers can still drain the remaining items.
+        """
+
+        with self.__lock:
+            self.__closed = True
+            self.__not_empty.notify_all()
+            self.__not_full.notify_all()
@@ -0,0 +1,18 @@
+from typing import Callable, Union
+
+
+class LazyContent:
+    """A request body that is only rendered by the worker dispatching the request.
+
+    Pass it as the `content` or `data` of a queued request, or as the `data` of a
+    batched one, to move the cost of building the body off the caller's thread.
+    Exceptions raised while rendering are returned via the request's future.
+    """
+
+    __slots__ = ("_render",)
+
+    def __init__(self, render: Callable[[], Union[str, bytes]]):
+        self._render = render
+
+    def render(self) -> Union[str, bytes]:
+        return self._render()
@@ -0,0 +1,209 @@
+import threading
+from typing import NamedTuple, Optional
+
+
+class MetricsHooks:
+    """Callbacks instrumenting the dispatch pipeline of an `AsyncClient`.
+
+    All hooks do nothing by default, so subclasses only override the ones they
+    need. Hooks are called synchronously, mostly from worker threads, and must
+    be fast and thread-safe. Exceptions raised by hooks are discarded, so that
+    they can't interrupt the dispatch of events.
+    """
+
+    def on_enqueue(self, queue_size: int):
+        """A job was queued, leaving `queue_size` jobs in the queue.
+
+        This is the only hook called by the thread capturing the event.
+        """
+
+    def on_drop(self, reason: str):
+        """A job was dropped."""
+
+    def on_spool(self):
+        """A request was written to the spool."""
+
+    def on_request(
+        self,
+        *,
+        status_code: Optional[int],
+        items: int,
+        queue_latency: float,
+        latency: float,
+    ):
+        """A request was completed.
+
+        Args:
+            status_code: The status of the response, or None if it failed.
+            items: The number of jobs carried by the request, i.e. 1 unless it's
+                   a batch.
+            queue_latency: Time, in seconds, the (oldest) job spent in the queue.
+            latency: Time, in seconds, it took to send the request, including
+                     all retries.
+        """
+
+    def on_attempt(self, bytes_sent: int):
+        """A request attempt is about to be sent.
+
+        Args:
+            bytes_sent: The size of the request body, after compression.
+        """
+
+    def on_retry(self, status_code: Optional[int]):
+        """A request attempt failed and will be retried.
+
+        Args:
+            status_code: The status of the response, or None for network errors.
+        """
+
+
+class DispatchStats(NamedTuple):
+    """A snapshot of the counters of an `AsyncClient`'s dispatch pipeline.
+
+    Attributes:
+        queue_size: Jobs currently waiting in the queue.
+        in_flight: Requests currently being sent.
+        requests: Completed requests, including batches.
+        delivered: Jobs delivered with a successful response.
+        failed: Jobs that failed or got an error response.
+        dropped: Jobs dropped because the queue was full or the client closed.
+        spooled: Requests written to the spool.
+        retries: Request attempts that were retried.
+        retries_by_status: Retries per status code, where None counts network
+                           errors.
+        bytes_sent: Bytes sent in request bodies, after compression, including
+                    retries.
+        queue_time: Total time, in seconds, jobs spent in the queue.
+        request_time: Total time, in seconds, spent sending requests.
+    """
+
+    queue_size: int
+    in_flight: int
+    requests: int
+    delivered: int
+    failed: int
+    dropped: int
+    spooled: int
+    retries: int
+    retries_by_status: dict
+    bytes_sent: int
+    queue_time: float
+    request_time: float
+
+
+class _Metrics(MetricsHooks):
+    """Keeps the counters of `DispatchStats`, and forwards to the user's hooks."""
+
+    def __init__(self, hooks: Optional[MetricsHooks] = None):
+        self.__hooks = hooks
+        self.__lock = threading.Lock()
+
+        self.__in_flight = 0
+        self.__requests = 0
+        self.__delivered = 0
+        self.__failed = 0
+        self.__dropped = 0
+        self.__spooled = 0
+        self.__retries_by_status: dict[Optional[int], int] = {}
+        self.__bytes_sent = 0
+        self.__queue_time = 0.0
+        self.__request_time = 0.0
+
+    @property
+    def hooks(self) -> Optional[MetricsHooks]:
+        return self.__hooks
+
+    @property
+    def dropped(self) -> int:
+        with self.__lock:
+            return self.__dropped
+
+    @property
+    def spooled(self) -> int:
+        with self.__lock:
+            return self.__spooled
+
+    def on_enqueue(self, queue_size: int):
+        self.__call_hooks("on_enqueue", queue_size)
+
+    def on_drop(self, reason: str):
+        with self.__lock:
+            self.__dropped += 1
+        self.__call_hooks("on_drop", reason)
+
+    def on_spool(self):
+        with self.__lock:
+            self.__spooled += 1
+        self.__call_hooks("on_spool")
+
+    def on_send(self):
+        """A request is about to be sent."""
+        with self.__lock:
+            self.__in_flight += 1
+
+    def on_request(
+        self,
+        *,
+        status_code: Optional[int],
+        items: int,
+        queue_latency: float,
+        latency: float,
+    ):
+        delivered = status_code is not None and status_code < 400
+
+        with self.__lock:
+            self.__in_flight -= 1
+            self.__requests += 1
+            if delivered:
+                self.__delivered += items
+            else:
+                self.__failed += items
+            self.__queue_time += queue_latency * items
+            self.__request_time += latency
+
+        self.__call_hooks(
+            "on_request",
+            status_code=status_code,
+            items=items,
+            queue_latency=queue_latency,
+            latency=latency,
+        )
+
+    def on_attempt(self, bytes_sent: int):
+        with self.__lock:
+            self.__bytes_sent += bytes_sent
+        self.__call_hooks("on_attempt", bytes_sent)
+
+    def on_retry(self, status_code: Optional[int]):
+        with self.__lock:
+            count = self.__retries_by_status.get(status_code, 0)
+            self.__retries_by_status[status_code] = count + 1
+        self.__call_hooks("on_retry", status_code)
+
+    def __call_hooks(self, name: str, *args, **kwargs):
+        if self.__hooks is None:
+            return
+
+        # A failing hook, e.g. exporting to an unreachable collector, must not
+        # stop the worker calling it, nor fail `capture`
+        try:
+            getattr(self.__hooks, name)(*args, **kwargs)
+        except Exception:
+            pass
+
+    def snapshot(self, queue_size: int) -> DispatchStats:
+        with self.__lock:
+            return DispatchStats(
+                queue_size=queue_size,
+                in_flight=self.__in_flight,
+                requests=self.__requests,
+                delivered=self.__delivered,
+                failed=self.__failed,
+                dropped=self.__dropped,
+                spooled=self.__spooled,
+                retries=sum(self.__retries_by_status.values()),
+                retries_by_status=dict(self.__retries_by_status),
+                bytes_sent=self.__bytes_sent,
+                queue_time=self.__queue_time,
+                request_time=self.__request_time,
+            )
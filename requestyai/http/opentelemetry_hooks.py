@@ -0,0 +1,103 @@
+from typing import Optional
+
+from .metrics import MetricsHooks
+
+try:
+    from opentelemetry import metrics as otel_metrics
+except ImportError:  # OpenTelemetry metrics are optional
+    otel_metrics = None
+
+
+class OpenTelemetryHooks(MetricsHooks):
+    """Exports the metrics of the dispatch pipeline to OpenTelemetry.
+
+    Instruments are created by a meter of `meter_provider`, which defaults to
+    the global meter provider, and are named `<namespace>.<name>`.
+    """
+
+    DEFAULT_NAMESPACE = "requestyai"
+
+    def __init__(
+        self,
+        *,
+        namespace: str = DEFAULT_NAMESPACE,
+        meter_provider=None,
+    ):
+        if otel_metrics is None:
+            raise ValueError(
+                "OpenTelemetry metrics require the 'opentelemetry-api' package"
+            )
+
+        meter = otel_metrics.get_meter("requestyai", meter_provider=meter_provider)
+
+        def name(suffix: str) -> str:
+            return f"{namespace}.{suffix}"
+
+        # The queue size is only known when jobs are queued, and is observed
+        # as it was then
+        self.__queue_size = 0
+        meter.create_observable_gauge(
+            name("queue.size"),
+            callbacks=[self.__observe_queue_size],
+            description="Jobs waiting in the dispatch queue",
+        )
+        self.__dropped = meter.create_counter(
+            name("dropped"), description="Jobs dropped"
+        )
+        self.__spooled = meter.create_counter(
+            name("spooled"), description="Requests written to the spool"
+        )
+        self.__requests = meter.create_counter(
+            name("requests"), description="Completed requests"
+        )
+        self.__jobs = meter.create_counter(
+            name("jobs"), description="Jobs carried by completed requests"
+        )
+        self.__bytes_sent = meter.create_counter(
+            name("sent"), unit="By", description="Bytes sent in request bodies"
+        )
+        self.__queue_latency = meter.create_histogram(
+            name("queue.latency"), unit="s", description="Time jobs spent in the queue"
+        )
+        self.__latency = meter.create_histogram(
+            name("request.latency"), unit="s", description="Time spent sending requests"
+        )
+        self.__retries = meter.create_counter(
+            name("retries"), description="Request attempts that were retried"
+        )
+
+    def __observe_queue_size(self, options):
+        yield otel_metrics.Observation(self.__queue_size)
+
+    @staticmethod
+    def __attributes(status_code: Optional[int]) -> dict:
+        return {"status": "error" if status_code is None else str(status_code)}
+
+    def on_enqueue(self, queue_size: int):
+        self.__queue_size = queue_size
+
+    def on_drop(self, reason: str):
+        self.__dropped.add(1, {"reason": reason})
+
+    def on_spool(self):
+        self.__spooled.add(1)
+
+    def on_request(
+        self,
+        *,
+        status_code: Optional[int],
+        items: int,
+        queue_latency: float,
+        latency: float,
+    ):
+        attributes = self.__attributes(status_code)
+        self.__requests.add(1, attributes)
+        self.__jobs.add(items, attributes)
+        self.__queue_latency.record(queue_latency)
+        self.__latency.record(latency)
+
+    def on_attempt(self, bytes_sent: int):
+        self.__bytes_sent.add(bytes_sent)
+
+    def on_retry(self, status_code: Optional[int]):
+        self.__retries.add(1, self.__attributes(status_code))
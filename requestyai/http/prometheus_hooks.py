@@ -0,0 +1,94 @@
+from typing import Optional
+
+from .metrics import MetricsHooks
+
+try:
+    import prometheus_client
+except ImportError:  # Prometheus metrics are optional
+    prometheus_client = None
+
+
+class PrometheusHooks(MetricsHooks):
+    """Exports the metrics of the dispatch pipeline to Prometheus.
+
+    All metrics are named `<namespace>_<name>`, and registered in `registry`,
+    which defaults to the global registry of `prometheus_client`.
+    """
+
+    DEFAULT_NAMESPACE = "requestyai"
+
+    def __init__(
+        self,
+        *,
+        namespace: str = DEFAULT_NAMESPACE,
+        registry: Optional["prometheus_client.CollectorRegistry"] = None,
+    ):
+        if prometheus_client is None:
+            raise ValueError(
+                "Prometheus metrics require the 'prometheus_client' package"
+            )
+
+        options = dict(namespace=namespace)
+        if registry is not None:
+            options["registry"] = registry
+
+        self.__queue_size = prometheus_client.Gauge(
+            "queue_size", "Jobs waiting in the dispatch queue", **options
+        )
+        self.__dropped = prometheus_client.Counter(
+            "dropped", "Jobs dropped", ["reason"], **options
+        )
+        self.__spooled = prometheus_client.Counter(
+            "spooled", "Requests written to the spool", **options
+        )
+        self.__requests = prometheus_client.Counter(
+            "requests", "Completed requests", ["status"], **options
+        )
+        self.__jobs = prometheus_client.Counter(
+            "jobs", "Jobs carried by completed requests", ["status"], **options
+        )
+        self.__bytes_sent = prometheus_client.Counter(
+            "sent_bytes", "Bytes sent in request bodies", **options
+        )
+        self.__queue_latency = prometheus_client.Histogram(
+            "queue_latency_seconds", "Time jobs spent in the queue", **options
+        )
+        self.__latency = prometheus_client.Histogram(
+            "request_latency_seconds", "Time spent sending requests", **options
+        )
+        self.__retries = prometheus_client.Counter(
+            "retries", "Request attempts that were retried", ["status"], **options
+        )
+
+    @staticmethod
+    def __status(status_code: Optional[int]) -> str:
+        return "error" if status_code is None else str(status_code)
+
+    def on_enqueue(self, queue_size: int):
+        self.__queue_size.set(queue_size)
+
+    def on_drop(self, reason: str):
+        self.__dropped.labels(reason=reason).inc()
+
+    def on_spool(self):
+        self.__spooled.inc()
+
+    def on_request(
+        self,
+        *,
+        status_code: Optional[int],
+        items: int,
+        queue_latency: float,
+        latency: float,
+    ):
+        status = self.__status(status_code)
+        self.__requests.labels(status=status).inc()
+        self.__jobs.labels(status=status).inc(items)
+        self.__queue_latency.observe(queue_latency)
+        self.__latency.observe(latency)
+
+    def on_attempt(self, bytes_sent: int):
+        self.__bytes_sent.inc(bytes_sent)
+
+    def on_retry(self, status_code: Optional[int]):
+        self.__retries.labels(status=self.__status(status_code)).inc()
@@ -0,0 +1,142 @@
+import threading
+import time
+from typing import Optional
+
+from .fork import reset_after_fork
+
+
+class RateLimiter:
+    """An adaptive rate limiter shared by all the requests of a client.
+
+    Requests are spaced out by a token bucket holding up to `burst` tokens, that
+    refills at the current rate. The rate adapts to the server using additive
+    increase, multiplicative decrease (AIMD): every successful response raises
+    it by `increase / rate`, i.e. by about `increase` requests per second every
+    second, up to `max_rate`, and a throttling response (429 or 503) multiplies
+    it by `decrease`, down to `min_rate`, at most once per `decrease_interval`
+    seconds so that requests throttled together count once.
+
+    Moreover, when the server says how long to wait (see `parse_retry_after`),
+    no request is sent until then.
+
+    `reserve` doesn't block, so the limiter can be used both by threads and by
+    coroutines, which wait for the returned delay on their own.
+    """
+
+    DEFAULT_MAX_RATE = 100.0
+    DEFAULT_MIN_RATE = 0.5
+    DEFAULT_BURST = 10
+    DEFAULT_INCREASE = 1.0
+    DEFAULT_DECREASE = 0.5
+    DEFAULT_DECREASE_INTERVAL = 1.0
+    DEFAULT_MAX_PAUSE = 60.0
+
+    THROTTLE_STATUSES = frozenset({429, 503})
+
+    def __init__(
+        self,
+        *,
+        max_rate: float = DEFAULT_MAX_RATE,
+        min_rate: float = DEFAULT_MIN_RATE,
+        burst: int = DEFAULT_BURST,
+        increase: float = DEFAULT_INCREASE,
+        decrease: float = DEFAULT_DECREASE,
+        decrease_interval: float = DEFAULT_DECREASE_INTERVAL,
+        max_pause: float = DEFAULT_MAX_PAUSE,
+    ):
+        """
+        Args:
+            max_rate: Maximal, and initial, number of requests per second.
+            min_rate: Minimal number of requests per second.
+            burst: Number of requests that can be sent at once after being idle.
+            increase: Additive increase of the rate, in requests per second.
+            decrease: Multiplicative decrease of the rate, between 0 and 1.
+            decrease_interval: Minimal time, in seconds, between two decreases.
+            max_pause: Maximal time, in seconds, to honor a server's hint for.
+        """
+
+        if not 0 < min_rate <= max_rate:
+            raise ValueError("min_rate must be positive and at most max_rate")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        if increase < 0:
+            raise ValueError("increase must be non-negative")
+        if not 0 < decrease <= 1:
+            raise ValueError("decrease must be between 0 and 1")
+
+        self.__max_rate = max_rate
+        self.__min_rate = min_rate
+        self.__burst = burst
+        self.__increase = increase
+        self.__decrease = decrease
+        self.__decrease_interval = decrease_interval
+        self.__max_pause = max_pause
+
+        self.__reset()
+        reset_after_fork(self)
+
+    def __reset(self):
+        self.__lock = threading.Lock()
+        self.__rate = self.__max_rate
+        # The theoretical time at which the bucket would be full again
+        self.__full_at = 0.0
+        self.__last_decrease = float("-inf")
+
+    def _after_fork_in_child(self):
+        """Reset the limiter in a forked child process."""
+
+        self.__reset()
+
+    @property
+    def rate(self) -> float:
+        """The current maximal number of requests per second."""
+        with self.__lock:
+            return self.__rate
+
+    def reserve(self) -> float:
+        """Reserve the right to send a request.
+
+        Returns:
+            float: How long, in seconds, to wait before sending it.
+        """
+
+        with self.__lock:
+            now = time.monotonic()
+            interval = 1 / self.__rate
+
+            full_at = max(self.__full_at, now)
+            self.__full_at = full_at + interval
+            return max(0.0, full_at - now - (self.__burst - 1) * interval)
+
+    def pause(self, seconds: float):
+        """Don't let any request be sent for the next `seconds` seconds."""
+
+        seconds = min(seconds, self.__max_pause)
+
+        with self.__lock:
+            interval = 1 / self.__rate
+            # Only the first request after the pause is free, no burst
+            resume_at = time.monotonic() + seconds + (self.__burst - 1) * interval
+            self.__full_at = max(self.__full_at, resume_at)
+
+    def on_response(self, status_code: int, retry_after: Optional[float] = None):
+        """Adapt the rate to a response.
+
+        Args:
+            status_code: The status of the response.
+            retry_after: [Optional] how long, in seconds, the server asked to
+                         wait before sending more requests.
+        """
+
+        with self.__lock:
+            if status_code in self.THROTTLE_STATUSES:
+                now = time.monotonic()
+                if now - self.__last_decrease >= self.__decrease_interval:
+                    self.__rate = max(self.__min_rate, self.__rate * self.__decrease)
+                    self.__last_decrease = now
+            elif status_code < 400:
+                rate = self.__rate + self.__increase / self.__rate
+                self.__rate = min(self.__max_rate, rate)
+
+        if retry_after is not None:
+            self.pause(retry_after)
@@ -0,0 +1,165 @@
+import time
+from typing import Optional
+
+import httpx
+
+from .circuit_breaker import CircuitBreaker
+from .metrics import MetricsHooks
+from .rate_limiter import RateLimiter
+from .retry_after import parse_retry_after
+from .retry_budget import RetryBudget
+from .retry_policy import RetryPolicy
+
+
+class Retrier:
+    """The retry logic shared by `RetryTransport` and `AsyncRetryTransport`,
+    which only send the attempts of a request and sleep in between.
+    """
+
+    def __init__(
+        self,
+        retry_policy: RetryPolicy,
+        metrics: Optional[MetricsHooks] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
+        self.__retry_policy = retry_policy
+        self.__metrics = metrics
+        self.__rate_limiter = rate_limiter
+        self.__circuit_breaker = circuit_breaker
+        self.__retry_budget = retry_budget
+
+    def start(self, request: httpx.Request) -> "Attempts":
+        """Record a new request, and return the state of its attempts."""
+
+        if self.__retry_budget is not None:
+            self.__retry_budget.on_request()
+
+        deadline = None
+        if self.__retry_policy.deadline is not None:
+            deadline = time.monotonic() + self.__retry_policy.deadline
+
+        return Attempts(
+            request,
+            deadline,
+            retry_policy=self.__retry_policy,
+            metrics=self.__metrics,
+            rate_limiter=self.__rate_limiter,
+            circuit_breaker=self.__circuit_breaker,
+            retry_budget=self.__retry_budget,
+        )
+
+
+class Attempts:
+    """The attempts of a single request.
+
+    Every attempt is preceded by `delay` and `begin`, and followed by either
+    `on_response` or `on_error`, which tell whether to retry, and when.
+    """
+
+    def __init__(
+        self,
+        request: httpx.Request,
+        deadline: Optional[float],
+        *,
+        retry_policy: RetryPolicy,
+        metrics: Optional[MetricsHooks],
+        rate_limiter: Optional[RateLimiter],
+        circuit_breaker: Optional[CircuitBreaker],
+        retry_budget: Optional[RetryBudget],
+    ):
+        self.__request = request
+        self.__deadline = deadline
+        self.__retry_policy = retry_policy
+        self.__metrics = metrics
+        self.__rate_limiter = rate_limiter
+        self.__circuit_breaker = circuit_breaker
+        self.__retry_budget = retry_budget
+        self.__retries = 0
+
+    def delay(self) -> float:
+        """The time, in seconds, to wait before the next attempt is sent."""
+
+        if self.__rate_limiter is None:
+            return 0.0
+        return self.__rate_limiter.reserve()
+
+    def begin(self):
+        """Prepare the request for the next attempt, which is sent right away."""
+
+        if self.__deadline is not None:
+            self.__limit_timeout()
+
+        if self.__metrics is not None:
+            length = self.__request.headers.get("Content-Length", "0")
+            self.__metrics.on_attempt(int(length))
+
+    def on_response(self, response: httpx.Response) -> Optional[float]:
+        """The backoff time, in seconds, before retrying a response, or None if
+        it must be returned.
+        """
+
+        if self.__rate_limiter is not None:
+            retry_after = parse_retry_after(response.headers)
+            self.__rate_limiter.on_response(response.status_code, retry_after)
+
+        if not self.__retry_policy.is_retry(response, self.__request.method):
+            return None
+
+        # With a rate limiter, it's the one making all requests wait for the
+        # server's hints, rather than just this one
+        retry_after = None
+        if self.__rate_limiter is None:
+            retry_after = parse_retry_after(response.headers)
+
+        return self.__retry(response.status_code, retry_after)
+
+    def on_error(self, error: httpx.NetworkError) -> Optional[float]:
+        """The backoff time, in seconds, before retrying a network error, or
+        None if it must be raised.
+        """
+
+        return self.__retry(None, None)
+
+    def __retry(
+        self, status_code: Optional[int], retry_after: Optional[float]
+    ) -> Optional[float]:
+        backoff = self.__retry_policy.get_backoff_time(self.__retries + 1, retry_after)
+        if not self.__may_retry(backoff):
+            return None
+
+        if self.__metrics is not None:
+            self.__metrics.on_retry(status_code)
+
+        self.__retries += 1
+        return backoff
+
+    def __may_retry(self, backoff: float) -> bool:
+        if self.__retries >= self.__retry_policy.max_retries:
+            return False
+
+        # Retrying is pointless once the circuit breaker opened
+        if self.__circuit_breaker is not None and self.__circuit_breaker.is_open():
+            return False
+
+        if (
+            self.__deadline is not None
+            and time.monotonic() + backoff >= self.__deadline
+        ):
+            return False
+
+        # Only withdraw from the budget if nothing else prevents the retry
+        return self.__retry_budget is None or self.__retry_budget.try_retry()
+
+    def __limit_timeout(self):
+        """Make sure the next attempt can't run past the deadline."""
+
+        remaining = max(0.0, self.__deadline - time.monotonic())
+        timeout = self.__request.extensions.get("timeout") or dict.fromkeys(
+            ("connect", "read", "write", "pool")
+        )
+        self.__request.extensions["timeout"] = {
+            key: remaining if value is None else min(value, remaining)
+            for key, value in timeout.items()
+        }
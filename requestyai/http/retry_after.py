@@ -0,0 +1,58 @@
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+# Reset values above this are absolute epoch timestamps rather than deltas
+_EPOCH_THRESHOLD = 10**9
+
+
+def _parse_seconds(value: str, now: float) -> Optional[float]:
+    """Parse a delay given either in seconds or as an HTTP date."""
+
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date is None:
+            return None
+        seconds = date.timestamp() - now
+    else:
+        if seconds > _EPOCH_THRESHOLD:
+            seconds -= now
+
+    return max(0.0, seconds)
+
+
+def parse_retry_after(
+    headers: httpx.Headers, now: Optional[float] = None
+) -> Optional[float]:
+    """How long, in seconds, the server asks clients to wait before sending
+    more requests, if it says so.
+
+    Understands the `Retry-After` header, as well as an exhausted rate limit,
+    i.e. `X-RateLimit-Remaining: 0` (or `RateLimit-Remaining: 0`) along with the
+    corresponding `Reset` header.
+
+    Args:
+        headers: The headers of the response.
+        now: [Optional] the current time, as a UNIX timestamp, to resolve dates.
+    """
+
+    now = now if now is not None else time.time()
+
+    retry_after = headers.get("Retry-After")
+    if retry_after is not None:
+        return _parse_seconds(retry_after.strip(), now)
+
+    for prefix in ("X-RateLimit", "RateLimit"):
+        remaining = headers.get(f"{prefix}-Remaining")
+        reset = headers.get(f"{prefix}-Reset")
+        if remaining is not None and reset is not None and remaining.strip() == "0":
+            return _parse_seconds(reset.strip(), now)
+
+    return None
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+
+from .fork import reset_after_fork
+
+
+class RetryBudget:
+    """Limits the retries of a client to a fraction of its requests.
+
+    Over a sliding window of `window` seconds, retries are allowed as long as
+    there were fewer than `ratio` retries per request, or fewer than
+    `min_retries` retries, so that clients sending few requests can still retry
+    them. This bounds the load retries add to a struggling server to a factor of
+    `1 + ratio`, whereas every request retrying on its own multiplies it by up
+    to `1 + max_retries`.
+    """
+
+    DEFAULT_RATIO = 0.2
+    DEFAULT_MIN_RETRIES = 10
+    DEFAULT_WINDOW = 10.0
+
+    # The window slides in steps of `window / __BUCKETS`
+    __BUCKETS = 10
+
+    def __init__(
+        self,
+        *,
+        ratio: float = DEFAULT_RATIO,
+        min_retries: int = DEFAULT_MIN_RETRIES,
+        window: float = DEFAULT_WINDOW,
+    ):
+        """
+        Args:
+            ratio: Maximal number of retries per request.
+            min_retries: Number of retries allowed in a window regardless of
+                         the ratio.
+            window: Length, in seconds, of the sliding window.
+        """
+
+        if ratio < 0:
+            raise ValueError("ratio must be non-negative")
+        if min_retries < 0:
+            raise ValueError("min_retries must be non-negative")
+        if window <= 0:
+            raise ValueError("window must be positive")
+
+        self.__ratio = ratio
+        self.__min_retries = min_retries
+        self.__bucket_width = window / self.__BUCKETS
+
+        self.__reset()
+        reset_after_fork(self)
+
+    def __reset(self):
+        self.__lock = threading.Lock()
+        # [bucket index, requests, retries], oldest first
+        self.__buckets: deque[list[int]] = deque()
+
+    def _after_fork_in_child(self):
+        """Reset the budget in a forked child process."""
+
+        self.__reset()
+
+    def __current_bucket(self) -> list[int]:
+        index = int(time.monotonic() / self.__bucket_width)
+
+        while self.__buckets and self.__buckets[0][0] <= index - self.__BUCKETS:
+            self.__buckets.popleft()
+
+        if not self.__buckets or self.__buckets[-1][0] != index:
+            self.__buckets.append([index, 0, 0])
+        return self.__buckets[-1]
+
+    def on_request(self):
+        """Record a new request, i.e. its first attempt."""
+
+        with self.__lock:
+            self.__current_bucket()[1] += 1
+
+    def try_retry(self) -> bool:
+        """Withdraw a retry from the budget, if it allows one.
+
+        Returns:
+            bool: Whether the request may be retried.
+        """
+
+        with self.__lock:
+            bucket = self.__current_bucket()
+            requests = sum(bucket[1] for bucket in self.__buckets)
+            retries = sum(bucket[2] for bucket in self.__buckets)
+
+            if retries >= max(self.__min_retries, self.__ratio * requests):
+                return False
+
+            bucket[2] += 1
+            return True
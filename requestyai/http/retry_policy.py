@@ -1,5 +1,5 @@
 import random
-from typing import Iterable
+from typing import Iterable, Optional
 
 import httpx
 
@@ -20,6 +20,7 @@ class RetryPolicy:
     }
     DEFAULT_ALLOWED_METHODS: set[str] = {"GET", "PUT", "DELETE"}
     DEFAULT_JITTER_TYPE = RetryJitterType.FULL
+    DEFAULT_MAX_RETRY_AFTER: float = 60.0
 
     def __init__(
         self,
@@ -28,12 +29,16 @@ class RetryPolicy:
         status_forcelist: Iterable[int] = DEFAULT_STATUS_FORCELIST.keys(),
         allowed_methods: Iterable[str] = DEFAULT_ALLOWED_METHODS,
         jitter_type: RetryJitterType = DEFAULT_JITTER_TYPE,
+        max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+        deadline: Optional[float] = None,
     ):
         self.__max_retries = max_retries
         self.__status_forcelist = set(status_forcelist)
         self.__backoff_factor = backoff_factor
         self.__allowed_methods = set(allowed_methods)
         self.__jitter_type = jitter_type
+        self.__max_retry_after = max_retry_after
+        self.__deadline = deadline
 
     @property
     def max_retries(self):
@@ -55,9 +60,32 @@ class RetryPolicy:
     def jitter_type(self) -> RetryJitterType:
         return self.__jitter_type
 
-    def get_backoff_time(self, retry_count: int) -> float:
-        """Calculate backoff delay with jitter."""
+    @property
+    def max_retry_after(self) -> float:
+        return self.__max_retry_after
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """Maximal total time, in seconds, spent sending a request, including all
+        of its attempts and the backoffs between them, or None if unbounded.
+        """
+        return self.__deadline
+
+    def get_backoff_time(
+        self, retry_count: int, retry_after: Optional[float] = None
+    ) -> float:
+        """Calculate backoff delay with jitter.
+
+        If the server asked to wait `retry_after` seconds, waits at least that
+        long, up to `max_retry_after` seconds.
+        """
+
+        backoff = self.__get_jittered_backoff_time(retry_count)
+        if retry_after is not None:
+            backoff = max(backoff, min(retry_after, self.__max_retry_after))
+        return backoff
 
+    def __get_jittered_backoff_time(self, retry_count: int) -> float:
         base_delay = self.__backoff_factor * (2 ** (retry_count - 1))
 
         if self.__jitter_type == RetryJitterType.EQUAL:
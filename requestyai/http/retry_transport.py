@@ -1,32 +1,67 @@
 import time
+from typing import Optional
 
 import httpx
 
+from .circuit_breaker import CircuitBreaker
+from .metrics import MetricsHooks
+from .rate_limiter import RateLimiter
+from .retrier import Retrier
+from .retry_budget import RetryBudget
 from .retry_policy import RetryPolicy
+from .shutdown import Shutdown
 
 
 class RetryTransport(httpx.HTTPTransport):
-    def __init__(self, retry_policy: RetryPolicy, **kwargs):
+    def __init__(
+        self,
+        retry_policy: RetryPolicy,
+        metrics: Optional[MetricsHooks] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        shutdown: Optional[Shutdown] = None,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
-        self.__retry_policy = retry_policy
+        self.__retrier = Retrier(
+            retry_policy=retry_policy,
+            metrics=metrics,
+            rate_limiter=rate_limiter,
+            circuit_breaker=circuit_breaker,
+            retry_budget=retry_budget,
+        )
+        self.__shutdown = shutdown
 
     def handle_request(self, request):
-        retries = 0
+        attempts = self.__retrier.start(request)
 
         while True:
+            delay = attempts.delay()
+            if delay > 0:
+                # Past the shutdown deadline, the attempt is sent right away
+                self.__wait(delay)
+
+            attempts.begin()
             try:
                 response = super().handle_request(request)
-
-                if not self.__retry_policy.is_retry(response, request.method):
+            except httpx.NetworkError as ex:
+                backoff = attempts.on_error(ex)
+                if backoff is None or not self.__wait(backoff):
+                    raise
+            else:
+                backoff = attempts.on_response(response)
+                if backoff is None or not self.__wait(backoff):
                     return response
 
-                if retries >= self.__retry_policy.max_retries:
-                    return response
+    def __wait(self, seconds: float) -> bool:
+        """Sleep, unless the client shuts down before the time is up.
 
-            except httpx.NetworkError:
-                if retries >= self.__retry_policy.max_retries:
-                    raise
+        Returns:
+            bool: Whether the whole time was waited.
+        """
 
-            retries += 1
-            backoff = self.__retry_policy.get_backoff_time(retries)
-            time.sleep(backoff)
+        if self.__shutdown is None:
+            time.sleep(seconds)
+            return True
+        return self.__shutdown.wait(seconds)
@@ -0,0 +1,49 @@
+import threading
+import time
+from typing import Optional
+
+
+class Shutdown:
+    """The shutdown of a client, which cuts the waits of its workers short.
+
+    Once `begin` is called, waits that would run past the shutdown deadline end
+    right away, rather than stalling `close` for as long as a backoff or a
+    server's `Retry-After` hint.
+    """
+
+    def __init__(self):
+        self.__started = threading.Event()
+        self.__deadline: Optional[float] = None
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """The `time.monotonic()` by which workers must be done, once started."""
+
+        return self.__deadline
+
+    def begin(self, deadline: float):
+        self.__deadline = deadline
+        self.__started.set()
+
+    def wait(self, seconds: float) -> bool:
+        """Wait for `seconds` seconds, unless that would run past the shutdown
+        deadline, whether it's already started or starts while waiting.
+
+        Returns:
+            bool: Whether the whole time was waited.
+        """
+
+        until = time.monotonic() + seconds
+        while True:
+            now = time.monotonic()
+            if now >= until:
+                return True
+
+            deadline = self.__deadline
+            if deadline is not None:
+                if until > deadline:
+                    return False
+                time.sleep(until - now)
+                return True
+
+            self.__started.wait(until - now)
@@ -0,0 +1,179 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, NamedTuple
+
+
+class SpoolRecord(NamedTuple):
+    method: str
+    url: str
+    body: bytes
+    batched: bool
+
+
+class Spool:
+    """An append-only, segmented, on-disk log of requests that weren't delivered.
+
+    Records are appended to the newest segment file of `directory`, which is
+    rotated once it grows beyond `segment_size` bytes. Writes are flushed to the
+    OS immediately, but only fsync-ed once every `fsync_interval` seconds.
+
+    Segments that already existed when the spool was opened are the ones
+    pending replay. A segment should only be removed after all of its records
+    were delivered, which makes the replay at-least-once.
+
+    A spool directory must not be shared by several clients or processes.
+    """
+
+    DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+    DEFAULT_FSYNC_INTERVAL = 1.0
+
+    SEGMENT_SUFFIX = ".seg"
+
+    # crc32, batched flag, method length, url length, body length
+    __HEADER = struct.Struct("<IBBHI")
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        max_size: int = DEFAULT_MAX_SIZE,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+    ):
+        os.makedirs(directory, exist_ok=True)
+
+        self.__directory = directory
+        self.__segment_size = segment_size
+        self.__max_size = max_size
+        self.__fsync_interval = fsync_interval
+
+        self.__lock = threading.Lock()
+
+        self.__pending = self.__list_segments()
+        self.__size = sum(os.path.getsize(path) for path in self.__pending)
+
+        last = self.__pending[-1] if self.__pending else None
+        self.__sequence = self.__segment_sequence(last) if last else 0
+
+        self.__file = None
+        self.__file_size = 0
+        self.__last_fsync = time.monotonic()
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    @property
+    def size(self) -> int:
+        """The total size, in bytes, of all segments."""
+        with self.__lock:
+            return self.__size
+
+    def __list_segments(self) -> list[str]:
+        names = sorted(
+            name
+            for name in os.listdir(self.__directory)
+            if name.endswith(self.SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.__directory, name) for name in names]
+
+    def __segment_sequence(self, path: str) -> int:
+        return int(os.path.basename(path)[: -len(self.SEGMENT_SUFFIX)])
+
+    def __rotate(self):
+        if self.__file is not None:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__file.close()
+
+        self.__sequence += 1
+        name = f"{self.__sequence:012d}{self.SEGMENT_SUFFIX}"
+        self.__file = open(os.path.join(self.__directory, name), "ab")
+        self.__file_size = 0
+
+    def append(self, record: SpoolRecord) -> bool:
+        """Append a record to the spool.
+
+        Returns:
+            bool: False if the record was discarded because the spool is full.
+        """
+
+        method = record.method.encode()
+        url = record.url.encode()
+        crc = zlib.crc32(record.body, zlib.crc32(url, zlib.crc32(method)))
+        header = self.__HEADER.pack(
+            crc, record.batched, len(method), len(url), len(record.body)
+        )
+        size = len(header) + len(method) + len(url) + len(record.body)
+
+        with self.__lock:
+            if self.__size + size > self.__max_size:
+                return False
+
+            if self.__file is None or self.__file_size >= self.__segment_size:
+                self.__rotate()
+
+            self.__file.write(header + method + url + record.body)
+            self.__file.flush()
+            self.__file_size += size
+            self.__size += size
+
+            now = time.monotonic()
+            if now - self.__last_fsync >= self.__fsync_interval:
+                os.fsync(self.__file.fileno())
+                self.__last_fsync = now
+
+        return True
+
+    def pending_segments(self) -> list[str]:
+        """The segments that existed when the spool was opened, oldest first."""
+        with self.__lock:
+            return list(self.__pending)
+
+    def read_segment(self, path: str) -> Iterator[SpoolRecord]:
+        """Iterate over the records of a segment.
+
+        Reading stops at the first truncated or corrupt record, which is what a
+        crash in the middle of a write leaves behind.
+        """
+
+        header_size = self.__HEADER.size
+
+        with open(path, "rb") as file:
+            while True:
+                header = file.read(header_size)
+                if len(header) < header_size:
+                    return
+
+                crc, batched, method_len, url_len, body_len = self.__HEADER.unpack(
+                    header
+                )
+                payload = file.read(method_len + url_len + body_len)
+                if len(payload) < method_len + url_len + body_len:
+                    return
+
+                method = payload[:method_len]
+                url = payload[method_len : method_len + url_len]
+                body = payload[method_len + url_len :]
+                if zlib.crc32(body, zlib.crc32(url, zlib.crc32(method))) != crc:
+                    return
+
+                yield SpoolRecord(method.decode(), url.decode(), body, bool(batched))
+
+    def remove_segment(self, path: str):
+        with self.__lock:
+            self.__size -= os.path.getsize(path)
+            self.__pending.remove(path)
+            os.remove(path)
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.flush()
+                os.fsync(self.__file.fileno())
+                self.__file.close()
+                self.__file = None
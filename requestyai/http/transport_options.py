@@ -0,0 +1,55 @@
+from typing import Optional, Union
+
+import httpx
+
+try:
+    import h2
+except ImportError:  # HTTP/2 is optional
+    h2 = None
+
+
+def default_limits(max_in_flight: int) -> httpx.Limits:
+    """The connection pool limits of a client sending up to `max_in_flight`
+    concurrent requests.
+
+    The pool can keep a connection alive per concurrent request, so a busy pool
+    never churns connections.
+    """
+
+    return httpx.Limits(
+        max_connections=max(100, max_in_flight),
+        max_keepalive_connections=max(20, max_in_flight),
+    )
+
+
+def transport_options(
+    *,
+    limits: httpx.Limits,
+    http2: bool = False,
+    proxy: Optional[Union[str, httpx.Proxy]] = None,
+    local_address: Optional[str] = None,
+) -> dict:
+    """The keyword arguments of the HTTP transport wrapped by a retry transport.
+
+    Args:
+        limits: The connection pool limits, including the keep-alive expiry.
+        http2: Whether to negotiate HTTP/2, multiplexing concurrent requests
+               over a single connection. Requires the `h2` package.
+        proxy: [Optional] the URL of a proxy to send all requests through.
+        local_address: [Optional] the local IP address to connect from.
+
+    Returns:
+        dict: The options to pass to `RetryTransport` or `AsyncRetryTransport`.
+    """
+
+    if http2 and h2 is None:
+        raise ValueError(
+            "HTTP/2 requires the 'h2' package, install it with 'httpx[http2]'"
+        )
+
+    options = {"limits": limits, "http2": http2}
+    if proxy is not None:
+        options["proxy"] = httpx.Proxy(proxy) if isinstance(proxy, str) else proxy
+    if local_address is not None:
+        options["local_address"] = local_address
+    return options
@@ -16,6 +16,8 @@ class Model:
         self.__insights = AInsights.new_client(
             api_key=requesty_api_key, base_url=requesty_base_url
         )
+        # Capture every completion automatically
+        self.__insights.instrument(self.__model)
 
     def chat(self, user_id: str, user_input: str):
         messages = [
@@ -27,11 +29,7 @@ class Model:
             answer: str
 
         response = self.__model.beta.chat.completions.parse(
-            messages=messages, response_format=Response, **self.__args
-        )
-
-        self.__insights.capture(
-            messages=messages, response=response, args=self.__args, user_id=user_id
+            messages=messages, response_format=Response, user=user_id, **self.__args
         )
 
         content = response.choices[0].message.content
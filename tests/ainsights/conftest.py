@@ -0,0 +1,60 @@
+import pytest
+from openai.types.chat import ChatCompletion, ParsedChatCompletionMessage, ParsedChoice
+from openai.types.completion_usage import (
+    CompletionTokensDetails,
+    CompletionUsage,
+    PromptTokensDetails,
+)
+
+from requestyai import AInsights
+
+from .helpers import mock_client
+
+
+@pytest.fixture
+def client():
+    return mock_client()
+
+
+@pytest.fixture
+def insights(client):
+    return AInsights(client=client)
+
+
+@pytest.fixture
+def response():
+    return ChatCompletion(
+        id="chatcmpl-AUDTiRQf5GPu0FIr7JDLvOrlylztj",
+        choices=[
+            ParsedChoice(
+                finish_reason="stop",
+                index=0,
+                logprobs=None,
+                message=ParsedChatCompletionMessage(
+                    content="How can I assist you today?",
+                    refusal=None,
+                    role="assistant",
+                    audio=None,
+                    function_call=None,
+                    tool_calls=[],
+                ),
+            )
+        ],
+        created=1731765014,
+        model="gpt-4o-mini-2024-07-18",
+        object="chat.completion",
+        service_tier=None,
+        system_fingerprint="fp_0ba0d124f1",
+        usage=CompletionUsage(
+            completion_tokens=13,
+            prompt_tokens=50,
+            total_tokens=63,
+            completion_tokens_details=CompletionTokensDetails(
+                accepted_prediction_tokens=0,
+                audio_tokens=0,
+                reasoning_tokens=0,
+                rejected_prediction_tokens=0,
+            ),
+            prompt_tokens_details=PromptTokensDetails(audio_tokens=0, cached_tokens=0),
+        ),
+    )
@@ -0,0 +1,47 @@
+import json
+from concurrent.futures import Future
+from unittest.mock import Mock
+
+import httpx
+
+from requestyai.ainsights.types.event import AInsightsEvent
+from requestyai.http.async_client import AsyncClient
+
+
+def resolved(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def mock_client() -> Mock:
+    """A mocked `AsyncClient`, whose circuit is closed, and whose requests all
+    succeed right away.
+    """
+
+    client = Mock(spec=AsyncClient)
+    client.drop_if_circuit_open.return_value = None
+    client.put.return_value = resolved(httpx.Response(200))
+    client.put_batched.return_value = resolved(httpx.Response(200))
+    return client
+
+
+def build_event(response, **kwargs) -> AInsightsEvent:
+    fields = dict(
+        response=response,
+        messages=None,
+        template=None,
+        inputs={},
+        args={},
+        meta={},
+        user_id=None,
+    )
+    fields.update(kwargs)
+    return AInsightsEvent(**fields)
+
+
+def captured(client) -> dict:
+    """The single event sent through a mocked client."""
+
+    client.put.assert_called_once()
+    return json.loads(client.put.call_args[1]["data"])
@@ -0,0 +1,188 @@
+import json
+from unittest.mock import Mock
+
+import httpx
+import pytest
+
+from requestyai import AsyncAInsights
+from requestyai.ainsights.error import (
+    AInsightsCircuitOpenError,
+    AInsightsDroppedError,
+    AInsightsValueError,
+)
+from requestyai.http.circuit_breaker import CircuitBreaker
+from requestyai.http.circuit_state import CircuitState
+from requestyai.http.flush_result import FlushResult
+
+
+@pytest.fixture
+def requests():
+    return []
+
+
+@pytest.fixture
+def insights(requests):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200)
+
+    client = httpx.AsyncClient(
+        base_url="http://test.com", transport=httpx.MockTransport(handler)
+    )
+    return AsyncAInsights(client=client)
+
+
+class TestAsyncAInsights:
+    async def test_capture_is_awaitable(self, insights, requests, response):
+        messages = [{"role": "user", "content": "test"}]
+        result = await insights.capture(response=response, messages=messages)
+
+        assert result.status_code == 200
+        assert len(requests) == 1
+        assert requests[0].method == "PUT"
+        assert requests[0].url.path == "/insight"
+
+        obj = json.loads(requests[0].content)
+        assert obj["messages"] == messages
+        assert obj["response"] == response.model_dump()
+
+    async def test_aclose_dispatches_pending_events(self, insights, requests, response):
+        for _ in range(5):
+            insights.capture(response=response, messages="test")
+
+        await insights.aclose()
+
+        assert len(requests) == 5
+
+    async def test_flush(self, insights, requests, response):
+        for _ in range(3):
+            insights.capture(response=response, messages="test")
+
+        result = await insights.flush()
+
+        assert result == FlushResult(delivered=3, failed=0, pending=0)
+        assert len(requests) == 3
+        await insights.aclose()
+
+    async def test_flush_counts_failed_tasks(self, response):
+        breaker = Mock(spec=CircuitBreaker)
+        breaker.is_open.return_value = False
+        breaker.allow.return_value = True
+        breaker.on_success.side_effect = RuntimeError("Breaker failed")
+        client = httpx.AsyncClient(
+            base_url="http://test.com",
+            transport=httpx.MockTransport(lambda request: httpx.Response(200)),
+        )
+        insights = AsyncAInsights(client=client, circuit_breaker=breaker)
+
+        insights.capture(response=response, messages="test")
+        insights.capture(response=response, messages="test").cancel()
+        result = await insights.flush()
+
+        assert result == FlushResult(delivered=0, failed=2, pending=0)
+        await insights.aclose()
+
+    async def test_context_manager(self, insights, requests, response):
+        async with insights as client:
+            client.capture(response=response, messages="test")
+
+        assert len(requests) == 1
+
+    async def test_capture_returns_errors(self, response):
+        error = httpx.ConnectError("Unreachable")
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise error
+
+        client = httpx.AsyncClient(
+            base_url="http://test.com", transport=httpx.MockTransport(handler)
+        )
+        async with AsyncAInsights(client=client) as insights:
+            result = await insights.capture(response=response, messages="test")
+
+        assert result is error
+
+    async def test_capture_validates_arguments(self, insights, response):
+        with pytest.raises(AInsightsValueError):
+            insights.capture(response=response, template="template", inputs=None)
+
+    async def test_build(self):
+        insights = AsyncAInsights.new_client(api_key="test_key")
+        assert isinstance(insights, AsyncAInsights)
+        await insights.aclose()
+
+
+class TestAsyncAInsightsCircuitBreaker:
+    async def test_open_circuit_drops_events(self, response):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(500)
+
+        client = httpx.AsyncClient(
+            base_url="http://test.com", transport=httpx.MockTransport(handler)
+        )
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        insights = AsyncAInsights(client=client, circuit_breaker=breaker)
+
+        for _ in range(2):
+            await insights.capture(response=response, messages="test")
+        assert breaker.state == CircuitState.OPEN
+
+        result = await insights.capture(response=response, messages="test")
+        assert isinstance(result, AInsightsDroppedError)
+        assert len(requests) == 2
+        await insights.aclose()
+
+    @pytest.fixture
+    def open_breaker(self):
+        breaker = Mock(spec=CircuitBreaker)
+        breaker.is_open.return_value = True
+        breaker.allow.return_value = False
+        return breaker
+
+    async def test_open_circuit_skips_validation(self, open_breaker):
+        insights = AsyncAInsights(
+            client=httpx.AsyncClient(), circuit_breaker=open_breaker
+        )
+
+        # Invalid arguments, which would raise if the event was validated
+        result = await insights.capture(response=None)
+
+        assert isinstance(result, AInsightsDroppedError)
+        await insights.aclose()
+
+    async def test_open_circuit_fallback(self, response, open_breaker):
+        records = []
+        insights = AsyncAInsights(
+            client=httpx.AsyncClient(),
+            circuit_breaker=open_breaker,
+            circuit_fallback=records.append,
+        )
+
+        result = await insights.capture(response=response, messages="test")
+
+        assert isinstance(result, AInsightsCircuitOpenError)
+        (record,) = records
+        assert record.method == "PUT"
+        assert record.url == "insight"
+        assert json.loads(record.body)["messages"] == "test"
+        await insights.aclose()
+
+    async def test_failing_fallback(self, response, open_breaker):
+        error = RuntimeError("Fallback failed")
+
+        def fallback(record):
+            raise error
+
+        insights = AsyncAInsights(
+            client=httpx.AsyncClient(),
+            circuit_breaker=open_breaker,
+            circuit_fallback=fallback,
+        )
+
+        result = await insights.capture(response=response, messages="test")
+
+        assert result is error
+        await insights.aclose()
@@ -0,0 +1,223 @@
+import json
+
+import httpx
+import pytest
+
+from requestyai.ainsights.batch_import import (
+    Checkpoint,
+    import_batch,
+    main,
+    read_batch,
+)
+
+from .helpers import resolved
+
+
+def request_line(custom_id: str, url="/v1/chat/completions") -> dict:
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": url,
+        "body": {
+            "model": "gpt-4o-mini",
+            "messages": [{"role": "user", "content": f"Hello {custom_id}"}],
+            "user": "user_1",
+        },
+    }
+
+
+def result_line(custom_id: str, response, status_code=200, error=None) -> dict:
+    return {
+        "id": f"batch_req_{custom_id}",
+        "custom_id": custom_id,
+        "response": {
+            "status_code": status_code,
+            "request_id": f"req_{custom_id}",
+            "body": response.model_dump(mode="json"),
+        },
+        "error": error,
+    }
+
+
+def write_jsonl(path, lines):
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    return str(path)
+
+
+@pytest.fixture
+def batch(tmp_path, response):
+    input_path = write_jsonl(
+        tmp_path / "input.jsonl",
+        [
+            request_line("1"),
+            request_line("2"),
+            request_line("3"),
+            request_line("4", url="/v1/embeddings"),
+        ],
+    )
+    # Results come in any order, and may have failed
+    output_path = write_jsonl(
+        tmp_path / "output.jsonl",
+        [
+            result_line("3", response),
+            result_line("1", response),
+            result_line("4", response),
+            result_line("2", response, status_code=500),
+            result_line("5", response),
+        ],
+    )
+    return input_path, output_path
+
+
+def sent_events(client) -> list[dict]:
+    return [json.loads(call[1]["data"]) for call in client.put.call_args_list]
+
+
+class TestReadBatch:
+    def test_results_are_joined_with_requests(self, batch, response):
+        events = [event for _, event in read_batch(*batch, meta={"job": "nightly"})]
+
+        assert [event is not None for event in events] == [
+            True,
+            True,
+            False,
+            False,
+            False,
+        ]
+        event = events[0]
+        assert event.messages == [{"role": "user", "content": "Hello 3"}]
+        assert event.args == {"model": "gpt-4o-mini", "user": "user_1"}
+        assert event.user_id == "user_1"
+        assert event.response.id == response.id
+        assert event.meta == {
+            "job": "nightly",
+            "batch": {"custom_id": "3", "request_id": "req_3"},
+        }
+
+    def test_offsets(self, batch):
+        offsets = [offset for offset, _ in read_batch(*batch)]
+
+        with open(batch[1], "rb") as file:
+            lines = file.readlines()
+        assert offsets[0] == len(lines[0])
+        assert offsets[-1] == sum(len(line) for line in lines)
+
+    def test_start(self, batch):
+        with open(batch[1], "rb") as file:
+            start = len(file.readline())
+
+        events = [event for _, event in read_batch(*batch, start=start)]
+
+        assert len(events) == 4
+        assert events[0].meta["batch"]["custom_id"] == "1"
+
+
+class TestImportBatch:
+    def test_import(self, insights, client, batch):
+        result = import_batch(insights, *batch)
+
+        assert result == (2, 0, 3)
+        assert [
+            event["meta"]["batch"]["custom_id"] for event in sent_events(client)
+        ] == [
+            "3",
+            "1",
+        ]
+
+    def test_failures(self, insights, client, batch):
+        client.put.side_effect = lambda **kwargs: resolved(httpx.Response(500))
+
+        assert import_batch(insights, *batch) == (0, 2, 3)
+
+    def test_checkpoint_resumes(self, insights, client, batch, tmp_path):
+        checkpoint_path = str(tmp_path / "checkpoint.json")
+        with open(batch[1], "rb") as file:
+            Checkpoint(checkpoint_path, batch[1]).save(len(file.readline()))
+
+        result = import_batch(insights, *batch, checkpoint_path=checkpoint_path)
+
+        assert result == (1, 0, 3)
+        assert sent_events(client)[0]["meta"]["batch"]["custom_id"] == "1"
+
+        # Everything was imported, so there's nothing left to resume
+        client.put.reset_mock()
+        assert import_batch(insights, *batch, checkpoint_path=checkpoint_path) == (
+            0,
+            0,
+            0,
+        )
+        client.put.assert_not_called()
+
+    def test_failed_events_are_imported_on_resume(
+        self, insights, client, batch, tmp_path
+    ):
+        checkpoint_path = str(tmp_path / "checkpoint.json")
+        statuses = iter([200, 500])
+        client.put.side_effect = lambda **kwargs: resolved(
+            httpx.Response(next(statuses))
+        )
+
+        assert import_batch(insights, *batch, checkpoint_path=checkpoint_path) == (
+            1,
+            1,
+            3,
+        )
+
+        # Resumed from the first result that failed
+        client.put.reset_mock()
+        client.put.side_effect = lambda **kwargs: resolved(httpx.Response(200))
+        result = import_batch(insights, *batch, checkpoint_path=checkpoint_path)
+
+        assert result == (1, 0, 3)
+        assert sent_events(client)[0]["meta"]["batch"]["custom_id"] == "1"
+
+    def test_checkpoint_is_saved_while_importing(
+        self, insights, client, batch, tmp_path
+    ):
+        checkpoint_path = str(tmp_path / "checkpoint.json")
+        saved = []
+        client.put.side_effect = lambda **kwargs: (
+            saved.append(Checkpoint(checkpoint_path, batch[1]).load())
+            or resolved(httpx.Response(200))
+        )
+
+        import_batch(
+            insights,
+            *batch,
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=1,
+            max_pending=1,
+        )
+
+        with open(batch[1], "rb") as file:
+            first = len(file.readline())
+        assert saved == [0, first]
+
+
+class TestCheckpoint:
+    def test_missing(self, tmp_path, batch):
+        assert Checkpoint(str(tmp_path / "missing.json"), batch[1]).load() == 0
+
+    def test_other_file(self, tmp_path, batch):
+        path = str(tmp_path / "checkpoint.json")
+        Checkpoint(path, batch[0]).save(10)
+
+        assert Checkpoint(path, batch[1]).load() == 0
+
+    def test_truncated_file(self, tmp_path, batch):
+        path = str(tmp_path / "checkpoint.json")
+        Checkpoint(path, batch[1]).save(10**9)
+
+        assert Checkpoint(path, batch[1]).load() == 0
+
+
+class TestMain:
+    def test_api_key_is_required(self, batch, monkeypatch):
+        monkeypatch.delenv("REQUESTY_API_KEY", raising=False)
+
+        with pytest.raises(SystemExit):
+            main(list(batch))
+
+    def test_invalid_meta(self, batch):
+        with pytest.raises(SystemExit):
+            main([*batch, "--api-key", "test", "--meta", "invalid"])
@@ -1,105 +1,68 @@
 import json
+import threading
+from concurrent.futures import Future
 from unittest.mock import Mock, patch
 
+import httpx
 import pytest
-from openai.types.chat import ChatCompletion, ParsedChatCompletionMessage, ParsedChoice
-from openai.types.completion_usage import (
-    CompletionTokensDetails,
-    CompletionUsage,
-    PromptTokensDetails,
-)
 
 from requestyai import AInsights
-from requestyai.http.async_client import AsyncClient
-
-
-@pytest.fixture
-def mock_async_client():
-    return Mock(spec=AsyncClient)
-
-
-@pytest.fixture
-def response():
-    return ChatCompletion(
-        id="chatcmpl-AUDTiRQf5GPu0FIr7JDLvOrlylztj",
-        choices=[
-            ParsedChoice(
-                finish_reason="stop",
-                index=0,
-                logprobs=None,
-                message=ParsedChatCompletionMessage(
-                    content="How can I assist you today?",
-                    refusal=None,
-                    role="assistant",
-                    audio=None,
-                    function_call=None,
-                    tool_calls=[],
-                ),
-            )
-        ],
-        created=1731765014,
-        model="gpt-4o-mini-2024-07-18",
-        object="chat.completion",
-        service_tier=None,
-        system_fingerprint="fp_0ba0d124f1",
-        usage=CompletionUsage(
-            completion_tokens=13,
-            prompt_tokens=50,
-            total_tokens=63,
-            completion_tokens_details=CompletionTokensDetails(
-                accepted_prediction_tokens=0,
-                audio_tokens=0,
-                reasoning_tokens=0,
-                rejected_prediction_tokens=0,
-            ),
-            prompt_tokens_details=PromptTokensDetails(audio_tokens=0, cached_tokens=0),
-        ),
-    )
-
-
-@pytest.fixture
-def insights(mock_async_client):
-    return AInsights(client=mock_async_client)
+from requestyai.ainsights.error import (
+    AInsightsCircuitOpenError,
+    AInsightsDroppedError,
+    AInsightsError,
+    AInsightsSpooledError,
+    AInsightsValueError,
+)
+from requestyai.ainsights.exporter import InMemoryExporter
+from requestyai.ainsights.types.event import AInsightsEvent
+from requestyai.http.circuit_breaker import CircuitBreaker
+from requestyai.http.compression_type import CompressionType
+from requestyai.http.error import DispatchError
+from requestyai.http.lazy_content import LazyContent
+from requestyai.http.overflow_policy import OverflowPolicy
+
+from .helpers import resolved
 
 
 class TestAInsights:
-    def test_init(self, mock_async_client):
-        client = AInsights(client=mock_async_client)
-        assert client._AInsights__client == mock_async_client
+    def test_init(self, client):
+        insights = AInsights(client=client)
+        assert insights._AInsights__client == client
 
-    def test_capture_response(self, insights, response):
+    def test_capture_response(self, insights, client, response):
         message = "test message"
         insights.capture(response=response, messages=message)
-        insights._AInsights__client.put.assert_called_once()
-        call_data = insights._AInsights__client.put.call_args[1]["data"]
+        client.put.assert_called_once()
+        call_data = client.put.call_args[1]["data"]
         obj = json.loads(call_data)
         assert obj["response"] == response.model_dump()
 
-    def test_capture_messages_string(self, insights, response):
+    def test_capture_messages_string(self, insights, client, response):
         messages = "test message"
         insights.capture(response=response, messages=messages)
-        insights._AInsights__client.put.assert_called_once()
-        call_data = insights._AInsights__client.put.call_args[1]["data"]
+        client.put.assert_called_once()
+        call_data = client.put.call_args[1]["data"]
         obj = json.loads(call_data)
         assert obj["messages"] == messages
 
-    def test_capture_messages_list_of_strings(self, insights, response):
+    def test_capture_messages_list_of_strings(self, insights, client, response):
         messages = ["message1", "message2"]
         insights.capture(response=response, messages=messages)
-        insights._AInsights__client.put.assert_called_once()
-        call_data = insights._AInsights__client.put.call_args[1]["data"]
+        client.put.assert_called_once()
+        call_data = client.put.call_args[1]["data"]
         obj = json.loads(call_data)
         assert obj["messages"] == messages
 
-    def test_capture_messages_list_of_dicts(self, insights, response):
+    def test_capture_messages_list_of_dicts(self, insights, client, response):
         messages = [{"role": "user", "content": "test"}]
         insights.capture(response=response, messages=messages)
-        insights._AInsights__client.put.assert_called_once()
-        call_data = insights._AInsights__client.put.call_args[1]["data"]
+        client.put.assert_called_once()
+        call_data = client.put.call_args[1]["data"]
         obj = json.loads(call_data)
         assert obj["messages"] == messages
 
-    def test_capture_args(self, insights, response):
+    def test_capture_args(self, insights, client, response):
         args = {"model": "gpt-4o-mini", "temperature": 0.7, "max_tokens": 150}
         messages = "test message"
         insights.capture(
@@ -107,12 +70,12 @@ class TestAInsights:
             messages=messages,
             args=args,
         )
-        insights._AInsights__client.put.assert_called_once()
-        call_data = insights._AInsights__client.put.call_args[1]["data"]
+        client.put.assert_called_once()
+        call_data = client.put.call_args[1]["data"]
         obj = json.loads(call_data)
         assert obj["args"] == args
 
-    def test_capture_user_id(self, insights, response):
+    def test_capture_user_id(self, insights, client, response):
         user_id = "test_user"
         messages = [{"role": "user", "content": "test"}]
         insights.capture(
@@ -120,12 +83,12 @@ class TestAInsights:
             messages=messages,
             user_id=user_id,
         )
-        insights._AInsights__client.put.assert_called_once()
-        call_data = insights._AInsights__client.put.call_args[1]["data"]
+        client.put.assert_called_once()
+        call_data = client.put.call_args[1]["data"]
         obj = json.loads(call_data)
         assert obj["user_id"] == user_id
 
-    def test_capture_meta(self, insights, response):
+    def test_capture_meta(self, insights, client, response):
         meta = {"page": "ask ai", "latency": 1.23}
         messages = [{"role": "user", "content": "test"}]
         insights.capture(
@@ -133,11 +96,78 @@ class TestAInsights:
             messages=messages,
             meta=meta,
         )
-        insights._AInsights__client.put.assert_called_once()
-        call_data = insights._AInsights__client.put.call_args[1]["data"]
+        client.put.assert_called_once()
+        call_data = client.put.call_args[1]["data"]
         obj = json.loads(call_data)
         assert obj["meta"] == meta
 
+    def test_capture_batched(self, client, response):
+        insights = AInsights(client=client, batched=True)
+        messages = [{"role": "user", "content": "test"}]
+        insights.capture(response=response, messages=messages)
+
+        client.put.assert_not_called()
+        client.put_batched.assert_called_once()
+        call_data = client.put_batched.call_args[1]["data"]
+        obj = json.loads(call_data)
+        assert obj["messages"] == messages
+
+    def test_capture_deferred(self, client, response):
+        insights = AInsights(client=client, defer_serialization=True)
+        messages = [{"role": "user", "content": "test"}]
+        meta = {"tags": ["a"]}
+        insights.capture(response=response, messages=messages, meta=meta)
+
+        call_data = client.put.call_args[1]["data"]
+        assert isinstance(call_data, LazyContent)
+
+        # Modifying the arguments after the capture doesn't affect the event
+        messages[0]["content"] = "modified"
+        messages.append({"role": "user", "content": "appended"})
+        meta["tags"].append("b")
+
+        obj = json.loads(call_data.render())
+        assert obj["messages"] == [{"role": "user", "content": "test"}]
+        assert obj["meta"] == {"tags": ["a"]}
+        assert obj["response"] == response.model_dump()
+
+    def test_capture_deferred_validates_arguments(self, client, response):
+        insights = AInsights(client=client, defer_serialization=True)
+        with pytest.raises(AInsightsValueError):
+            insights.capture(response=response, template="template", inputs=None)
+
+    def test_capture_deferred_batched(self, client, response):
+        insights = AInsights(client=client, batched=True, defer_serialization=True)
+        insights.capture(response=response, messages="test")
+
+        call_data = client.put_batched.call_args[1]["data"]
+        assert json.loads(call_data.render())["messages"] == "test"
+
+    def test_flush(self, insights, client):
+        insights.flush(timeout=5)
+        client.flush.assert_called_once_with(timeout=5)
+
+    def test_open_circuit_skips_validation(self):
+        breaker = Mock(spec=CircuitBreaker)
+        breaker.is_open.return_value = True
+        insights = AInsights.new_client(api_key="test_key", circuit_breaker=breaker)
+
+        # Invalid arguments, which would raise if the event was validated
+        result = insights.capture(response=None).result()
+
+        assert isinstance(result, AInsightsDroppedError)
+        assert insights.stats().dropped == 1
+        insights.close()
+
+    def test_open_circuit_with_exporter_builds_event(self, client):
+        client.drop_if_circuit_open.return_value = Future()
+        insights = AInsights(client=client, exporters=[InMemoryExporter()])
+
+        with pytest.raises(AInsightsValueError):
+            insights.capture(response=None)
+        client.drop_if_circuit_open.assert_not_called()
+        insights.close()
+
     def test_build(self):
         api_key = "test_key"
         custom_url = "https://custom.api.com"
@@ -170,3 +200,170 @@ class TestAInsights:
                 "Authorization": f"Bearer {api_key}",
             },
         )
+
+    @patch("requestyai.ainsights.client.AsyncClient")
+    def test_build_batched(self, mock_async_client):
+        api_key = "test_key"
+        AInsights.new_client(api_key=api_key, batch_size=100, batch_timeout=0.2)
+
+        mock_async_client.assert_called_once_with(
+            base_url=AInsights.DEFAULT_BASE_URL,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            },
+            batch_size=100,
+            batch_timeout=0.2,
+        )
+
+    @patch("requestyai.ainsights.client.AsyncClient")
+    def test_build_with_workers(self, mock_async_client):
+        api_key = "test_key"
+        AInsights.new_client(api_key=api_key, workers=4, max_in_flight=8)
+
+        mock_async_client.assert_called_once_with(
+            base_url=AInsights.DEFAULT_BASE_URL,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            },
+            workers=4,
+            max_in_flight=8,
+        )
+
+    @patch("requestyai.ainsights.client.AsyncClient")
+    def test_build_with_compression(self, mock_async_client):
+        AInsights.new_client(
+            api_key="test_key",
+            compression=CompressionType.GZIP,
+            compression_threshold=512,
+        )
+
+        compressor = mock_async_client.call_args[1]["compressor"]
+        assert compressor.compression_type == CompressionType.GZIP
+        assert compressor.threshold == 512
+
+    @patch("requestyai.ainsights.client.AsyncClient")
+    def test_build_with_bounded_queue(self, mock_async_client):
+        api_key = "test_key"
+        AInsights.new_client(
+            api_key=api_key,
+            max_queue_size=1000,
+            overflow_policy=OverflowPolicy.DROP_OLDEST,
+        )
+
+        mock_async_client.assert_called_once_with(
+            base_url=AInsights.DEFAULT_BASE_URL,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            },
+            max_queue_size=1000,
+            overflow_policy=OverflowPolicy.DROP_OLDEST,
+        )
+
+    @patch("requestyai.ainsights.client.AsyncClient")
+    def test_build_with_transport_options(self, mock_async_client):
+        api_key = "test_key"
+        timeout = httpx.Timeout(10, connect=2)
+        limits = httpx.Limits(max_connections=10, keepalive_expiry=60)
+        AInsights.new_client(
+            api_key=api_key,
+            timeout=timeout,
+            limits=limits,
+            http2=True,
+            proxy="http://proxy:3128",
+        )
+
+        mock_async_client.assert_called_once_with(
+            base_url=AInsights.DEFAULT_BASE_URL,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            },
+            timeout=timeout,
+            limits=limits,
+            http2=True,
+            proxy="http://proxy:3128",
+        )
+
+
+class TestCaptureMany:
+    @staticmethod
+    def event(response, message: str) -> AInsightsEvent:
+        return AInsightsEvent(
+            response=response,
+            messages=message,
+            template=None,
+            inputs={},
+            args={},
+            meta={},
+            user_id=None,
+        )
+
+    def test_events_are_captured(self, insights, client, response):
+        client.put.side_effect = lambda **kwargs: resolved(httpx.Response(200))
+        results = []
+
+        result = insights.capture_many(
+            (self.event(response, str(i)) for i in range(5)),
+            on_result=results.append,
+        )
+
+        assert result.delivered == 5
+        assert results == [True] * 5
+        messages = [
+            json.loads(call[1]["data"])["messages"]
+            for call in client.put.call_args_list
+        ]
+        assert messages == ["0", "1", "2", "3", "4"]
+
+    def test_failures_are_counted(self, insights, client, response):
+        results = iter([httpx.Response(200), httpx.Response(500), Exception()])
+        client.put.side_effect = lambda **kwargs: resolved(next(results))
+
+        delivered = []
+
+        result = insights.capture_many(
+            (self.event(response, str(i)) for i in range(3)),
+            on_result=delivered.append,
+        )
+
+        assert (result.delivered, result.failed) == (1, 2)
+        assert delivered == [True, False, False]
+
+    def test_pending_events_are_bounded(self, insights, client, response):
+        futures = []
+        consumed = []
+
+        def put(**kwargs):
+            # Only resolved once capture_many waits for them
+            future = Future()
+            futures.append(future)
+            threading.Timer(0.01, future.set_result, [httpx.Response(200)]).start()
+            return future
+
+        client.put.side_effect = put
+
+        def events():
+            for i in range(10):
+                consumed.append(sum(not future.done() for future in futures))
+                yield self.event(response, str(i))
+
+        result = insights.capture_many(events(), max_pending=3)
+
+        assert result.delivered == 10
+        assert max(consumed) <= 3
+
+    def test_max_pending(self, insights):
+        with pytest.raises(ValueError):
+            insights.capture_many([], max_pending=0)
+
+
+@pytest.mark.parametrize(
+    "error", [AInsightsDroppedError, AInsightsSpooledError, AInsightsCircuitOpenError]
+)
+def test_dispatch_errors_are_ainsights_errors(error):
+    assert isinstance(error("Not dispatched"), DispatchError)
+    with pytest.raises(AInsightsError):
+        raise error("Not dispatched")
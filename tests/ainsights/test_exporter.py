@@ -0,0 +1,292 @@
+import asyncio
+import io
+import json
+import threading
+from unittest.mock import Mock
+
+import httpx
+import pytest
+
+from requestyai import AInsights, AsyncAInsights
+from requestyai.ainsights.error import AInsightsExportError
+from requestyai.ainsights.export_queue import ExportQueue
+from requestyai.ainsights.exporter import (
+    CallbackExporter,
+    Exporter,
+    HttpExporter,
+    InMemoryExporter,
+    NDJSONExporter,
+    StdoutExporter,
+)
+from requestyai.ainsights.projection import Projection
+from requestyai.ainsights.template_cache import TemplateCache
+from requestyai.http.lazy_content import LazyContent
+
+from .helpers import resolved
+
+
+class TestExporters:
+    def test_arguments(self):
+        with pytest.raises(ValueError):
+            InMemoryExporter(batch_size=0)
+        with pytest.raises(ValueError):
+            InMemoryExporter(batch_timeout=-1)
+        with pytest.raises(ValueError):
+            InMemoryExporter(max_queue_size=0)
+
+    def test_ndjson(self, tmp_path):
+        path = tmp_path / "events.ndjson"
+        exporter = NDJSONExporter(str(path))
+
+        exporter.export(['{"a": 1}', '{"b": 2}'])
+        exporter.export(['{"c": 3}'])
+        exporter.close()
+
+        assert path.read_text().splitlines() == ['{"a": 1}', '{"b": 2}', '{"c": 3}']
+
+    def test_stdout(self, capsys):
+        StdoutExporter().export(['{"a": 1}', '{"b": 2}'])
+
+        assert capsys.readouterr().out == '{"a": 1}\n{"b": 2}\n'
+
+    def test_stream(self):
+        stream = io.StringIO()
+        StdoutExporter(stream).export(['{"a": 1}'])
+
+        assert stream.getvalue() == '{"a": 1}\n'
+
+    def test_in_memory(self):
+        exporter = InMemoryExporter()
+        exporter.export(['{"a": 1}'])
+
+        assert exporter.events == ['{"a": 1}']
+        exporter.clear()
+        assert exporter.events == []
+
+    def test_callback(self):
+        callback = Mock()
+        CallbackExporter(callback).export(['{"a": 1}'])
+
+        callback.assert_called_once_with(['{"a": 1}'])
+
+    def test_http(self, client):
+        exporter = HttpExporter(client=client)
+
+        exporter.export(['{"a": 1}', '{"b": 2}'])
+        exporter.close()
+
+        client.put.assert_called_once_with(
+            url="insights", content='[{"a": 1},{"b": 2}]'
+        )
+        client.close.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "result", [httpx.Response(500), httpx.ConnectError("Connection refused")]
+    )
+    def test_http_failure(self, client, result):
+        client.put.return_value = resolved(result)
+
+        with pytest.raises(AInsightsExportError):
+            HttpExporter(client=client).export(['{"a": 1}'])
+
+
+class TestExportQueue:
+    def test_events_are_exported_in_batches(self):
+        batches = []
+        queue = ExportQueue(CallbackExporter(batches.append, batch_size=2))
+
+        for i in range(5):
+            queue.put(str(i))
+        assert queue.flush(timeout=5)
+
+        assert [event for batch in batches for event in batch] == list("01234")
+        assert all(len(batch) <= 2 for batch in batches)
+        assert queue.stats().exported == 5
+        queue.close()
+
+    def test_failures_are_counted(self):
+        def fail(events):
+            raise RuntimeError("Export failed")
+
+        queue = ExportQueue(CallbackExporter(fail))
+        queue.put("1")
+        queue.put("2")
+        assert queue.flush(timeout=5)
+
+        stats = queue.stats()
+        assert stats.exporter == "CallbackExporter"
+        assert stats.failed == 2
+        assert stats.exported == 0
+        assert isinstance(stats.last_error, RuntimeError)
+        queue.close()
+
+    def test_full_queue_drops(self):
+        release = threading.Event()
+        exporter = CallbackExporter(
+            lambda events: release.wait(5), batch_size=1, max_queue_size=1
+        )
+        queue = ExportQueue(exporter)
+
+        results = [queue.put(str(i)) for i in range(10)]
+        release.set()
+
+        assert not all(results)
+        assert queue.stats().dropped == results.count(False)
+        queue.close()
+
+    def test_flush_timeout(self):
+        release = threading.Event()
+        queue = ExportQueue(CallbackExporter(lambda events: release.wait(5)))
+
+        queue.put("1")
+        assert not queue.flush(timeout=0.05)
+
+        release.set()
+        assert queue.flush(timeout=5)
+        queue.close()
+
+    def test_close_exports_and_closes(self):
+        exporter = InMemoryExporter(batch_timeout=60)
+        exporter.close = Mock()
+        queue = ExportQueue(exporter)
+
+        queue.put("1")
+        queue.close()
+
+        assert exporter.events == ["1"]
+        exporter.close.assert_called_once()
+        assert not queue.put("2")
+
+    def test_lazy_events_failing_to_render(self):
+        def fail():
+            raise ValueError("Invalid event")
+
+        exporter = InMemoryExporter()
+        queue = ExportQueue(exporter)
+
+        queue.put(LazyContent(fail))
+        queue.put(LazyContent(lambda: "1"))
+        assert queue.flush(timeout=5)
+
+        assert exporter.events == ["1"]
+        assert queue.stats().failed == 1
+        queue.close()
+
+
+class TestAInsightsExporters:
+    @pytest.mark.parametrize("defer_serialization", [False, True])
+    def test_events_fan_out(self, client, response, defer_serialization):
+        first, second = InMemoryExporter(), InMemoryExporter()
+        insights = AInsights(
+            client=client,
+            defer_serialization=defer_serialization,
+            exporters=[first, second],
+        )
+
+        insights.capture(response=response, messages="Hello!", meta={"a": 1})
+        insights.flush(timeout=5)
+
+        for exporter in (first, second):
+            (event,) = exporter.events
+            assert json.loads(event)["meta"] == {"a": 1}
+        client.put.assert_called_once()
+
+    def test_failing_exporter_is_isolated(self, client, response):
+        def fail(events):
+            raise RuntimeError("Export failed")
+
+        exporter = InMemoryExporter()
+        insights = AInsights(
+            client=client, exporters=[CallbackExporter(fail), exporter]
+        )
+
+        insights.capture(response=response, messages="Hello!")
+        insights.flush(timeout=5)
+
+        assert len(exporter.events) == 1
+        failed, exported = insights.export_stats()
+        assert failed.failed == 1
+        assert exported.exported == 1
+
+    def test_slow_exporter_doesnt_stall_others(self, client, response):
+        release = threading.Event()
+        exported = threading.Event()
+        insights = AInsights(
+            client=client,
+            exporters=[
+                CallbackExporter(lambda events: release.wait(5), batch_timeout=0),
+                CallbackExporter(lambda events: exported.set(), batch_timeout=0),
+            ],
+        )
+
+        insights.capture(response=response, messages="Hello!")
+
+        assert exported.wait(5)
+        release.set()
+
+    def test_exporters_get_projected_events_without_references(self, client, response):
+        exporter = InMemoryExporter()
+        insights = AInsights(
+            client=client,
+            projection=Projection(max_message_chars=10),
+            template_cache=TemplateCache(min_size=0),
+            exporters=[exporter],
+        )
+
+        messages = [{"role": "system", "content": "x" * 100}]
+        insights.capture(response=response, messages=messages)
+        insights.flush(timeout=5)
+
+        event = json.loads(exporter.events[0])
+        assert "definitions" not in event
+        assert event["messages"][0]["content"].startswith("x" * 10 + "[...")
+        sent = json.loads(client.put.call_args[1]["data"])
+        assert sent["messages"][0]["content"].startswith("$ref:")
+
+    def test_close_closes_exporters(self, client):
+        exporter = InMemoryExporter()
+        exporter.close = Mock()
+
+        AInsights(client=client, exporters=[exporter]).close()
+
+        exporter.close.assert_called_once()
+
+    def test_new_client(self):
+        exporter = InMemoryExporter()
+        insights = AInsights.new_client(api_key="test", exporters=[exporter])
+
+        assert insights.export_stats()[0].exporter == "InMemoryExporter"
+        insights.close()
+
+
+class TestAsyncAInsightsExporters:
+    async def test_events_fan_out(self, response):
+        exporter = InMemoryExporter()
+        insights = AsyncAInsights(
+            client=httpx.AsyncClient(
+                base_url="http://test.com",
+                transport=httpx.MockTransport(lambda request: httpx.Response(200)),
+            ),
+            exporters=[exporter],
+        )
+
+        insights.capture(response=response, messages="Hello!")
+        result = await insights.flush(timeout=5)
+        await insights.aclose()
+
+        assert result.delivered == 1
+        assert len(exporter.events) == 1
+        assert insights.export_stats()[0].exported == 1
+
+
+def test_exporter_is_abstract():
+    with pytest.raises(TypeError):
+        Exporter()
+
+
+def test_async_flush_without_events():
+    insights = AsyncAInsights(client=httpx.AsyncClient())
+
+    result = asyncio.run(insights.flush())
+
+    assert result.pending == 0
@@ -0,0 +1,257 @@
+import json
+from unittest.mock import Mock
+
+import httpx
+import openai
+import pytest
+from pydantic import BaseModel
+
+from requestyai import AInsights, AsyncAInsights
+from requestyai.ainsights.response_cache import ResponseCache
+
+from .helpers import captured
+from .test_stream import CHUNKS
+
+
+def build_sse(chunks) -> bytes:
+    events = [f"data: {chunk.model_dump_json()}\n\n" for chunk in chunks]
+    return "".join([*events, "data: [DONE]\n\n"]).encode()
+
+
+@pytest.fixture
+def handler(response):
+    def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if body.get("stream"):
+            return httpx.Response(
+                200,
+                content=build_sse(CHUNKS),
+                headers={"Content-Type": "text/event-stream"},
+            )
+        if body.get("model") == "unknown":
+            return httpx.Response(404, json={"error": {"message": "Unknown model"}})
+        completion = response.model_dump(mode="json")
+        if "response_format" in body:
+            completion["choices"][0]["message"]["content"] = '{"answer": "42"}'
+        return httpx.Response(200, json=completion)
+
+    return handle
+
+
+@pytest.fixture
+def openai_client(handler):
+    return openai.OpenAI(
+        api_key="test",
+        base_url="http://test.com",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+
+@pytest.fixture
+def insights(client, openai_client):
+    insights = AInsights(client=client)
+    insights.instrument(openai_client, meta={"app": "test"})
+    return insights
+
+
+MESSAGES = [{"role": "user", "content": "Hello!"}]
+
+
+class TestInstrument:
+    def test_create_is_captured(self, insights, client, openai_client, response):
+        result = openai_client.chat.completions.create(
+            messages=MESSAGES, model="gpt-4o-mini", temperature=0.5, user="user_1"
+        )
+
+        assert result.id == response.id
+        event = captured(client)
+        assert event["messages"] == MESSAGES
+        assert event["args"] == {
+            "model": "gpt-4o-mini",
+            "temperature": 0.5,
+            "user": "user_1",
+        }
+        assert event["user_id"] == "user_1"
+        assert event["response"]["id"] == response.id
+        assert event["meta"]["app"] == "test"
+
+        timing = event["meta"]["timing"]
+        assert 0 <= timing["time_to_first_byte"] <= timing["latency"]
+
+    def test_parse_is_captured(self, insights, client, openai_client):
+        class Answer(BaseModel):
+            answer: str
+
+        result = openai_client.chat.completions.parse(
+            messages=MESSAGES, model="gpt-4o-mini", response_format=Answer
+        )
+
+        assert result.choices[0].message.parsed == Answer(answer="42")
+        event = captured(client)
+        assert event["args"]["response_format"] == {
+            "type": "json_schema",
+            "name": "Answer",
+        }
+
+    def test_errors_are_captured(self, insights, client, openai_client):
+        with pytest.raises(openai.NotFoundError):
+            openai_client.chat.completions.create(messages=MESSAGES, model="unknown")
+
+        event = captured(client)
+        assert event["response"]["choices"] == []
+        assert event["response"]["model"] == "unknown"
+        assert event["meta"]["error"]["type"] == "NotFoundError"
+        assert event["meta"]["error"]["status_code"] == 404
+        assert event["meta"]["timing"]["latency"] >= 0
+
+    def test_streams_are_captured(self, insights, client, openai_client):
+        stream = openai_client.chat.completions.create(
+            messages=MESSAGES, model="gpt-4o-mini", stream=True
+        )
+        chunks = list(stream)
+
+        assert [chunk.id for chunk in chunks] == [chunk.id for chunk in CHUNKS]
+        event = captured(client)
+        assert event["response"]["choices"][0]["message"]["content"] == "Hello world"
+        assert event["args"]["stream"]
+        assert event["meta"]["stream"]["completed"]
+
+    def test_not_given_args_are_ignored(self, insights, client, openai_client):
+        openai_client.chat.completions.create(
+            messages=MESSAGES,
+            model="gpt-4o-mini",
+            temperature=openai.NOT_GIVEN,
+            stream_options=openai.NOT_GIVEN,
+        )
+
+        assert captured(client)["args"] == {"model": "gpt-4o-mini"}
+
+    def test_capture_failures_dont_break_calls(self, openai_client, response):
+        insights = Mock(spec=AInsights)
+        insights.capture.side_effect = RuntimeError("Capture failed")
+        AInsights.instrument(insights, openai_client)
+
+        result = openai_client.chat.completions.create(
+            messages=MESSAGES, model="gpt-4o-mini"
+        )
+        chunks = list(
+            openai_client.chat.completions.create(
+                messages=MESSAGES, model="gpt-4o-mini", stream=True
+            )
+        )
+        with pytest.raises(openai.NotFoundError):
+            openai_client.chat.completions.create(messages=MESSAGES, model="unknown")
+
+        assert result.id == response.id
+        assert chunks
+        assert insights.capture.call_count == 3
+
+    def test_instrumenting_twice_fails(self, insights, openai_client):
+        with pytest.raises(ValueError):
+            insights.instrument(openai_client)
+
+    async def test_async_client(self, client, handler):
+        insights = AInsights(client=client)
+        openai_client = openai.AsyncOpenAI(
+            api_key="test",
+            base_url="http://test.com",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        insights.instrument(openai_client)
+
+        await openai_client.chat.completions.create(
+            messages=MESSAGES, model="gpt-4o-mini"
+        )
+
+        assert "time_to_first_byte" in captured(client)["meta"]["timing"]
+
+        client.put.reset_mock()
+        stream = await openai_client.chat.completions.create(
+            messages=MESSAGES, model="gpt-4o-mini", stream=True
+        )
+        async for _ in stream:
+            pass
+
+        event = captured(client)
+        assert event["response"]["choices"][0]["message"]["content"] == "Hello world"
+        assert event["meta"]["stream"]["completed"]
+
+    async def test_async_insights(self, handler):
+        requests = []
+        insights = AsyncAInsights(
+            client=httpx.AsyncClient(
+                base_url="http://test.com",
+                transport=httpx.MockTransport(
+                    lambda request: requests.append(request) or httpx.Response(200)
+                ),
+            )
+        )
+        openai_client = openai.AsyncOpenAI(
+            api_key="test",
+            base_url="http://test.com",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        insights.instrument(openai_client)
+
+        stream = await openai_client.chat.completions.create(
+            messages=MESSAGES, model="gpt-4o-mini", stream=True
+        )
+        async for _ in stream:
+            pass
+
+        await insights.aclose()
+        event = json.loads(requests[0].content)
+        assert event["response"]["choices"][0]["message"]["content"] == "Hello world"
+
+
+class TestInstrumentCache:
+    @pytest.fixture
+    def insights(self, client, openai_client):
+        insights = AInsights(client=client)
+        insights.instrument(openai_client, cache=ResponseCache())
+        return insights
+
+    def test_identical_calls_are_cached(self, insights, client, openai_client):
+        first = openai_client.chat.completions.create(
+            messages=MESSAGES, model="gpt-4o-mini", user="user_1"
+        )
+        second = openai_client.chat.completions.create(
+            messages=MESSAGES, model="gpt-4o-mini", user="user_2"
+        )
+
+        assert second.model_dump() == first.model_dump()
+        events = [json.loads(call[1]["data"]) for call in client.put.call_args_list]
+        assert len(events) == 2
+        assert "cached" not in events[0]["meta"]
+        assert events[1]["meta"]["cached"] is True
+        assert events[1]["user_id"] == "user_2"
+
+    def test_different_calls_are_not_cached(self, insights, client, openai_client):
+        openai_client.chat.completions.create(messages=MESSAGES, model="gpt-4o-mini")
+        openai_client.chat.completions.create(messages=MESSAGES, model="gpt-4o")
+
+        events = [json.loads(call[1]["data"]) for call in client.put.call_args_list]
+        assert all("cached" not in event["meta"] for event in events)
+
+    def test_parse_is_cached(self, insights, openai_client):
+        class Answer(BaseModel):
+            answer: str
+
+        for _ in range(2):
+            result = openai_client.beta.chat.completions.parse(
+                messages=MESSAGES, model="gpt-4o-mini", response_format=Answer
+            )
+            assert result.choices[0].message.parsed == Answer(answer="42")
+
+    def test_streams_are_not_cached(self, insights, client, openai_client):
+        for _ in range(2):
+            for _ in openai_client.chat.completions.create(
+                messages=MESSAGES, model="gpt-4o-mini", stream=True
+            ):
+                pass
+
+        events = [json.loads(call[1]["data"]) for call in client.put.call_args_list]
+        assert all("cached" not in event["meta"] for event in events)
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+from openai.types.chat.chat_completion import ChoiceLogprobs
+
+from requestyai import AInsights
+from requestyai.ainsights.projection import Projection
+
+from .helpers import build_event
+
+
+class TestProjection:
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            Projection(max_turns=-1)
+        with pytest.raises(ValueError):
+            Projection(max_message_chars=-1)
+        with pytest.raises(ValueError):
+            Projection(max_field_chars=-1)
+
+    def test_no_limits(self, response):
+        event = build_event(response, messages="test")
+        assert Projection().apply(event) is event
+
+    def test_max_turns_keeps_setup_messages(self, response):
+        messages = [
+            {"role": "system", "content": "system"},
+            {"role": "user", "content": "1"},
+            {"role": "assistant", "content": "2"},
+            {"role": "developer", "content": "developer"},
+            {"role": "user", "content": "3"},
+        ]
+        event = build_event(response, messages=messages)
+
+        projected = Projection(max_turns=2).apply(event)
+
+        assert [m["content"] for m in projected.messages] == [
+            "system",
+            "2",
+            "developer",
+            "3",
+        ]
+        assert len(event.messages) == 5
+
+    def test_max_message_chars(self, response):
+        messages = [
+            {"role": "system", "content": "a" * 100},
+            {"role": "user", "content": [{"type": "text", "text": "b" * 100}]},
+            {"role": "user", "content": "short"},
+        ]
+        event = build_event(response, messages=messages)
+
+        projected = Projection(max_message_chars=10).apply(event)
+
+        assert projected.messages[0]["content"] == "a" * 10 + "[... 90 chars truncated]"
+        assert projected.messages[1]["content"][0] == {
+            "type": "text",
+            "text": "b" * 10 + "[... 90 chars truncated]",
+        }
+        assert projected.messages[2]["content"] == "short"
+        assert messages[0]["content"] == "a" * 100
+
+    def test_max_message_chars_of_string_messages(self, response):
+        projection = Projection(max_message_chars=3)
+
+        assert projection.apply(build_event(response, messages="test")).messages == (
+            "tes[... 1 chars truncated]"
+        )
+        assert projection.apply(
+            build_event(response, messages=["a", "test"])
+        ).messages == [
+            "a",
+            "tes[... 1 chars truncated]",
+        ]
+
+    def test_max_field_chars(self, response):
+        document = "d" * 1000
+        event = build_event(
+            response,
+            template="{document}",
+            inputs={"document": document, "docs": [document], "n": 1},
+            args={"model": "gpt-4o"},
+        )
+
+        projected = Projection(max_field_chars=100).apply(event)
+
+        assert projected.template == "{document}"
+        assert projected.inputs["document"].startswith("[sha256:")
+        assert projected.inputs["document"].endswith(", 1000 chars]")
+        assert projected.inputs["docs"] == [projected.inputs["document"]]
+        assert projected.inputs["n"] == 1
+        assert projected.args == {"model": "gpt-4o"}
+        assert event.inputs["document"] == document
+
+    def test_drop_logprobs(self, response):
+        choice = response.choices[0].model_copy(
+            update={"logprobs": ChoiceLogprobs(content=[])}
+        )
+        response = response.model_copy(update={"choices": [choice]})
+        event = build_event(response, messages="test")
+
+        projected = Projection(drop_logprobs=True).apply(event)
+
+        assert projected.response.choices[0].logprobs is None
+        assert response.choices[0].logprobs is not None
+
+    def test_capture_serializes_the_projected_event(self, client, response):
+        insights = AInsights(client=client, projection=Projection(max_message_chars=2))
+
+        insights.capture(response=response, messages="test")
+
+        data = json.loads(client.put.call_args[1]["data"])
+        assert data["messages"] == "te[... 2 chars truncated]"
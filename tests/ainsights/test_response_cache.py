@@ -0,0 +1,204 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from openai.types.chat import ChatCompletion
+from pydantic import BaseModel
+
+from requestyai.ainsights.response_cache import ResponseCache
+
+
+class TestResponseCache:
+    def test_arguments(self):
+        with pytest.raises(ValueError):
+            ResponseCache(ttl=0)
+        with pytest.raises(ValueError):
+            ResponseCache(max_entries=0)
+        with pytest.raises(ValueError):
+            ResponseCache(max_bytes=0)
+
+    def test_key(self):
+        messages = [{"role": "user", "content": "Hello!"}]
+        key = ResponseCache.key("create", {"messages": messages, "model": "gpt"})
+
+        assert key == ResponseCache.key(
+            "create", {"model": "gpt", "messages": messages, "user": "user_1"}
+        )
+        assert key != ResponseCache.key("parse", {"messages": messages, "model": "gpt"})
+        assert key != ResponseCache.key(
+            "create", {"messages": messages, "model": "gpt", "temperature": 0.5}
+        )
+
+    @pytest.mark.parametrize("name", ["extra_body", "extra_query", "extra_headers"])
+    def test_key_of_extra_args(self, name):
+        kwargs = {"messages": [], "model": "gpt"}
+        key = ResponseCache.key("create", {**kwargs, name: {"effort": "low"}})
+
+        assert key != ResponseCache.key("create", {**kwargs, name: {"effort": "high"}})
+        assert key == ResponseCache.key(
+            "create", {**kwargs, name: {"effort": "low"}, "timeout": 5}
+        )
+
+    def test_key_of_structured_outputs(self):
+        class A(BaseModel):
+            answer: str
+
+        class B(BaseModel):
+            answer: int
+
+        assert ResponseCache.key("parse", {"response_format": A}) != ResponseCache.key(
+            "parse", {"response_format": B}
+        )
+
+    def test_get_and_put(self):
+        cache = ResponseCache()
+
+        assert cache.get("key") is None
+        cache.put("key", "value")
+        assert cache.get("key") == "value"
+
+    def test_least_recently_used_are_evicted(self):
+        cache = ResponseCache(max_entries=2)
+
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+
+    def test_evicted_beyond_max_bytes(self):
+        cache = ResponseCache(max_bytes=10)
+
+        cache.put("a", "12345")
+        cache.put("b", "12345")
+        cache.put("c", "1")
+        cache.put("d", "12345678901")
+
+        assert cache.get("a") is None
+        assert cache.get("b") == "12345"
+        assert cache.get("c") == "1"
+        assert cache.get("d") is None
+
+    def test_expired(self):
+        cache = ResponseCache(ttl=0.01)
+
+        cache.put("key", "value")
+        time.sleep(0.02)
+
+        assert cache.get("key") is None
+
+    def test_database(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = ResponseCache(path=path)
+        cache.put("key", "value")
+        cache.close()
+
+        cache = ResponseCache(path=path)
+        assert cache.get("key") == "value"
+        cache.close()
+
+    def test_database_expired(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = ResponseCache(ttl=0.01, path=path)
+        cache.put("key", "value")
+        cache.close()
+        time.sleep(0.02)
+
+        cache = ResponseCache(path=path)
+        assert cache.get("key") is None
+        cache.close()
+
+    def test_get_or_call(self, response):
+        cache = ResponseCache()
+
+        result, cached = cache.get_or_call("key", ChatCompletion, lambda: response)
+        assert result is response
+        assert not cached
+
+        result, cached = cache.get_or_call("key", ChatCompletion, lambda: None)
+        assert result.model_dump() == response.model_dump()
+        assert cached
+
+    def test_concurrent_calls_are_coalesced(self, response):
+        cache = ResponseCache()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def call():
+            calls.append(None)
+            started.set()
+            release.wait(5)
+            return response
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(
+                cache.get_or_call("key", ChatCompletion, call)
+            )
+        )
+        leader.start()
+        started.wait(5)
+
+        followers = [
+            threading.Thread(
+                target=lambda: results.append(
+                    cache.get_or_call("key", ChatCompletion, call)
+                )
+            )
+            for _ in range(4)
+        ]
+        for follower in followers:
+            follower.start()
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        assert len(calls) == 1
+        assert sorted(cached for _, cached in results) == [
+            False,
+            True,
+            True,
+            True,
+            True,
+        ]
+        assert all(
+            result.model_dump() == response.model_dump() for result, _ in results
+        )
+
+    def test_failed_calls_are_not_cached(self, response):
+        cache = ResponseCache()
+
+        def fail():
+            raise RuntimeError("failed")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_call("key", ChatCompletion, fail)
+
+        assert cache.get_or_call("key", ChatCompletion, lambda: response) == (
+            response,
+            False,
+        )
+
+    async def test_aget_or_call(self, response):
+        cache = ResponseCache()
+        calls = []
+
+        async def call():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            return response
+
+        results = await asyncio.gather(
+            *(cache.aget_or_call("key", ChatCompletion, call) for _ in range(3))
+        )
+
+        assert len(calls) == 1
+        assert [cached for _, cached in results] == [False, True, True]
+        assert all(
+            result.model_dump() == response.model_dump() for result, _ in results
+        )
@@ -0,0 +1,133 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from requestyai import AInsights, AsyncAInsights
+from requestyai.ainsights.error import AInsightsSampledError
+from requestyai.ainsights.sampler import Capture, Sampler
+
+
+def build_capture(response, *, args={}, meta={}, user_id=None):
+    return Capture(
+        response=response,
+        messages="test",
+        template=None,
+        inputs={},
+        args=args,
+        meta=meta,
+        user_id=user_id,
+    )
+
+
+class TestSampler:
+    def test_invalid_rates(self):
+        with pytest.raises(ValueError):
+            Sampler(rate=1.5)
+        with pytest.raises(ValueError):
+            Sampler(model_rates={"gpt-4o": -0.1})
+        with pytest.raises(ValueError):
+            Sampler(meta_rates={"class": {"search": 2}})
+
+    def test_default_keeps_everything(self, response):
+        assert Sampler().sample(build_capture(response))
+
+    def test_sampling_is_deterministic_by_user(self, response):
+        sampler = Sampler(rate=0.5)
+
+        for user_id in map(str, range(100)):
+            capture = build_capture(response, user_id=user_id)
+            assert len({sampler.sample(capture) for _ in range(10)}) == 1
+
+    def test_sampling_rate(self, response):
+        sampler = Sampler(rate=0.25)
+
+        kept = sum(
+            sampler.sample(build_capture(response, user_id=str(user_id)))
+            for user_id in range(10000)
+        )
+        assert 2200 < kept < 2800
+
+    def test_users_kept_at_a_rate_are_kept_at_higher_rates(self, response):
+        low, high = Sampler(rate=0.2), Sampler(rate=0.6)
+
+        for user_id in map(str, range(1000)):
+            capture = build_capture(response, user_id=user_id)
+            assert not low.sample(capture) or high.sample(capture)
+
+    def test_model_rates(self, response):
+        sampler = Sampler(rate=1, model_rates={"gpt-4o": 0, response.model: 0})
+
+        assert not sampler.sample(build_capture(response, args={"model": "gpt-4o"}))
+        assert not sampler.sample(build_capture(response))
+        assert sampler.sample(build_capture(response, args={"model": "o1"}))
+
+    def test_meta_rates_take_precedence(self, response):
+        sampler = Sampler(
+            rate=0, model_rates={"gpt-4o": 0}, meta_rates={"class": {"search": 1}}
+        )
+
+        capture = build_capture(
+            response, args={"model": "gpt-4o"}, meta={"class": "search"}
+        )
+        assert sampler.sample(capture)
+        assert not sampler.sample(build_capture(response, meta={"class": "chat"}))
+        assert not sampler.sample(build_capture(response, meta={"class": {}}))
+
+    def test_keep_finish_reasons(self, response):
+        assert Sampler(rate=0, keep_finish_reasons=["stop"]).sample(
+            build_capture(response)
+        )
+        assert not Sampler(rate=0, keep_finish_reasons=["length"]).sample(
+            build_capture(response)
+        )
+
+    def test_predicates(self, response):
+        slow = build_capture(response, meta={"latency": 10})
+        fast = build_capture(response, meta={"latency": 1})
+        sampler = Sampler(rate=0, keep_if=[lambda capture: capture.meta["latency"] > 5])
+
+        assert sampler.sample(slow)
+        assert not sampler.sample(fast)
+
+        sampler = Sampler(drop_if=[lambda capture: capture.meta["latency"] < 5])
+
+        assert sampler.sample(slow)
+        assert not sampler.sample(fast)
+
+
+class TestAInsightsSampling:
+    def test_discarded_events_are_not_serialized(self, client, response):
+        insights = AInsights(client=client, sampler=Sampler(rate=0))
+
+        with patch("requestyai.ainsights.client._new_event") as new_event:
+            future = insights.capture(response=response, messages="test")
+
+        assert isinstance(future.result(), AInsightsSampledError)
+        new_event.assert_not_called()
+        client.put.assert_not_called()
+
+    def test_kept_events_are_sent(self, client, response):
+        insights = AInsights(client=client, sampler=Sampler(rate=1))
+
+        insights.capture(response=response, messages="test")
+
+        client.put.assert_called_once()
+
+    async def test_async_discarded_events_are_not_sent(self, response):
+        requests = []
+        client = httpx.AsyncClient(
+            base_url="http://test.com",
+            transport=httpx.MockTransport(
+                lambda request: requests.append(request) or httpx.Response(200)
+            ),
+        )
+        insights = AsyncAInsights(
+            client=client, sampler=Sampler(drop_if=[lambda capture: True])
+        )
+
+        result = await insights.capture(response=response, messages="test")
+
+        assert isinstance(result, AInsightsSampledError)
+        await insights.aclose()
+        assert requests == []
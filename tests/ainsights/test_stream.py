@@ -0,0 +1,194 @@
+import asyncio
+import gc
+import json
+from unittest.mock import Mock
+
+import httpx
+import pytest
+from openai.types.chat import ChatCompletionChunk
+from openai.types.completion_usage import CompletionUsage
+
+from requestyai import AsyncAInsights
+from requestyai.ainsights.error import AInsightsValueError
+
+from .helpers import captured
+
+
+def build_chunk(delta={}, finish_reason=None, usage=None, choices=True):
+    return ChatCompletionChunk(
+        id="chatcmpl-1",
+        choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        if choices
+        else [],
+        created=1731765014,
+        model="gpt-4o-mini",
+        object="chat.completion.chunk",
+        usage=usage,
+    )
+
+
+CHUNKS = [
+    build_chunk({"role": "assistant", "content": ""}),
+    build_chunk({"content": "Hello"}),
+    build_chunk({"content": " world"}),
+    build_chunk(finish_reason="stop"),
+    build_chunk(
+        usage=CompletionUsage(prompt_tokens=5, completion_tokens=2, total_tokens=7),
+        choices=False,
+    ),
+]
+
+TOOL_CHUNKS = [
+    build_chunk(
+        {
+            "role": "assistant",
+            "tool_calls": [
+                {
+                    "index": 0,
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {"name": "search", "arguments": ""},
+                }
+            ],
+        }
+    ),
+    build_chunk({"tool_calls": [{"index": 0, "function": {"arguments": '{"q":'}}]}),
+    build_chunk({"tool_calls": [{"index": 0, "function": {"arguments": '"x"}'}}]}),
+    build_chunk(finish_reason="tool_calls"),
+]
+
+
+class TestCaptureStream:
+    def test_chunks_pass_through(self, insights, client):
+        stream = insights.capture_stream(iter(CHUNKS), messages="test")
+
+        assert list(stream) == CHUNKS
+
+        event = captured(client)
+        message = event["response"]["choices"][0]["message"]
+        assert message["content"] == "Hello world"
+        assert event["response"]["choices"][0]["finish_reason"] == "stop"
+        assert event["response"]["usage"]["total_tokens"] == 7
+        assert event["response"]["object"] == "chat.completion"
+        assert event["messages"] == "test"
+
+    def test_timing(self, insights, client):
+        stream = insights.capture_stream(
+            iter(CHUNKS), messages="test", meta={"class": "chat"}
+        )
+        list(stream)
+
+        meta = captured(client)["meta"]
+        assert meta["class"] == "chat"
+        timing = meta["stream"]
+        assert timing["completed"]
+        assert timing["chunks"] == 5
+        assert 0 <= timing["time_to_first_token"] <= timing["duration"]
+        assert timing["inter_token_latency"] >= 0
+        assert timing["max_inter_token_latency"] >= timing["inter_token_latency"]
+
+    def test_tool_calls(self, insights, client):
+        list(insights.capture_stream(iter(TOOL_CHUNKS), messages="test"))
+
+        choice = captured(client)["response"]["choices"][0]
+        assert choice["finish_reason"] == "tool_calls"
+        assert choice["message"]["tool_calls"] == [
+            {
+                "id": "call_1",
+                "type": "function",
+                "function": {"name": "search", "arguments": '{"q":"x"}'},
+            }
+        ]
+
+    def test_closed_stream_is_captured_once(self, insights, client):
+        source = (chunk for chunk in CHUNKS)
+
+        with insights.capture_stream(source, messages="test") as stream:
+            next(stream)
+            next(stream)
+
+        assert source.gi_frame is None  # Closed
+        event = captured(client)
+        assert event["response"]["choices"][0]["message"]["content"] == "Hello"
+        assert event["response"]["choices"][0]["finish_reason"] is None
+        assert not event["meta"]["stream"]["completed"]
+
+        del stream
+        gc.collect()
+        client.put.assert_called_once()
+
+    def test_abandoned_stream_is_captured(self, insights, client):
+        stream = insights.capture_stream(iter(CHUNKS), messages="test")
+        next(stream)
+        next(stream)
+
+        del stream
+        gc.collect()
+
+        assert not captured(client)["meta"]["stream"]["completed"]
+
+    def test_failed_stream_is_captured(self, insights, client):
+        def failing():
+            yield CHUNKS[1]
+            raise httpx.ReadError("")
+
+        with pytest.raises(httpx.ReadError):
+            list(insights.capture_stream(failing(), messages="test"))
+
+        event = captured(client)
+        assert event["response"]["choices"][0]["message"]["content"] == "Hello"
+        assert not event["meta"]["stream"]["completed"]
+
+    def test_empty_stream_is_not_captured(self, insights, client):
+        list(insights.capture_stream(iter([]), messages="test"))
+
+        client.put.assert_not_called()
+
+    def test_capture_failures_dont_break_the_stream(self, insights, client):
+        client.put.side_effect = RuntimeError("Capture failed")
+
+        assert list(insights.capture_stream(iter(CHUNKS), messages="test")) == CHUNKS
+
+        stream = insights.capture_stream(iter(CHUNKS), messages="test")
+        next(stream)
+        stream.close()
+
+    async def test_async_capture_failures_dont_break_the_stream(self):
+        insights = AsyncAInsights(client=httpx.AsyncClient())
+        insights.capture = Mock(side_effect=RuntimeError("Capture failed"))
+
+        async def chunks():
+            for chunk in CHUNKS:
+                yield chunk
+
+        stream = insights.capture_stream(chunks(), messages="test")
+        assert [chunk async for chunk in stream] == CHUNKS
+        insights.capture.assert_called_once()
+        await insights.aclose()
+
+    def test_arguments_are_validated_upfront(self, insights):
+        with pytest.raises(AInsightsValueError):
+            insights.capture_stream(iter(CHUNKS))
+
+    async def test_async_stream(self):
+        requests = []
+        client = httpx.AsyncClient(
+            base_url="http://test.com",
+            transport=httpx.MockTransport(
+                lambda request: requests.append(request) or httpx.Response(200)
+            ),
+        )
+        insights = AsyncAInsights(client=client)
+
+        async def chunks():
+            for chunk in CHUNKS:
+                await asyncio.sleep(0)
+                yield chunk
+
+        stream = insights.capture_stream(chunks(), messages="test")
+        assert [chunk async for chunk in stream] == CHUNKS
+
+        await insights.aclose()
+        event = json.loads(requests[0].content)
+        assert event["response"]["choices"][0]["message"]["content"] == "Hello world"
+        assert event["meta"]["stream"]["completed"]
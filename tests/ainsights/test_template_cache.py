@@ -0,0 +1,181 @@
+import json
+import threading
+from concurrent.futures import Future
+
+import httpx
+import pytest
+
+from requestyai import AInsights, AsyncAInsights
+from requestyai.ainsights.template_cache import TemplateCache
+
+from .helpers import build_event, resolved
+
+SYSTEM_PROMPT = "You are a helpful assistant. " * 10
+TOOLS = [{"type": "function", "function": {"name": "search", "parameters": {}}}]
+
+
+def unknown_references(*digests):
+    return httpx.Response(409, json={"unknown_references": list(digests)})
+
+
+class TestTemplateCache:
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            TemplateCache(max_entries=0)
+        with pytest.raises(ValueError):
+            TemplateCache(min_size=-1)
+
+    def test_small_values_are_not_deduplicated(self, response):
+        event = build_event(response, template="Hi {name}", inputs={"name": "Bob"})
+
+        deduped, references = TemplateCache(min_size=100).apply(event)
+
+        assert deduped is event
+        assert references == {}
+
+    def test_values_are_defined_once(self, response):
+        cache = TemplateCache(min_size=100)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": SYSTEM_PROMPT},
+        ]
+        event = build_event(response, messages=messages)
+
+        first, references = cache.apply(event)
+        second, _ = cache.apply(event)
+
+        (digest,) = references
+        assert digest.startswith("sha256:")
+        assert first.messages[0]["content"] == f"$ref:{digest}"
+        assert first.messages[1]["content"] == SYSTEM_PROMPT
+        assert first.definitions == {digest: SYSTEM_PROMPT}
+        assert second.messages == first.messages
+        assert second.definitions == {}
+        assert messages[0]["content"] == SYSTEM_PROMPT
+
+    def test_templates_and_tools(self, response):
+        cache = TemplateCache(min_size=10)
+        event = build_event(
+            response,
+            template=SYSTEM_PROMPT,
+            inputs={"name": "Bob"},
+            args={"model": "gpt-4o", "tools": TOOLS},
+        )
+
+        deduped, references = cache.apply(event)
+
+        data = json.loads(deduped.model_dump_json())
+        assert data["template"].startswith("$ref:sha256:")
+        assert data["args"]["tools"].startswith("$ref:sha256:")
+        assert data["args"]["model"] == "gpt-4o"
+        assert sorted(data["definitions"].values(), key=str) == sorted(
+            [SYSTEM_PROMPT, TOOLS], key=str
+        )
+        assert len(references) == 2
+
+    def test_least_recently_used_values_are_evicted(self, response):
+        cache = TemplateCache(max_entries=2, min_size=0)
+
+        for template in ["a", "b", "a", "c"]:
+            cache.apply(build_event(response, template=template))
+
+        assert len(cache) == 2
+        assert cache.apply(build_event(response, template="a"))[0].definitions == {}
+        assert cache.apply(build_event(response, template="b"))[0].definitions != {}
+
+    def test_get_unknown_references(self):
+        cache = TemplateCache()
+        references = {"sha256:a": "a", "sha256:b": "b"}
+
+        assert cache.get_unknown_references(httpx.Response(200), references) == []
+        assert cache.get_unknown_references(Exception(), references) == []
+        assert cache.get_unknown_references(
+            unknown_references("sha256:b", "sha256:c"), references
+        ) == ["sha256:b"]
+        assert cache.get_unknown_references(httpx.Response(409), references) == [
+            "sha256:a",
+            "sha256:b",
+        ]
+
+
+class TestAInsightsTemplateCache:
+    def test_unknown_references_are_sent_again(self, client, response):
+        cache = TemplateCache(min_size=10)
+        insights = AInsights(client=client, template_cache=cache)
+
+        insights.capture(response=response, template=SYSTEM_PROMPT, inputs={})
+        digest = next(iter(json.loads(client.put.call_args[1]["data"])["definitions"]))
+
+        client.put.side_effect = [
+            resolved(unknown_references(digest)),
+            resolved(httpx.Response(200)),
+            resolved(httpx.Response(200)),
+        ]
+        future = insights.capture(response=response, template=SYSTEM_PROMPT, inputs={})
+
+        assert future.result().status_code == 200
+        first, second = [c[1]["data"] for c in client.put.call_args_list[1:3]]
+        assert json.loads(first)["definitions"] == {}
+        assert json.loads(second)["definitions"] == {digest: SYSTEM_PROMPT}
+
+        # The server doesn't know the template, so it's defined again
+        insights.capture(response=response, template=SYSTEM_PROMPT, inputs={})
+        assert json.loads(client.put.call_args[1]["data"])["definitions"] == {
+            digest: SYSTEM_PROMPT
+        }
+
+    def test_flush_waits_for_events_sent_again(self, client, response):
+        insights = AInsights(client=client, template_cache=TemplateCache(min_size=10))
+
+        insights.capture(response=response, template=SYSTEM_PROMPT, inputs={})
+        digest = next(iter(json.loads(client.put.call_args[1]["data"])["definitions"]))
+
+        sent_again = Future()
+        client.put.side_effect = [resolved(unknown_references(digest)), sent_again]
+        future = insights.capture(response=response, template=SYSTEM_PROMPT, inputs={})
+
+        insights.flush(timeout=0.05)
+        assert not future.done()
+        assert client.flush.call_count == 2
+
+        threading.Timer(0.05, sent_again.set_result, [httpx.Response(200)]).start()
+        insights.flush(timeout=5)
+        assert future.result(timeout=0).status_code == 200
+
+    def test_deferred_serialization(self, client, response):
+        client.put.side_effect = lambda url, data: resolved(httpx.Response(200))
+        cache = TemplateCache(min_size=10)
+        insights = AInsights(
+            client=client, defer_serialization=True, template_cache=cache
+        )
+
+        future = insights.capture(response=response, template=SYSTEM_PROMPT, inputs={})
+
+        assert future.result().status_code == 200
+        data = json.loads(client.put.call_args[1]["data"].render())
+        assert data["template"].startswith("$ref:sha256:")
+
+    async def test_async_unknown_references_are_sent_again(self, response):
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            if len(requests) == 2:
+                return unknown_references(*requests[0]["definitions"])
+            return httpx.Response(200)
+
+        client = httpx.AsyncClient(
+            base_url="http://test.com", transport=httpx.MockTransport(handler)
+        )
+        insights = AsyncAInsights(
+            client=client, template_cache=TemplateCache(min_size=10)
+        )
+
+        for _ in range(2):
+            result = await insights.capture(
+                response=response, template=SYSTEM_PROMPT, inputs={}
+            )
+            assert result.status_code == 200
+
+        assert [len(request["definitions"]) for request in requests] == [1, 0, 1]
+        await insights.aclose()
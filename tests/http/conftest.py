@@ -0,0 +1,76 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubServer(ThreadingHTTPServer):
+    """A local HTTP server that records the requests it receives.
+
+    Request bodies are decoded according to their `Content-Encoding`, and every
+    request is answered with `status` and `headers`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.requests = []
+        self.status = 200
+        self.headers = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_PUT(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        encoding = self.headers.get("Content-Encoding")
+        if encoding == "gzip":
+            body = gzip.decompress(raw)
+        elif encoding == "zstd":
+            import zstandard
+
+            body = zstandard.ZstdDecompressor().decompress(raw)
+        else:
+            body = raw
+
+        with self.server.lock:
+            self.server.requests.append(
+                {
+                    "method": self.command,
+                    "path": self.path,
+                    "headers": dict(self.headers),
+                    "raw": raw,
+                    "body": body,
+                }
+            )
+
+        self.send_response(self.server.status)
+        for name, value in self.server.headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_PUT
+    do_POST = do_PUT
+    do_DELETE = do_PUT
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -1,9 +1,17 @@
+import threading
+import time
+from concurrent.futures import Future
 from unittest.mock import Mock, call, patch
 
 import httpx
 import pytest
 
 from requestyai.http.async_client import AsyncClient
+from requestyai.http.async_retry_transport import AsyncRetryTransport
+from requestyai.http.error import DroppedError
+from requestyai.http.flush_result import FlushResult
+from requestyai.http.lazy_content import LazyContent
+from requestyai.http.overflow_policy import OverflowPolicy
 from requestyai.http.retry_jitter_type import RetryJitterType
 from requestyai.http.retry_policy import RetryPolicy
 from requestyai.http.retry_transport import RetryTransport
@@ -15,9 +23,10 @@ def build_mock_request(method):
     return request
 
 
-def build_mock_response(status_code):
+def build_mock_response(status_code, headers=None):
     response = Mock(spec=httpx.Response)
     response.status_code = status_code
+    response.headers = httpx.Headers(headers or {})
     return response
 
 
@@ -103,6 +112,49 @@ class TestRetryTransport:
             assert response == mock_response
 
 
+class TestAsyncRetryTransport:
+    async def test_successful_request(self):
+        transport = AsyncRetryTransport(retry_policy=RetryPolicy())
+
+        mock_response = build_mock_response(200)
+        mock_request = build_mock_request("GET")
+
+        with patch.object(
+            httpx.AsyncHTTPTransport,
+            "handle_async_request",
+            return_value=mock_response,
+        ):
+            response = await transport.handle_async_request(mock_request)
+            assert response == mock_response
+
+    async def test_retry_on_error(self):
+        transport = AsyncRetryTransport(retry_policy=RetryPolicy())
+
+        mock_response = build_mock_response(200)
+        mock_request = build_mock_request("GET")
+
+        with patch.object(
+            httpx.AsyncHTTPTransport,
+            "handle_async_request",
+            side_effect=[httpx.NetworkError("Timed-out"), mock_response],
+        ):
+            response = await transport.handle_async_request(mock_request)
+            assert response == mock_response
+
+    async def test_retry_on_status(self):
+        policy = RetryPolicy(jitter_type=RetryJitterType.NONE, backoff_factor=0)
+        transport = AsyncRetryTransport(retry_policy=policy)
+
+        mock_request = build_mock_request("PUT")
+        responses = [build_mock_response(503), build_mock_response(200)]
+
+        with patch.object(
+            httpx.AsyncHTTPTransport, "handle_async_request", side_effect=responses
+        ):
+            response = await transport.handle_async_request(mock_request)
+            assert response.status_code == 200
+
+
 class TestAsyncClient:
     @pytest.fixture
     def client(self):
@@ -145,6 +197,421 @@ class TestAsyncClient:
         assert mock_dispatch.call_count == 2
         mock_dispatch.assert_has_calls([call(**args1), call(**args2)])
 
+    @pytest.mark.timeout(1)
+    def test_idle_client_closes_immediately(self, client):
+        start = time.monotonic()
+        client.close()
+        assert time.monotonic() - start < 0.1
+
+    def test_jobs_queued_after_close_are_dropped(self, client):
+        client.close()
+
+        result = client.get("/test").result(timeout=1)
+
+        assert isinstance(result, DroppedError)
+        assert client.dropped == 1
+
+
+class TestAsyncClientBatching:
+    @pytest.fixture
+    def client(self):
+        client = AsyncClient(
+            base_url="http://test.com",
+            headers={"User-Agent": "Test"},
+            batch_size=3,
+            batch_timeout=0.5,
+        )
+        yield client
+        client.close()
+
+    def test_invalid_batch_size(self):
+        with pytest.raises(ValueError):
+            AsyncClient(base_url="http://test.com", headers={}, batch_size=0)
+
+    def test_batch_is_sent_as_json_array(self, client):
+        with patch.object(httpx.Client, "put") as mock_put:
+            mock_put.return_value = build_mock_response(200)
+
+            futures = [
+                client.put_batched(url="items", data=f'{{"n": {n}}}') for n in range(3)
+            ]
+            results = [future.result() for future in futures]
+
+        mock_put.assert_called_once_with(
+            "items", content='[{"n": 0},{"n": 1},{"n": 2}]'
+        )
+        assert all(result is mock_put.return_value for result in results)
+
+    def test_batches_are_split_by_size(self, client):
+        with patch.object(httpx.Client, "put") as mock_put:
+            mock_put.return_value = build_mock_response(200)
+
+            futures = [client.put_batched(url="items", data="{}") for _ in range(5)]
+            for future in futures:
+                future.result()
+
+        assert mock_put.call_count == 2
+        assert mock_put.call_args_list[0] == call("items", content="[{},{},{}]")
+        assert mock_put.call_args_list[1] == call("items", content="[{},{}]")
+
+    def test_batches_are_grouped_by_url(self, client):
+        with patch.object(httpx.Client, "put") as mock_put:
+            mock_put.return_value = build_mock_response(200)
+
+            futures = [
+                client.put_batched(url="a", data="1"),
+                client.put_batched(url="b", data="2"),
+                client.put_batched(url="a", data="3"),
+            ]
+            for future in futures:
+                future.result()
+
+        mock_put.assert_has_calls(
+            [call("a", content="[1,3]"), call("b", content="[2]")]
+        )
+
+    def test_batch_error_resolves_every_future(self, client):
+        error = httpx.NetworkError("Unreachable")
+        with patch.object(httpx.Client, "put", side_effect=error):
+            futures = [client.put_batched(url="items", data="{}") for _ in range(3)]
+            results = [future.result() for future in futures]
+
+        assert all(result is error for result in results)
+
+    def test_regular_jobs_are_not_lost_while_batching(self, client):
+        with patch.object(httpx.Client, "put") as mock_put:
+            with patch.object(httpx.Client, "get") as mock_get:
+                mock_put.return_value = build_mock_response(200)
+                mock_get.return_value = build_mock_response(200)
+
+                batched = client.put_batched(url="items", data="{}")
+                regular = client.get("/test")
+
+                assert batched.result() is mock_put.return_value
+                assert regular.result() is mock_get.return_value
+
+    def test_close_does_not_wait_for_a_lingering_batch(self, client):
+        with patch.object(httpx.Client, "put") as mock_put:
+            mock_put.return_value = build_mock_response(200)
+
+            future = client.put_batched(url="items", data="{}")
+            start = time.monotonic()
+            client.close()
+
+        assert time.monotonic() - start < client.batch_timeout
+        assert future.result() is mock_put.return_value
+
+    def test_lazy_items_are_rendered(self, client):
+        def fail():
+            raise ValueError("Invalid")
+
+        with patch.object(httpx.Client, "put") as mock_put:
+            mock_put.return_value = build_mock_response(200)
+
+            futures = [
+                client.put_batched(url="items", data=LazyContent(lambda: "1")),
+                client.put_batched(url="items", data=LazyContent(fail)),
+                client.put_batched(url="items", data="3"),
+            ]
+            results = [future.result() for future in futures]
+
+        mock_put.assert_called_once_with("items", content="[1,3]")
+        assert results[0] is mock_put.return_value
+        assert isinstance(results[1], ValueError)
+        assert results[2] is mock_put.return_value
+
+
+class TestAsyncClientLazyContent:
+    @pytest.fixture
+    def client(self):
+        client = AsyncClient(base_url="http://test.com", headers={})
+        yield client
+        client.close()
+
+    def test_content_is_rendered_by_the_worker(self, client):
+        rendered_on = []
+
+        def render():
+            rendered_on.append(threading.current_thread())
+            return "{}"
+
+        with patch.object(httpx.Client, "put") as mock_put:
+            mock_put.return_value = build_mock_response(200)
+            client.put(url="test", content=LazyContent(render)).result()
+
+        mock_put.assert_called_once_with(url="test", content="{}")
+        assert rendered_on[0] is not threading.current_thread()
+
+    def test_render_errors_are_returned(self, client):
+        def render():
+            raise ValueError("Invalid")
+
+        with patch.object(httpx.Client, "put") as mock_put:
+            result = client.put(url="test", content=LazyContent(render)).result()
+
+        assert isinstance(result, ValueError)
+        mock_put.assert_not_called()
+
+
+class TestAsyncClientFlush:
+    def test_flush_counts_outcomes(self, server):
+        client = AsyncClient(base_url=server.url, headers={})
+
+        client.put("ok", content="{}")
+        client.put("ok", content="{}")
+        assert client.flush() == FlushResult(delivered=2, failed=0, pending=0)
+
+        server.status = 400
+        client.put("bad", content="{}")
+        assert client.flush() == FlushResult(delivered=0, failed=1, pending=0)
+
+        # The client is still usable after a flush
+        server.status = 200
+        assert client.put("ok", content="{}").result().status_code == 200
+        client.close()
+
+    def test_flush_with_nothing_pending(self):
+        client = AsyncClient(base_url="http://test.com", headers={})
+        assert client.flush(timeout=1) == FlushResult(0, 0, 0)
+        client.close()
+
+    def test_flush_times_out(self):
+        release = threading.Event()
+
+        def put(*args, **kwargs):
+            release.wait()
+            return build_mock_response(200)
+
+        with patch.object(httpx.Client, "put", side_effect=put):
+            client = AsyncClient(base_url="http://test.com", headers={})
+            client.put("slow", content="{}")
+
+            assert client.flush(timeout=0.05) == FlushResult(0, 0, 1)
+
+            release.set()
+            assert client.flush() == FlushResult(1, 0, 0)
+            client.close()
+
+    def test_flush_sends_lingering_batches(self, server):
+        client = AsyncClient(
+            base_url=server.url, headers={}, batch_size=100, batch_timeout=10
+        )
+        client.put_batched(url="items", data="{}")
+
+        start = time.monotonic()
+        assert client.flush() == FlushResult(1, 0, 0)
+        assert time.monotonic() - start < 1
+        client.close()
+
+
+class TestAsyncClientWorkers:
+    def test_invalid_workers(self):
+        with pytest.raises(ValueError):
+            AsyncClient(base_url="http://test.com", headers={}, workers=0)
+
+    def test_max_in_flight_defaults_to_workers(self):
+        client = AsyncClient(base_url="http://test.com", headers={}, workers=3)
+        assert client.workers == 3
+        assert client.max_in_flight == 3
+        client.close()
+
+    @pytest.mark.parametrize("workers,max_in_flight", [(4, 4), (4, 2)])
+    def test_concurrency_is_bounded(self, workers, max_in_flight):
+        client = AsyncClient(
+            base_url="http://test.com",
+            headers={},
+            workers=workers,
+            max_in_flight=max_in_flight,
+        )
+
+        lock = threading.Lock()
+        in_flight = 0
+        peak = 0
+
+        def slow_put(*args, **kwargs):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight -= 1
+            return build_mock_response(200)
+
+        with patch.object(httpx.Client, "put", side_effect=slow_put):
+            futures = [client.put(url="test", content="{}") for _ in range(16)]
+            for future in futures:
+                future.result()
+
+        client.close()
+
+        assert peak == max_in_flight
+
+
+class TestAsyncClientOverflow:
+    @pytest.fixture
+    def release(self):
+        release = threading.Event()
+        yield release
+        release.set()
+
+    @pytest.fixture
+    def blocked_put(self, release):
+        """Keep the worker busy until `release` is set."""
+
+        started = threading.Event()
+
+        def put(*args, **kwargs):
+            started.set()
+            release.wait()
+            return build_mock_response(200)
+
+        with patch.object(httpx.Client, "put", side_effect=put):
+            yield started
+
+    def build_client(self, policy, **kwargs):
+        return AsyncClient(
+            base_url="http://test.com",
+            headers={},
+            max_queue_size=2,
+            overflow_policy=policy,
+            **kwargs,
+        )
+
+    def fill(self, client, started):
+        # The first job keeps the worker busy, the next two fill up the queue
+        first = client.put(url="0")
+        started.wait()
+        return [first, client.put(url="1"), client.put(url="2")]
+
+    def test_drop_newest(self, blocked_put, release):
+        client = self.build_client(OverflowPolicy.DROP_NEWEST)
+        queued = self.fill(client, blocked_put)
+
+        dropped = client.put(url="3")
+        assert dropped.done()
+        assert isinstance(dropped.result(), DroppedError)
+        assert client.dropped == 1
+
+        release.set()
+        assert all(future.result().status_code == 200 for future in queued)
+        client.close()
+
+    def test_drop_oldest(self, blocked_put, release):
+        client = self.build_client(OverflowPolicy.DROP_OLDEST)
+        first, oldest, newer = self.fill(client, blocked_put)
+
+        newest = client.put(url="3")
+        assert oldest.done()
+        assert isinstance(oldest.result(), DroppedError)
+        assert client.dropped == 1
+
+        release.set()
+        assert all(f.result().status_code == 200 for f in (first, newer, newest))
+        client.close()
+
+    def test_block_times_out(self, blocked_put, release):
+        client = self.build_client(OverflowPolicy.BLOCK, overflow_timeout=0.05)
+        self.fill(client, blocked_put)
+
+        start = time.monotonic()
+        dropped = client.put(url="3")
+        assert time.monotonic() - start >= 0.05
+        assert isinstance(dropped.result(), DroppedError)
+        assert client.dropped == 1
+
+        release.set()
+        client.close()
+
+    def test_block_doesnt_block_workers(self, blocked_put, release):
+        client = self.build_client(OverflowPolicy.BLOCK, overflow_timeout=30)
+        first, *queued = self.fill(client, blocked_put)
+
+        # The worker would wait for itself to make room
+        requeued = Future()
+        first.add_done_callback(lambda _: requeued.set_result(client.put(url="3")))
+
+        release.set()
+        dropped = requeued.result(timeout=5)
+        assert isinstance(dropped.result(), DroppedError)
+        assert all(future.result().status_code == 200 for future in queued)
+        client.close()
+
+    def test_sample_drops_when_full(self, blocked_put, release):
+        client = self.build_client(OverflowPolicy.SAMPLE)
+        self.fill(client, blocked_put)
+
+        dropped = [client.put(url="3") for _ in range(10)]
+        assert all(isinstance(f.result(), DroppedError) for f in dropped)
+        assert client.dropped == 10
+
+        release.set()
+        client.close()
+
+    def test_batch_items_are_dropped(self, blocked_put, release):
+        client = self.build_client(OverflowPolicy.DROP_NEWEST)
+        self.fill(client, blocked_put)
+
+        dropped = client.put_batched(url="items", data="{}")
+        assert isinstance(dropped.result(), DroppedError)
+
+        release.set()
+        client.close()
+
+
+class TestAsyncClientTransport:
+    def test_default_limits(self):
+        with patch(
+            "requestyai.http.async_client.RetryTransport", wraps=RetryTransport
+        ) as transport:
+            client = AsyncClient(base_url="http://test", headers={}, max_in_flight=50)
+
+        options = transport.call_args[1]
+        assert options["limits"] == httpx.Limits(
+            max_connections=100, max_keepalive_connections=50
+        )
+        assert not options["http2"]
+
+        client.close()
+
+    def test_transport_options(self):
+        limits = httpx.Limits(max_connections=8, keepalive_expiry=30)
+
+        with patch(
+            "requestyai.http.async_client.RetryTransport", wraps=RetryTransport
+        ) as transport, patch("requestyai.http.transport_options.h2", Mock()):
+            client = AsyncClient(
+                base_url="http://test",
+                headers={},
+                timeout=httpx.Timeout(5, connect=1),
+                limits=limits,
+                http2=True,
+                local_address="127.0.0.1",
+            )
+
+        options = transport.call_args[1]
+        assert options["limits"] == limits
+        assert options["http2"]
+        assert options["local_address"] == "127.0.0.1"
+        assert client.timeout == httpx.Timeout(5, connect=1)
+
+        client.close()
+
+    def test_http2_requires_h2(self):
+        with patch("requestyai.http.transport_options.h2", None):
+            with pytest.raises(ValueError):
+                AsyncClient(base_url="http://test", headers={}, http2=True)
+
+    def test_proxy(self, server):
+        client = AsyncClient(
+            base_url="http://ingest.invalid", headers={}, proxy=server.url
+        )
+
+        assert client.put("items", content="{}").result().status_code == 200
+        assert server.requests[0]["path"] == "http://ingest.invalid/items"
+
+        client.close()
+
 
 @pytest.mark.integration_test
 class TestIntegration:
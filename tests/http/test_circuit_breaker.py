@@ -0,0 +1,201 @@
+import time
+from unittest.mock import Mock, call, patch
+
+import httpx
+import pytest
+
+from requestyai.http.async_client import AsyncClient
+from requestyai.http.circuit_breaker import CircuitBreaker
+from requestyai.http.circuit_state import CircuitState
+from requestyai.http.error import CircuitOpenError, DroppedError, SpooledError
+from requestyai.http.retry_jitter_type import RetryJitterType
+from requestyai.http.retry_policy import RetryPolicy
+from requestyai.http.retry_transport import RetryTransport
+from requestyai.http.spool import Spool, SpoolRecord
+
+from .test_async_client import build_mock_request, build_mock_response
+
+
+class TestCircuitBreaker:
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            CircuitBreaker(failure_threshold=0)
+        with pytest.raises(ValueError):
+            CircuitBreaker(reset_timeout=-1)
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3)
+
+        breaker.on_failure()
+        breaker.on_failure()
+        breaker.on_success()  # Resets the count
+        breaker.on_failure()
+        breaker.on_failure()
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.allow()
+
+        breaker.on_failure()
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.is_open()
+        assert not breaker.allow()
+
+    def test_probe_closes_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.on_failure()
+        assert not breaker.allow()
+
+        time.sleep(0.05)
+        assert not breaker.is_open()
+        assert breaker.allow()
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert not breaker.allow()  # Only a single probe
+
+        breaker.on_success()
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_opens_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.on_failure()
+
+        time.sleep(0.05)
+        assert breaker.allow()
+        breaker.on_failure()
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.allow()
+
+    def test_lost_probe_is_replaced(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.on_failure()
+
+        time.sleep(0.05)
+        assert breaker.allow()
+        time.sleep(0.05)
+        assert breaker.allow()
+
+    def test_state_changes_are_notified(self):
+        on_state_change = Mock()
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=0, on_state_change=on_state_change
+        )
+
+        breaker.on_failure()
+        breaker.allow()
+        breaker.on_success()
+
+        assert on_state_change.call_args_list == [
+            call(CircuitState.OPEN),
+            call(CircuitState.HALF_OPEN),
+            call(CircuitState.CLOSED),
+        ]
+
+
+class TestRetryTransportCircuitBreaker:
+    def test_retries_stop_once_the_circuit_is_open(self):
+        policy = RetryPolicy(backoff_factor=0, jitter_type=RetryJitterType.NONE)
+        breaker = CircuitBreaker(failure_threshold=1)
+        transport = RetryTransport(retry_policy=policy, circuit_breaker=breaker)
+
+        def handle_request(request):
+            breaker.on_failure()  # e.g. another worker's request failed
+            return build_mock_response(503)
+
+        with patch.object(
+            httpx.HTTPTransport, "handle_request", side_effect=handle_request
+        ) as handle:
+            response = transport.handle_request(build_mock_request("PUT"))
+
+        assert response.status_code == 503
+        assert handle.call_count == 1
+
+
+class TestAsyncClientCircuitBreaker:
+    def build_client(self, server, **kwargs):
+        return AsyncClient(
+            base_url=server.url,
+            headers={},
+            retry_policy=RetryPolicy(max_retries=0),
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+            **kwargs,
+        )
+
+    def open_circuit(self, client):
+        for _ in range(2):
+            client.put("fail", content="{}").result()
+
+    def test_open_circuit_drops_events(self, server):
+        server.status = 500
+        client = self.build_client(server)
+        self.open_circuit(client)
+
+        future = client.put("fail", content="{}")
+        assert future.done()
+        assert isinstance(future.result(), DroppedError)
+        assert len(server.requests) == 2
+        assert client.dropped == 1
+
+        client.close()
+
+    def test_open_circuit_spools_events(self, server, tmp_path):
+        server.status = 500
+        spool = Spool(str(tmp_path))
+        client = self.build_client(server, spool=spool)
+        self.open_circuit(client)
+
+        future = client.put("fail", content="{}")
+        assert isinstance(future.result(), SpooledError)
+
+        client.close()
+
+    def test_open_circuit_calls_the_fallback(self, server):
+        server.status = 500
+        fallback = Mock()
+        client = self.build_client(server, circuit_fallback=fallback)
+        self.open_circuit(client)
+
+        future = client.put_batched(url="items", data="{}")
+        assert isinstance(future.result(), CircuitOpenError)
+        fallback.assert_called_once_with(SpoolRecord("PUT", "items", b"{}", True))
+
+        client.close()
+
+    def test_drop_if_circuit_open(self, server):
+        server.status = 500
+        client = self.build_client(server)
+        assert client.drop_if_circuit_open() is None
+
+        self.open_circuit(client)
+        future = client.drop_if_circuit_open()
+        assert isinstance(future.result(), DroppedError)
+        assert client.dropped == 1
+
+        client.close()
+
+    def test_drop_if_circuit_open_keeps_handed_over_requests(self, server, tmp_path):
+        server.status = 500
+        spooled = self.build_client(server, spool=Spool(str(tmp_path)))
+        fallback = self.build_client(server, circuit_fallback=Mock())
+
+        for client in (spooled, fallback):
+            self.open_circuit(client)
+            assert client.drop_if_circuit_open() is None
+            client.close()
+
+    def test_probe_closes_the_circuit(self, server):
+        server.status = 500
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        client = AsyncClient(
+            base_url=server.url,
+            headers={},
+            retry_policy=RetryPolicy(max_retries=0),
+            circuit_breaker=breaker,
+        )
+        client.put("fail", content="{}").result()
+        assert breaker.state == CircuitState.OPEN
+
+        server.status = 200
+        time.sleep(0.05)
+        assert client.put("probe", content="{}").result().status_code == 200
+        assert breaker.state == CircuitState.CLOSED
+
+        client.close()
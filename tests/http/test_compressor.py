@@ -0,0 +1,77 @@
+import gzip
+import json
+
+import httpx
+import pytest
+
+from requestyai.http.async_client import AsyncClient
+from requestyai.http.compression_type import CompressionType
+from requestyai.http.compressor import Compressor
+
+
+def build_request(content: bytes, **headers) -> httpx.Request:
+    return httpx.Request("PUT", "http://test.com", content=content, headers=headers)
+
+
+class TestCompressor:
+    def test_gzip(self):
+        body = b"x" * 2048
+        request = build_request(body)
+
+        Compressor(threshold=1024)(request)
+
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert int(request.headers["Content-Length"]) == len(request.content)
+        assert gzip.decompress(request.content) == body
+        assert b"".join(request.stream) == request.content
+
+    def test_zstd(self):
+        zstandard = pytest.importorskip("zstandard")
+
+        body = b"x" * 2048
+        request = build_request(body)
+
+        Compressor(compression_type=CompressionType.ZSTD, threshold=1024)(request)
+
+        assert request.headers["Content-Encoding"] == "zstd"
+        assert zstandard.ZstdDecompressor().decompress(request.content) == body
+
+    def test_small_bodies_are_not_compressed(self):
+        request = build_request(b"x" * 100)
+
+        Compressor(threshold=1024)(request)
+
+        assert "Content-Encoding" not in request.headers
+        assert request.content == b"x" * 100
+
+    def test_encoded_bodies_are_not_compressed(self):
+        request = build_request(b"x" * 2048, **{"Content-Encoding": "br"})
+
+        Compressor(threshold=0)(request)
+
+        assert request.headers["Content-Encoding"] == "br"
+        assert request.content == b"x" * 2048
+
+
+class TestAsyncClientCompression:
+    @pytest.mark.parametrize("compression_type", list(CompressionType))
+    def test_server_receives_compressed_body(self, server, compression_type):
+        if compression_type == CompressionType.ZSTD:
+            pytest.importorskip("zstandard")
+
+        client = AsyncClient(
+            base_url=server.url,
+            headers={"Content-Type": "application/json"},
+            compressor=Compressor(compression_type=compression_type, threshold=64),
+        )
+
+        document = json.dumps({"content": "Hello, how can I help you? " * 100})
+        response = client.put("insight", content=document).result()
+        client.close()
+
+        assert response.status_code == 200
+
+        request = server.requests[0]
+        assert request["headers"]["Content-Encoding"] == compression_type.value
+        assert len(request["raw"]) < len(document)
+        assert request["body"].decode() == document
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from requestyai.http.async_client import AsyncClient
+from requestyai.http.circuit_breaker import CircuitBreaker
+from requestyai.http.error import DroppedError
+from requestyai.http.fork import reset_after_fork
+
+pytestmark = [
+    pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork"),
+    pytest.mark.filterwarnings("ignore::DeprecationWarning"),
+    pytest.mark.timeout(10),
+]
+
+
+def run_in_child(target) -> int:
+    """Run `target` in a forked child process and return its exit code."""
+
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover (runs in the child)
+        code = 1
+        try:
+            code = target()
+        finally:
+            os._exit(code)
+
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+class TestAsyncClientFork:
+    def test_child_dispatches_its_own_requests(self, server):
+        client = AsyncClient(base_url=server.url, headers={})
+        assert client.put("parent", content="{}").result().status_code == 200
+
+        def child():
+            response = client.put("child", content="{}").result(timeout=5)
+            client.close()
+            return 0 if response.status_code == 200 else 1
+
+        assert run_in_child(child) == 0
+
+        # The parent's client keeps working after the fork
+        assert client.put("parent", content="{}").result().status_code == 200
+        client.close()
+
+        paths = [request["path"] for request in server.requests]
+        assert paths == ["/parent", "/child", "/parent"]
+
+    def test_child_can_close_an_unused_client(self, server):
+        client = AsyncClient(base_url=server.url, headers={})
+
+        def child():
+            client.close()
+            return 0
+
+        assert run_in_child(child) == 0
+        client.close()
+
+        assert server.requests == []
+
+    def test_child_connects_lazily(self, server):
+        client = AsyncClient(base_url=server.url, headers={})
+
+        def child():
+            if client._AsyncClient__client is not None:
+                return 1
+            # The client's settings remain available before it's used
+            if client.base_url != server.url:
+                return 1
+            response = client.put("child", content="{}").result(timeout=5)
+            client.close()
+            return 0 if response.status_code == 200 else 1
+
+        assert run_in_child(child) == 0
+        client.close()
+
+    def test_closed_client_remains_closed_in_the_child(self, server):
+        client = AsyncClient(base_url=server.url, headers={})
+        client.close()
+
+        def child():
+            result = client.put("child", content="{}").result(timeout=5)
+            client.close()
+            return 0 if isinstance(result, DroppedError) else 1
+
+        assert run_in_child(child) == 0
+        assert server.requests == []
+
+
+class TestResetAfterFork:
+    def test_objects_are_reset_in_the_child(self):
+        class Resettable:
+            reset = False
+
+            def _after_fork_in_child(self):
+                self.reset = True
+
+        obj = Resettable()
+        reset_after_fork(obj)
+
+        assert run_in_child(lambda: 0 if obj.reset else 1) == 0
+        assert not obj.reset
+
+    def test_unused_circuit_breaker_is_reset(self):
+        # Not reset through a client, e.g. when used by an async transport
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.on_failure()
+
+        assert run_in_child(lambda: 0 if not breaker.is_open() else 1) == 0
+        assert breaker.is_open()
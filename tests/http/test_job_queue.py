@@ -0,0 +1,88 @@
+import threading
+import time
+
+from requestyai.http.job_queue import JobQueue
+
+
+class TestJobQueue:
+    def test_fifo(self):
+        queue = JobQueue()
+        for n in range(3):
+            assert queue.put(n)
+
+        assert [queue.get(timeout=0) for _ in range(3)] == [0, 1, 2]
+        assert queue.get(timeout=0) is None
+
+    def test_get_times_out(self):
+        queue = JobQueue()
+
+        start = time.monotonic()
+        assert queue.get(timeout=0.05) is None
+        assert time.monotonic() - start >= 0.05
+
+    def test_put_times_out_when_full(self):
+        queue = JobQueue(maxsize=1)
+        assert queue.put(1, timeout=0)
+        assert not queue.put(2, timeout=0)
+        assert not queue.put(2, timeout=0.01)
+        assert queue.qsize() == 1
+
+    def test_put_evicting(self):
+        queue = JobQueue(maxsize=2)
+        assert queue.put_evicting(1) == (True, None)
+        assert queue.put_evicting(2) == (True, None)
+        assert queue.put_evicting(3) == (True, 1)
+        assert [queue.get(timeout=0), queue.get(timeout=0)] == [2, 3]
+
+    def test_close_wakes_up_consumers(self):
+        queue = JobQueue()
+        results = []
+
+        consumer = threading.Thread(target=lambda: results.append(queue.get()))
+        consumer.start()
+        queue.close()
+        consumer.join(timeout=1)
+
+        assert not consumer.is_alive()
+        assert results == [None]
+
+    def test_close_lets_consumers_drain(self):
+        queue = JobQueue()
+        queue.put(1)
+        queue.close()
+
+        assert not queue.put(2)
+        assert queue.get() == 1
+        assert queue.get() is None
+
+    def test_close_wakes_up_producers(self):
+        queue = JobQueue(maxsize=1)
+        queue.put(1)
+        results = []
+
+        producer = threading.Thread(target=lambda: results.append(queue.put(2)))
+        producer.start()
+        queue.close()
+        producer.join(timeout=1)
+
+        assert not producer.is_alive()
+        assert results == [False]
+
+    def test_flush_wakes_up_waits_with_a_timeout(self):
+        queue = JobQueue()
+        results = []
+
+        consumer = threading.Thread(target=lambda: results.append(queue.get(10)))
+        consumer.start()
+        time.sleep(0.05)
+        queue.begin_flush()
+        consumer.join(timeout=1)
+
+        assert not consumer.is_alive()
+        assert results == [None]
+
+        # Waits started during the flush don't wait either
+        assert queue.get(10) is None
+
+        queue.end_flush()
+        assert queue.get(0.01) is None
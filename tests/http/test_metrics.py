@@ -0,0 +1,203 @@
+from unittest.mock import Mock, call
+
+import pytest
+
+from requestyai.http.async_client import AsyncClient
+from requestyai.http.metrics import MetricsHooks
+from requestyai.http.retry_jitter_type import RetryJitterType
+from requestyai.http.retry_policy import RetryPolicy
+
+
+def build_retry_policy(max_retries=2):
+    return RetryPolicy(
+        max_retries=max_retries, backoff_factor=0, jitter_type=RetryJitterType.NONE
+    )
+
+
+class TestDispatchStats:
+    def test_initial_stats(self):
+        client = AsyncClient(base_url="http://test.com", headers={})
+
+        stats = client.stats()
+        assert stats.queue_size == 0
+        assert stats.in_flight == 0
+        assert stats.requests == 0
+        assert stats.retries_by_status == {}
+
+        client.close()
+
+    def test_requests_are_counted(self, server):
+        client = AsyncClient(base_url=server.url, headers={})
+
+        client.put("ok", content="{}")
+        client.put("ok", content="12345")
+        client.flush()
+
+        stats = client.stats()
+        assert stats.requests == 2
+        assert stats.delivered == 2
+        assert stats.failed == 0
+        assert stats.bytes_sent == len("{}") + len("12345")
+        assert stats.request_time > 0
+        assert stats.in_flight == 0
+
+        server.status = 400
+        client.put("bad", content="{}")
+        client.flush()
+        assert client.stats().failed == 1
+
+        client.close()
+
+    def test_batches_count_every_item(self, server):
+        client = AsyncClient(
+            base_url=server.url, headers={}, batch_size=10, batch_timeout=10
+        )
+
+        for _ in range(3):
+            client.put_batched(url="items", data="{}")
+        client.flush()
+
+        stats = client.stats()
+        assert stats.requests == 1
+        assert stats.delivered == 3
+
+        client.close()
+
+    def test_retries_are_counted_by_status(self, server):
+        server.status = 503
+        client = AsyncClient(
+            base_url=server.url, headers={}, retry_policy=build_retry_policy()
+        )
+
+        client.put("unavailable", content="{}")
+        client.flush()
+
+        stats = client.stats()
+        assert stats.retries == 2
+        assert stats.retries_by_status == {503: 2}
+        assert stats.failed == 1
+        assert stats.bytes_sent == 3 * len("{}")
+        assert len(server.requests) == 3
+
+        client.close()
+
+
+class TestMetricsHooks:
+    def test_hooks_are_called(self, server):
+        hooks = Mock(spec=MetricsHooks)
+        client = AsyncClient(base_url=server.url, headers={}, metrics=hooks)
+
+        client.put("ok", content="{}")
+        client.flush()
+
+        hooks.on_enqueue.assert_called_once()
+        hooks.on_attempt.assert_called_once_with(2)
+        hooks.on_request.assert_called_once()
+        kwargs = hooks.on_request.call_args.kwargs
+        assert kwargs["status_code"] == 200
+        assert kwargs["items"] == 1
+        assert kwargs["queue_latency"] >= 0
+        assert kwargs["latency"] > 0
+
+        client.close()
+
+    def test_retry_hook(self, server):
+        server.status = 503
+        hooks = Mock(spec=MetricsHooks)
+        client = AsyncClient(
+            base_url=server.url,
+            headers={},
+            retry_policy=build_retry_policy(),
+            metrics=hooks,
+        )
+
+        client.put("unavailable", content="{}")
+        client.flush()
+
+        assert hooks.on_retry.call_args_list == [call(503), call(503)]
+        client.close()
+
+    def test_drop_hook(self):
+        hooks = Mock(spec=MetricsHooks)
+        client = AsyncClient(base_url="http://test.com", headers={}, metrics=hooks)
+        client.close()
+
+        client.put("late", content="{}")
+        hooks.on_drop.assert_called_once_with("Client is closed")
+        assert client.stats().dropped == 1
+
+    def test_failing_hooks_dont_stop_dispatch(self, server):
+        hooks = Mock(spec=MetricsHooks)
+        for name in ("on_enqueue", "on_attempt", "on_request"):
+            getattr(hooks, name).side_effect = RuntimeError("Hook failed")
+        client = AsyncClient(base_url=server.url, headers={}, workers=1, metrics=hooks)
+
+        futures = [client.put("ok", content="{}") for _ in range(3)]
+
+        assert [future.result(timeout=5).status_code for future in futures] == [
+            200,
+            200,
+            200,
+        ]
+        assert client.stats().delivered == 3
+        client.close()
+
+    def test_base_hooks_do_nothing(self, server):
+        client = AsyncClient(base_url=server.url, headers={}, metrics=MetricsHooks())
+        assert client.put("ok", content="{}").result().status_code == 200
+        client.close()
+
+
+class TestPrometheusHooks:
+    def test_metrics_are_exported(self, server):
+        prometheus_client = pytest.importorskip("prometheus_client")
+        from requestyai.http.prometheus_hooks import PrometheusHooks
+
+        registry = prometheus_client.CollectorRegistry()
+        hooks = PrometheusHooks(namespace="test", registry=registry)
+        client = AsyncClient(base_url=server.url, headers={}, metrics=hooks)
+
+        client.put("ok", content="{}")
+        client.flush()
+        client.close()
+
+        def sample(name, **labels):
+            return registry.get_sample_value(name, labels)
+
+        assert sample("test_requests_total", status="200") == 1
+        assert sample("test_jobs_total", status="200") == 1
+        assert sample("test_sent_bytes_total") == 2
+        assert sample("test_request_latency_seconds_count") == 1
+
+
+class TestOpenTelemetryHooks:
+    def test_metrics_are_exported(self, server):
+        pytest.importorskip("opentelemetry.sdk.metrics")
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+        from requestyai.http.opentelemetry_hooks import OpenTelemetryHooks
+
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(metric_readers=[reader])
+        hooks = OpenTelemetryHooks(namespace="test", meter_provider=provider)
+        client = AsyncClient(base_url=server.url, headers={}, metrics=hooks)
+
+        client.put("ok", content="{}")
+        client.flush()
+        client.close()
+
+        metrics = {
+            metric.name: metric.data.data_points
+            for resource in reader.get_metrics_data().resource_metrics
+            for scope in resource.scope_metrics
+            for metric in scope.metrics
+        }
+
+        (requests,) = metrics["test.requests"]
+        assert requests.value == 1
+        assert requests.attributes == {"status": "200"}
+        (sent,) = metrics["test.sent"]
+        assert sent.value == 2
+        (latency,) = metrics["test.request.latency"]
+        assert latency.count == 1
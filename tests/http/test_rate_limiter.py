@@ -0,0 +1,167 @@
+from email.utils import formatdate
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from requestyai.http.async_retry_transport import AsyncRetryTransport
+from requestyai.http.rate_limiter import RateLimiter
+from requestyai.http.retry_after import parse_retry_after
+from requestyai.http.retry_jitter_type import RetryJitterType
+from requestyai.http.retry_policy import RetryPolicy
+from requestyai.http.retry_transport import RetryTransport
+
+from .test_async_client import build_mock_request, build_mock_response
+
+
+class TestParseRetryAfter:
+    NOW = 1_700_000_000.0
+
+    @pytest.mark.parametrize(
+        "headers,expected",
+        [
+            ({}, None),
+            ({"Retry-After": "3"}, 3),
+            ({"Retry-After": "1.5"}, 1.5),
+            ({"Retry-After": "-1"}, 0),
+            ({"Retry-After": formatdate(NOW + 10, usegmt=True)}, 10),
+            ({"Retry-After": "soon"}, None),
+            ({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "7"}, 7),
+            ({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(NOW + 4)}, 4),
+            ({"X-RateLimit-Remaining": "5", "X-RateLimit-Reset": "7"}, None),
+            ({"RateLimit-Remaining": "0", "RateLimit-Reset": "2"}, 2),
+        ],
+    )
+    def test_parse(self, headers, expected):
+        assert parse_retry_after(httpx.Headers(headers), now=self.NOW) == expected
+
+
+class TestRateLimiter:
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            RateLimiter(min_rate=10, max_rate=1)
+        with pytest.raises(ValueError):
+            RateLimiter(burst=0)
+        with pytest.raises(ValueError):
+            RateLimiter(decrease=0)
+
+    def test_burst_then_rate(self):
+        limiter = RateLimiter(max_rate=10, burst=3)
+
+        assert [limiter.reserve() for _ in range(3)] == [0, 0, 0]
+        assert limiter.reserve() == pytest.approx(0.1, abs=0.01)
+        assert limiter.reserve() == pytest.approx(0.2, abs=0.01)
+
+    def test_pause(self):
+        limiter = RateLimiter(max_rate=10, burst=3)
+
+        limiter.pause(2)
+        assert limiter.reserve() == pytest.approx(2, abs=0.01)
+        assert limiter.reserve() == pytest.approx(2.1, abs=0.01)
+
+    def test_pause_is_capped(self):
+        limiter = RateLimiter(max_pause=1)
+
+        limiter.pause(3600)
+        assert limiter.reserve() == pytest.approx(1, abs=0.01)
+
+    def test_retry_after_pauses(self):
+        limiter = RateLimiter()
+
+        limiter.on_response(429, retry_after=1)
+        assert limiter.reserve() == pytest.approx(1, abs=0.01)
+
+    def test_multiplicative_decrease(self):
+        limiter = RateLimiter(max_rate=100, decrease=0.5, decrease_interval=0)
+
+        limiter.on_response(429)
+        assert limiter.rate == 50
+        limiter.on_response(503)
+        assert limiter.rate == 25
+        limiter.on_response(500)
+        assert limiter.rate == 25
+
+    def test_decreases_at_most_once_per_interval(self):
+        limiter = RateLimiter(max_rate=100, decrease=0.5, decrease_interval=60)
+
+        for _ in range(5):
+            limiter.on_response(429)
+        assert limiter.rate == 50
+
+    def test_decrease_is_bounded(self):
+        limiter = RateLimiter(max_rate=2, min_rate=1, decrease_interval=0)
+
+        for _ in range(5):
+            limiter.on_response(429)
+        assert limiter.rate == 1
+
+    def test_additive_increase(self):
+        limiter = RateLimiter(max_rate=100, increase=10, decrease_interval=0)
+        limiter.on_response(429)
+
+        limiter.on_response(200)
+        assert limiter.rate == pytest.approx(50 + 10 / 50)
+
+        for _ in range(10_000):
+            limiter.on_response(200)
+        assert limiter.rate == 100
+
+
+class TestRetryAfter:
+    @pytest.fixture
+    def policy(self):
+        return RetryPolicy(backoff_factor=0, jitter_type=RetryJitterType.NONE)
+
+    def test_backoff_honors_retry_after(self, policy):
+        assert policy.get_backoff_time(1, retry_after=2) == 2
+        assert policy.get_backoff_time(1, retry_after=3600) == policy.max_retry_after
+
+    def test_transport_honors_retry_after(self, policy):
+        transport = RetryTransport(retry_policy=policy)
+        responses = [
+            build_mock_response(429, {"Retry-After": "2"}),
+            build_mock_response(200),
+        ]
+
+        with patch.object(
+            httpx.HTTPTransport, "handle_request", side_effect=responses
+        ), patch("time.sleep") as sleep:
+            response = transport.handle_request(build_mock_request("PUT"))
+
+        assert response.status_code == 200
+        sleep.assert_called_once_with(2)
+
+    def test_transport_throttles_through_the_limiter(self, policy):
+        limiter = RateLimiter(max_rate=100, decrease_interval=0)
+        transport = RetryTransport(retry_policy=policy, rate_limiter=limiter)
+        responses = [
+            build_mock_response(429, {"Retry-After": "2"}),
+            build_mock_response(200),
+        ]
+
+        with patch.object(
+            httpx.HTTPTransport, "handle_request", side_effect=responses
+        ), patch("time.sleep") as sleep:
+            transport.handle_request(build_mock_request("PUT"))
+
+        assert limiter.rate == pytest.approx(50 + 1 / 50)
+        # The limiter makes the retry wait for the server's hint
+        assert sum(args[0] for args, _ in sleep.call_args_list) == pytest.approx(
+            2, abs=0.01
+        )
+
+    async def test_async_transport_throttles_through_the_limiter(self, policy):
+        limiter = RateLimiter(max_rate=100, decrease_interval=0)
+        transport = AsyncRetryTransport(retry_policy=policy, rate_limiter=limiter)
+        responses = [
+            build_mock_response(503, {"Retry-After": "0"}),
+            build_mock_response(200),
+        ]
+
+        with patch.object(
+            httpx.AsyncHTTPTransport, "handle_async_request", side_effect=responses
+        ):
+            response = await transport.handle_async_request(build_mock_request("PUT"))
+
+        assert response.status_code == 200
+        assert limiter.rate == pytest.approx(50 + 1 / 50)
@@ -0,0 +1,156 @@
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from requestyai.http.async_client import AsyncClient
+from requestyai.http.async_retry_transport import AsyncRetryTransport
+from requestyai.http.retry_budget import RetryBudget
+from requestyai.http.retry_jitter_type import RetryJitterType
+from requestyai.http.retry_policy import RetryPolicy
+from requestyai.http.retry_transport import RetryTransport
+
+from .test_async_client import build_mock_request, build_mock_response
+
+
+def build_retry_policy(**kwargs):
+    return RetryPolicy(jitter_type=RetryJitterType.NONE, **kwargs)
+
+
+class TestRetryBudget:
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            RetryBudget(ratio=-1)
+        with pytest.raises(ValueError):
+            RetryBudget(min_retries=-1)
+        with pytest.raises(ValueError):
+            RetryBudget(window=0)
+
+    def test_min_retries(self):
+        budget = RetryBudget(ratio=0, min_retries=2)
+
+        assert budget.try_retry()
+        assert budget.try_retry()
+        assert not budget.try_retry()
+
+    def test_ratio(self):
+        budget = RetryBudget(ratio=0.5, min_retries=0)
+
+        for _ in range(4):
+            budget.on_request()
+
+        assert [budget.try_retry() for _ in range(3)] == [True, True, False]
+
+        budget.on_request()
+        budget.on_request()
+        assert budget.try_retry()
+
+    def test_window_slides(self):
+        budget = RetryBudget(ratio=0, min_retries=1, window=10)
+
+        with patch("time.monotonic", return_value=1000.0):
+            assert budget.try_retry()
+            assert not budget.try_retry()
+
+        with patch("time.monotonic", return_value=1009.0):
+            assert not budget.try_retry()
+
+        with patch("time.monotonic", return_value=1011.0):
+            assert budget.try_retry()
+
+
+class TestRetryTransportBudget:
+    def test_retries_are_limited_by_the_budget(self):
+        budget = RetryBudget(ratio=0, min_retries=1)
+        transport = RetryTransport(
+            retry_policy=build_retry_policy(backoff_factor=0), retry_budget=budget
+        )
+
+        with patch.object(
+            httpx.HTTPTransport,
+            "handle_request",
+            side_effect=lambda request: build_mock_response(503),
+        ) as handle:
+            transport.handle_request(build_mock_request("PUT"))
+            transport.handle_request(build_mock_request("PUT"))
+
+        # Only a single retry was allowed, for both requests together
+        assert handle.call_count == 3
+
+    def test_network_errors_are_raised_when_out_of_budget(self):
+        budget = RetryBudget(ratio=0, min_retries=0)
+        transport = RetryTransport(
+            retry_policy=build_retry_policy(backoff_factor=0), retry_budget=budget
+        )
+
+        with patch.object(
+            httpx.HTTPTransport, "handle_request", side_effect=httpx.NetworkError("")
+        ) as handle:
+            with pytest.raises(httpx.NetworkError):
+                transport.handle_request(build_mock_request("PUT"))
+
+        assert handle.call_count == 1
+
+    async def test_async_retries_are_limited_by_the_budget(self):
+        budget = RetryBudget(ratio=0, min_retries=1)
+        transport = AsyncRetryTransport(
+            retry_policy=build_retry_policy(backoff_factor=0), retry_budget=budget
+        )
+
+        with patch.object(
+            httpx.AsyncHTTPTransport,
+            "handle_async_request",
+            side_effect=lambda request: build_mock_response(503),
+        ) as handle:
+            await transport.handle_async_request(build_mock_request("PUT"))
+            await transport.handle_async_request(build_mock_request("PUT"))
+
+        assert handle.call_count == 3
+
+
+class TestRetryTransportDeadline:
+    def test_no_retry_past_the_deadline(self):
+        policy = build_retry_policy(backoff_factor=1, deadline=1.5)
+        transport = RetryTransport(retry_policy=policy)
+
+        with patch.object(
+            httpx.HTTPTransport,
+            "handle_request",
+            side_effect=lambda request: build_mock_response(503),
+        ) as handle, patch("time.sleep") as sleep:
+            response = transport.handle_request(httpx.Request("PUT", "http://test"))
+
+        # The first backoff (1s) fits in the deadline, the second one (2s) doesn't
+        assert response.status_code == 503
+        assert handle.call_count == 2
+        sleep.assert_called_once_with(1)
+
+    def test_attempts_are_timed_out_at_the_deadline(self):
+        policy = build_retry_policy(deadline=2)
+        transport = RetryTransport(retry_policy=policy)
+        request = httpx.Request(
+            "PUT", "http://test", extensions={"timeout": httpx.Timeout(10).as_dict()}
+        )
+
+        with patch.object(
+            httpx.HTTPTransport, "handle_request", return_value=build_mock_response(200)
+        ):
+            transport.handle_request(request)
+
+        timeout = request.extensions["timeout"]
+        assert set(timeout) == {"connect", "read", "write", "pool"}
+        assert all(1.9 < value <= 2 for value in timeout.values())
+
+    def test_deadline_bounds_the_request_latency(self, server):
+        server.status = 503
+        policy = build_retry_policy(backoff_factor=0.1, deadline=0.25)
+        client = AsyncClient(base_url=server.url, headers={}, retry_policy=policy)
+
+        start = time.monotonic()
+        assert client.put("unavailable", content="{}").result().status_code == 503
+        assert time.monotonic() - start < 0.25
+        # Attempts after 0, 0.1 and 0.3 (too late) seconds
+        assert len(server.requests) == 2
+
+        client.close()
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from requestyai.http.async_client import AsyncClient
+from requestyai.http.rate_limiter import RateLimiter
+from requestyai.http.shutdown import Shutdown
+
+pytestmark = pytest.mark.timeout(20)
+
+
+class TestShutdown:
+    def test_wait(self):
+        assert Shutdown().wait(0.01)
+
+    def test_wait_past_the_deadline(self):
+        shutdown = Shutdown()
+        shutdown.begin(time.monotonic() + 0.5)
+
+        started_at = time.monotonic()
+        assert not shutdown.wait(10)
+        assert shutdown.wait(0.01)
+        assert time.monotonic() - started_at < 0.5
+
+    def test_shutdown_interrupts_waits(self):
+        shutdown = Shutdown()
+        threading.Timer(0.1, shutdown.begin, args=(time.monotonic(),)).start()
+
+        started_at = time.monotonic()
+        assert not shutdown.wait(10)
+        assert time.monotonic() - started_at < 5
+
+
+class TestClose:
+    def wait_for_requests(self, server, count: int):
+        while len(server.requests) < count:
+            time.sleep(0.01)
+
+    def test_close_cuts_retry_after_short(self, server):
+        server.status = 503
+        server.headers = {"Retry-After": "30"}
+        client = AsyncClient(base_url=server.url, headers={})
+
+        future = client.put("insight", content="{}")
+        self.wait_for_requests(server, 1)
+
+        started_at = time.monotonic()
+        client.close()
+
+        assert time.monotonic() - started_at < AsyncClient.SHUTDOWN_TIMEOUT
+        assert future.result().status_code == 503
+        assert len(server.requests) == 1
+
+    def test_close_cuts_rate_limiter_pause_short(self, server):
+        server.status = 429
+        server.headers = {"Retry-After": "30"}
+        client = AsyncClient(
+            base_url=server.url, headers={}, rate_limiter=RateLimiter()
+        )
+
+        client.put("insight", content="{}")
+        self.wait_for_requests(server, 1)
+
+        started_at = time.monotonic()
+        client.close()
+
+        assert time.monotonic() - started_at < AsyncClient.SHUTDOWN_TIMEOUT
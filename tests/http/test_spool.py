@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+
+from requestyai.http.async_client import AsyncClient
+from requestyai.http.error import DroppedError, SpooledError
+from requestyai.http.overflow_policy import OverflowPolicy
+from requestyai.http.retry_policy import RetryPolicy
+from requestyai.http.spool import Spool, SpoolRecord
+
+
+def build_record(n: int, batched: bool = False) -> SpoolRecord:
+    return SpoolRecord("PUT", f"items/{n}", f'{{"n": {n}}}'.encode(), batched)
+
+
+class TestSpool:
+    def test_records_are_replayed_by_the_next_spool(self, tmp_path):
+        spool = Spool(str(tmp_path))
+        records = [build_record(n, batched=n % 2 == 0) for n in range(3)]
+        for record in records:
+            assert spool.append(record)
+        assert spool.pending_segments() == []
+        spool.close()
+
+        spool = Spool(str(tmp_path))
+        segments = spool.pending_segments()
+        assert len(segments) == 1
+        assert list(spool.read_segment(segments[0])) == records
+
+        spool.remove_segment(segments[0])
+        assert spool.pending_segments() == []
+        assert spool.size == 0
+        assert os.listdir(tmp_path) == []
+
+    def test_segments_are_rotated(self, tmp_path):
+        spool = Spool(str(tmp_path), segment_size=64)
+        records = [build_record(n) for n in range(6)]
+        for record in records:
+            spool.append(record)
+        spool.close()
+
+        spool = Spool(str(tmp_path))
+        segments = spool.pending_segments()
+        assert len(segments) > 1
+
+        replayed = [r for path in segments for r in spool.read_segment(path)]
+        assert replayed == records
+
+    def test_max_size(self, tmp_path):
+        spool = Spool(str(tmp_path), max_size=40)
+        assert spool.append(build_record(0))
+        assert not spool.append(build_record(1))
+
+    def test_truncated_records_are_ignored(self, tmp_path):
+        spool = Spool(str(tmp_path))
+        spool.append(build_record(0))
+        spool.append(build_record(1))
+        spool.close()
+
+        (path,) = Spool(str(tmp_path)).pending_segments()
+        with open(path, "r+b") as file:
+            file.truncate(os.path.getsize(path) - 3)
+
+        assert list(Spool(str(tmp_path)).read_segment(path)) == [build_record(0)]
+
+
+class TestAsyncClientSpool:
+    def test_failed_requests_are_replayed(self, server, tmp_path):
+        retry_policy = RetryPolicy(max_retries=0)
+
+        server.status = 503
+        client = AsyncClient(
+            base_url=server.url,
+            headers={},
+            retry_policy=retry_policy,
+            spool=Spool(str(tmp_path)),
+        )
+        single = client.put(url="single", content='{"n": 1}')
+        batched = client.put_batched(url="batched", data='{"n": 2}')
+        assert single.result().status_code == 503
+        assert batched.result().status_code == 503
+        client.close()
+
+        assert client.spooled == 2
+
+        server.status = 200
+        server.requests.clear()
+        client = AsyncClient(
+            base_url=server.url,
+            headers={},
+            retry_policy=retry_policy,
+            spool=Spool(str(tmp_path)),
+            replay_rate=1000,
+        )
+
+        for _ in range(100):
+            if os.listdir(tmp_path) == []:
+                break
+            time.sleep(0.05)
+        client.close()
+
+        bodies = sorted((r["path"], r["body"]) for r in server.requests)
+        assert bodies == [("/batched", b'[{"n": 2}]'), ("/single", b'{"n": 1}')]
+        assert os.listdir(tmp_path) == []
+
+    @pytest.fixture
+    def blocked_client(self, tmp_path):
+        """A client whose single worker is kept busy, with room for one job."""
+
+        release = threading.Event()
+        started = threading.Event()
+
+        def put(*args, **kwargs):
+            started.set()
+            release.wait()
+            return Mock(status_code=200)
+
+        with patch.object(httpx.Client, "put", side_effect=put):
+            client = AsyncClient(
+                base_url="http://test.com",
+                headers={},
+                max_queue_size=1,
+                overflow_policy=OverflowPolicy.DROP_NEWEST,
+                spool=Spool(str(tmp_path)),
+            )
+            client.put(url="busy", content="{}")
+            started.wait()
+            client.put(url="queued", content="{}")
+
+            yield client
+
+            release.set()
+            client.close()
+
+    def test_overflowing_requests_are_spooled(self, blocked_client):
+        overflow = blocked_client.put(url="overflow", content="{}")
+
+        assert isinstance(overflow.result(), SpooledError)
+        assert blocked_client.spooled == 1
+        assert blocked_client.dropped == 0
+
+    def test_requests_without_a_body_are_dropped(self, blocked_client):
+        overflow = blocked_client.get(url="overflow")
+
+        assert isinstance(overflow.result(), DroppedError)
+        assert blocked_client.spooled == 0
+        assert blocked_client.dropped == 1
@@ -0,0 +1,80 @@
+import subprocess
+import sys
+
+import pytest
+
+import requestyai
+
+HEAVY_MODULES = ("openai", "httpx", "pydantic")
+
+# Creating a client imports httpx and pydantic, but neither openai nor the
+# modules of the optional features
+NEW_CLIENT = "from requestyai import AInsights\nAInsights.new_client(api_key='test')\n"
+
+UNUSED_MODULES = (
+    "openai",
+    "requestyai.ainsights.instrument",
+    "requestyai.ainsights.stream",
+    "requestyai.ainsights.exporter",
+    "requestyai.ainsights.export_queue",
+    "requestyai.ainsights.response_cache",
+)
+
+
+def run(code: str) -> str:
+    """Run `code` in a fresh interpreter, and return its output."""
+
+    return subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+
+
+def test_import_is_lazy():
+    loaded = run(
+        "import sys, requestyai, requestyai.ainsights\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+
+    assert loaded.strip() == ""
+
+
+def test_new_client_is_lazy():
+    loaded = run(
+        "import sys\n"
+        + NEW_CLIENT
+        + f"print(','.join(m for m in {UNUSED_MODULES!r} if m in sys.modules))"
+    )
+
+    assert loaded.strip() == ""
+
+
+def test_event_imports_openai_on_first_use():
+    loaded = run(
+        "import sys\n"
+        "from requestyai.ainsights.types.event import AInsightsEvent\n"
+        "print('openai' in sys.modules)\n"
+        "from openai.types.chat import ChatCompletion\n"
+        "response = ChatCompletion(\n"
+        "    id='', choices=[], created=0, model='', object='chat.completion'\n"
+        ")\n"
+        "AInsightsEvent(response=response, messages='hi', template=None,\n"
+        "    inputs={}, args={}, meta={}, user_id=None).model_dump_json()\n"
+        "print(AInsightsEvent.__pydantic_complete__)"
+    )
+
+    assert loaded.split() == ["False", "True"]
+
+
+def test_public_names():
+    from requestyai import AInsights, AsyncAInsights
+    from requestyai.ainsights import AInsights as AInsights_
+    from requestyai.ainsights.async_client import AsyncAInsights as AsyncAInsights_
+
+    assert AInsights is AInsights_
+    assert AsyncAInsights is AsyncAInsights_
+    assert {"AInsights", "AsyncAInsights"} <= set(dir(requestyai))
+
+
+def test_unknown_name():
+    with pytest.raises(AttributeError):
+        requestyai.Unknown